@@ -8,7 +8,7 @@ from django.contrib import messages
 from django.http import HttpResponseRedirect
 from .models import (
     UserProfile, Badge, UserBadge, UserLevel, 
-    DailyChallenge, ChallengeCompletion, Notification
+    DailyChallenge, ChallengeCompletion, Notification, GamificationEvent
 )
 from battles.models import BattleRating
 
@@ -322,6 +322,25 @@ class NotificationAdmin(admin.ModelAdmin):
         return qs.select_related('user')
 
 
+@admin.register(GamificationEvent)
+class GamificationEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'event_type', 'status', 'attempts', 'created_at', 'processed_at']
+    list_filter = ['status', 'event_type', ('created_at', admin.DateFieldListFilter)]
+    search_fields = ['user__username']
+    readonly_fields = ['created_at', 'processed_at', 'locked_at', 'last_error']
+    actions = ['retry_events']
+    
+    @admin.action(description='Retry selected events')
+    def retry_events(self, request, queryset):
+        from django.utils import timezone
+        updated = queryset.exclude(status='done').update(status='pending', attempts=0, available_at=timezone.now(), locked_at=None)
+        self.message_user(request, f'{updated} ta event qayta navbatga qo\'yildi.')
+    
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        return qs.select_related('user')
+
+
 admin.site.unregister(User)
 admin.site.register(User, UserAdmin)
 admin.site.register(UserProfile)
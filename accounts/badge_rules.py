@@ -0,0 +1,272 @@
+"""
+Indexed badge rule engine.
+
+Active badges are grouped by (badge_type, requirement key) and sorted by target, every
+metric is read once from a lazily filled StatsSnapshot, and all UserBadge changes are
+written with bulk_create/bulk_update. The number of queries per call does not depend
+on how many badges exist.
+"""
+from bisect import bisect_right
+from collections import namedtuple
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from datetime import timedelta
+from typing_practice.models import UserStats
+from .models import UserProfile, Badge, UserBadge, UserLevel, DailyChallenge, ChallengeCompletion, Notification
+import logging
+
+logger = logging.getLogger('typing_platform')
+
+# metric: StatsSnapshot metric name (None = not tracked yet, never earned)
+# flag: earned when the metric is truthy, target value is ignored
+Rule = namedtuple('Rule', ['key', 'metric', 'flag'])
+
+# Per badge type, requirement keys in priority order (first key present in requirement wins)
+RULES = {
+    'speed': [Rule('wpm', 'max_wpm', False)],
+    'accuracy': [
+        Rule('accuracy', 'avg_accuracy', False),
+        Rule('perfect_sessions', 'perfect_sessions', False),
+    ],
+    'streak': [Rule('days', 'current_streak', False)],
+    'milestone': [
+        Rule('sessions', 'total_sessions', False),
+        Rule('text_sessions', 'text_sessions', False),
+        Rule('code_sessions', 'code_sessions', False),
+    ],
+    'consistency': [Rule('practice_days', 'total_practice_days', False)],
+    'competition': [
+        Rule('first_place', 'has_first_place', True),
+        Rule('second_place', None, False),
+        Rule('third_place', None, False),
+        Rule('participations', 'total_participations', False),
+        # Simplified: finished competitions count as wins for now
+        Rule('wins', 'finished_competitions', False),
+    ],
+    'battle': [
+        Rule('battle_wins', 'battle_wins', False),
+        Rule('battles', 'total_battles', False),
+    ],
+    'special': [
+        Rule('perfect_week', 'has_perfect_week', True),
+        Rule('early_completion', None, False),
+        Rule('late_completion', None, False),
+        Rule('comebacks', None, False),
+    ],
+}
+
+
+class StatsSnapshot:
+    """User stats read on demand; each group is loaded with at most a fixed number of queries"""
+
+    GROUPS = {
+        'max_wpm': 'results', 'avg_accuracy': 'results', 'total_sessions': 'results',
+        'text_sessions': 'results', 'code_sessions': 'results', 'perfect_sessions': 'results',
+        'current_streak': 'profile', 'total_practice_days': 'profile',
+        'total_participations': 'competitions', 'finished_competitions': 'competitions',
+        'battle_wins': 'battles', 'total_battles': 'battles',
+        'has_first_place': 'first_place', 'has_perfect_week': 'perfect_week',
+    }
+
+    def __init__(self, user, profile):
+        self.user = user
+        self.profile = profile
+        self._groups = {}
+
+    def get(self, metric):
+        group = self.GROUPS[metric]
+        if group not in self._groups:
+            self._groups[group] = getattr(self, f'_load_{group}')()
+        return self._groups[group].get(metric) or 0
+
+    def _load_results(self):
+        stats = UserStats.for_user(self.user)
+        return {
+            'total_sessions': stats.total_sessions,
+            'max_wpm': stats.max_wpm,
+            'avg_accuracy': stats.avg_accuracy,
+            'text_sessions': stats.text_sessions,
+            'code_sessions': stats.code_sessions,
+            'perfect_sessions': stats.perfect_sessions,
+        }
+
+    def _load_profile(self):
+        return {
+            'current_streak': self.profile.current_streak,
+            'total_practice_days': self.profile.total_practice_days,
+        }
+
+    def _load_competitions(self):
+        try:
+            from competitions.models import CompetitionParticipant
+        except ImportError:
+            return {}
+        return CompetitionParticipant.objects.filter(user=self.user).aggregate(
+            total_participations=Count('id'),
+            finished_competitions=Count('id', filter=Q(is_finished=True)),
+        )
+
+    def _load_battles(self):
+        try:
+            from battles.models import BattleParticipant
+        except ImportError:
+            return {}
+        return BattleParticipant.objects.filter(user=self.user, is_finished=True).aggregate(
+            total_battles=Count('id'),
+            battle_wins=Count('id', filter=Q(battle__winner=self.user)),
+        )
+
+    def _load_first_place(self):
+        # Simplified: user's best finished result is the highest in that competition
+        try:
+            from competitions.models import CompetitionParticipant
+        except ImportError:
+            return {}
+        best = CompetitionParticipant.objects.filter(
+            user=self.user, is_finished=True
+        ).order_by('-result_wpm').first()
+        if not best or not best.result_wpm:
+            return {}
+        highest = CompetitionParticipant.objects.filter(
+            competition_id=best.competition_id, is_finished=True
+        ).order_by('-result_wpm').first()
+        return {'has_first_place': bool(highest and highest.user_id == self.user.id)}
+
+    def _load_perfect_week(self):
+        # All daily challenges of the last 7 days completed
+        today = timezone.now().date()
+        week_challenges = DailyChallenge.objects.filter(date__gte=today - timedelta(days=7), date__lte=today)
+        total = week_challenges.count()
+        completed = ChallengeCompletion.objects.filter(user=self.user, challenge__in=week_challenges).count()
+        return {'has_perfect_week': total >= 7 and completed >= total}
+
+
+def _match_rule(badge):
+    """(rule, target) for a badge, or (None, None) if its requirement is not understood"""
+    req = badge.requirement or {}
+    for rule in RULES.get(badge.badge_type, []):
+        if rule.key in req:
+            target = req[rule.key]
+            if not isinstance(target, (int, float)):
+                logger.warning(f"Badge {badge.name}: non-numeric requirement {rule.key}={target!r}")
+                return None, None
+            return rule, target
+    return None, None
+
+
+def build_badge_index(badges):
+    """Group badges by (badge_type, requirement key) -> (rule, sorted targets, badges)"""
+    grouped = {}
+    for badge in badges:
+        rule, target = _match_rule(badge)
+        if rule is None:
+            continue
+        grouped.setdefault((badge.badge_type, rule.key), (rule, []))[1].append((target, badge.id, badge))
+
+    index = {}
+    for key, (rule, entries) in grouped.items():
+        entries.sort(key=lambda entry: (entry[0], entry[1]))
+        index[key] = (rule, [entry[0] for entry in entries], [entry[2] for entry in entries])
+    return index
+
+
+def evaluate(index, snapshot):
+    """Yield (badge, earned, progress) for every indexed badge"""
+    for rule, targets, badges in index.values():
+        if rule.metric is None:
+            for badge in badges:
+                yield badge, False, 0
+            continue
+
+        value = snapshot.get(rule.metric)
+        if rule.flag:
+            for badge in badges:
+                yield badge, bool(value), 0
+            continue
+
+        earned_upto = bisect_right(targets, value)
+        for position, (target, badge) in enumerate(zip(targets, badges)):
+            if position < earned_upto:
+                yield badge, True, 100
+            else:
+                progress = int(value / target * 100) if target > 0 else 0
+                yield badge, False, min(100, progress)
+
+
+def award_badges(user):
+    """Evaluate all active badges for user and persist progress/awards in bulk"""
+    profile = UserProfile.objects.get(user=user)
+    index = build_badge_index(Badge.objects.filter(is_active=True))
+    if not index:
+        return None
+
+    user_badges = {ub.badge_id: ub for ub in UserBadge.objects.filter(user=user)}
+    snapshot = StatsSnapshot(user, profile)
+    now = timezone.now()
+
+    to_create, to_update, awarded = [], [], []
+    for badge, earned, progress in evaluate(index, snapshot):
+        user_badge = user_badges.get(badge.id)
+        if user_badge is not None and user_badge.progress >= 100:
+            continue
+        if earned:
+            awarded.append(badge)
+            if user_badge is None:
+                to_create.append(UserBadge(user=user, badge=badge, progress=100))
+            else:
+                # Progress row promoted to earned badge
+                user_badge.apply_progress(100)
+                user_badge.earned_at = now
+                to_update.append(user_badge)
+        elif user_badge is None:
+            to_create.append(UserBadge(user=user, badge=badge, progress=progress))
+        elif user_badge.apply_progress(progress):
+            to_update.append(user_badge)
+
+    level_up, new_level = False, None
+    xp_gained = sum(badge.xp_reward for badge in awarded)
+    with transaction.atomic():
+        if to_create:
+            UserBadge.objects.bulk_create(to_create)
+        if to_update:
+            UserBadge.objects.bulk_update(to_update, ['progress', 'progress_history', 'earned_at'])
+        if awarded:
+            level_info, _ = UserLevel.objects.get_or_create(user=user)
+            level_up, new_level = level_info.add_xp(xp_gained)
+
+            notifications = [
+                Notification(
+                    user=user,
+                    notification_type='badge',
+                    title=f'Yangi badge: {badge.name}',
+                    message=f'{badge.icon} {badge.description}',
+                    icon=badge.icon,
+                    link='/accounts/profile/'
+                )
+                for badge in awarded
+            ]
+            if level_up:
+                notifications.append(Notification(
+                    user=user,
+                    notification_type='level_up',
+                    title=f'Level {new_level} ga yetdingiz!',
+                    message=f'🎉 Tabriklaymiz! Siz Level {new_level} ga yetdingiz!',
+                    icon='🎉',
+                    link='/dashboard/'
+                ))
+            Notification.objects.bulk_create(notifications)
+
+    if not awarded:
+        return None
+
+    logger.info(
+        f"Badges awarded: {user.username} earned {', '.join(b.name for b in awarded)} "
+        f"(+{xp_gained} XP, Level up: {level_up})"
+    )
+    return {
+        'badges': awarded,
+        'level_up': level_up,
+        'new_level': new_level,
+        'xp_gained': xp_gained,
+    }
@@ -3,17 +3,17 @@ Gamification utilities for badges, XP, streaks, etc.
 """
 from django.utils import timezone
 from datetime import timedelta, date
-from django.db.models import Count, Max, Avg, Q
-from typing_practice.models import UserResult
-from .models import UserProfile, Badge, UserBadge, UserLevel, DailyChallenge, ChallengeCompletion, Notification
+from typing_practice.models import UserResult, UserStats, ErrorProfile
+from .models import UserProfile, UserLevel, DailyChallenge, ChallengeCompletion, Notification
+from .badge_rules import award_badges
 import random
 import logging
 
 logger = logging.getLogger('typing_platform')
 
 
-def update_streak(user):
-    """Update user's streak based on practice history"""
+def update_streak(user, raise_errors=False):
+    """Update user's streak based on practice history (raise_errors: let failures reach the job worker)"""
     try:
         profile = UserProfile.objects.get(user=user)
         today = timezone.now().date()
@@ -61,257 +61,43 @@ def update_streak(user):
     except UserProfile.DoesNotExist:
         logger.warning(f"UserProfile not found for user {user.username}")
     except Exception as e:
+        if raise_errors:
+            raise
         logger.error(f"Error updating streak for user {user.username}: {e}", exc_info=True)
 
 
-def check_and_award_badges(user, result=None):
-    """Check if user qualifies for any badges and award them"""
+def update_error_profile(user, results, raise_errors=False):
+    """Merge the results' mistakes into the user's ErrorProfile (typed_chars comes from the save views)"""
     try:
-        profile = UserProfile.objects.get(user=user)
-        user_results = UserResult.objects.filter(user=user)
-        
-        # Get user stats (yaxshilangan)
-        stats = user_results.aggregate(
-            total_sessions=Count('id'),
-            max_wpm=Max('wpm'),
-            avg_wpm=Avg('wpm'),
-            avg_accuracy=Avg('accuracy'),
-            text_sessions=Count('id', filter=Q(session_type='text')),
-            code_sessions=Count('id', filter=Q(session_type='code')),
-            perfect_sessions=Count('id', filter=Q(accuracy=100)),
-            high_accuracy_sessions=Count('id', filter=Q(accuracy__gte=95)),
-        )
-        
-        # Competition stats
-        try:
-            from competitions.models import CompetitionParticipant
-            comp_stats = CompetitionParticipant.objects.filter(user=user).aggregate(
-                total_participations=Count('id'),
-                finished_competitions=Count('id', filter=Q(is_finished=True)),
-            )
-        except ImportError:
-            comp_stats = {'total_participations': 0, 'finished_competitions': 0}
-        
-        # Battle stats
-        try:
-            from battles.models import BattleParticipant
-            battle_stats = BattleParticipant.objects.filter(
-                user=user,
-                is_finished=True
-            ).aggregate(
-                total_battles=Count('id'),
-                wins=Count('id', filter=Q(battle__winner=user)),
-            )
-        except ImportError:
-            battle_stats = {'total_battles': 0, 'wins': 0}
-        
-        # Get active badges
-        badges = Badge.objects.filter(is_active=True)
-        
-        for badge in badges:
-            # Skip if already earned
-            if UserBadge.objects.filter(user=user, badge=badge).exists():
-                continue
-            
-            # Check requirements
-            req = badge.requirement
-            earned = False
-            progress = 0
-            
-            if badge.badge_type == 'speed':
-                if 'wpm' in req:
-                    if stats['max_wpm'] and stats['max_wpm'] >= req['wpm']:
-                        earned = True
-                    else:
-                        progress = int((stats['max_wpm'] or 0) / req['wpm'] * 100) if req['wpm'] > 0 else 0
-                        
-            elif badge.badge_type == 'accuracy':
-                if 'accuracy' in req:
-                    if stats['avg_accuracy'] and stats['avg_accuracy'] >= req['accuracy']:
-                        earned = True
-                    else:
-                        progress = int((stats['avg_accuracy'] or 0) / req['accuracy'] * 100) if req['accuracy'] > 0 else 0
-                elif 'perfect_sessions' in req:
-                    if stats['perfect_sessions'] and stats['perfect_sessions'] >= req['perfect_sessions']:
-                        earned = True
-                    else:
-                        progress = int((stats['perfect_sessions'] or 0) / req['perfect_sessions'] * 100) if req['perfect_sessions'] > 0 else 0
-                        
-            elif badge.badge_type == 'streak':
-                if 'days' in req:
-                    if profile.current_streak >= req['days']:
-                        earned = True
-                    else:
-                        progress = int((profile.current_streak / req['days']) * 100) if req['days'] > 0 else 0
-                        
-            elif badge.badge_type == 'milestone':
-                if 'sessions' in req:
-                    if stats['total_sessions'] >= req['sessions']:
-                        earned = True
-                    else:
-                        progress = int((stats['total_sessions'] / req['sessions']) * 100) if req['sessions'] > 0 else 0
-                elif 'text_sessions' in req:
-                    if stats['text_sessions'] >= req['text_sessions']:
-                        earned = True
-                    else:
-                        progress = int((stats['text_sessions'] / req['text_sessions']) * 100) if req['text_sessions'] > 0 else 0
-                elif 'code_sessions' in req:
-                    if stats['code_sessions'] >= req['code_sessions']:
-                        earned = True
-                    else:
-                        progress = int((stats['code_sessions'] / req['code_sessions']) * 100) if req['code_sessions'] > 0 else 0
-                        
-            elif badge.badge_type == 'consistency':
-                if 'practice_days' in req:
-                    if profile.total_practice_days >= req['practice_days']:
-                        earned = True
-                    else:
-                        progress = int((profile.total_practice_days / req['practice_days']) * 100) if req['practice_days'] > 0 else 0
-            
-            elif badge.badge_type == 'competition':
-                if 'first_place' in req:
-                    # Check if user has first place in any competition
-                    # Simplified: check if user has highest result_wpm in any competition
-                    try:
-                        from competitions.models import CompetitionParticipant
-                        first_places = CompetitionParticipant.objects.filter(
-                            user=user,
-                            is_finished=True
-                        ).order_by('-result_wpm').first()
-                        if first_places and first_places.result_wpm:
-                            # Check if this is the highest in that competition
-                            competition = first_places.competition
-                            highest = CompetitionParticipant.objects.filter(
-                                competition=competition,
-                                is_finished=True
-                            ).order_by('-result_wpm').first()
-                            if highest and highest.user == user:
-                                earned = True
-                    except:
-                        pass
-                    progress = 0
-                elif 'second_place' in req:
-                    # Similar logic for second place
-                    progress = 0
-                elif 'third_place' in req:
-                    # Similar logic for third place
-                    progress = 0
-                elif 'participations' in req:
-                    if comp_stats['total_participations'] >= req['participations']:
-                        earned = True
-                    else:
-                        progress = int((comp_stats['total_participations'] / req['participations']) * 100) if req['participations'] > 0 else 0
-                elif 'wins' in req:
-                    # Simplified: count finished competitions as wins for now
-                    wins = comp_stats['finished_competitions']
-                    if wins >= req['wins']:
-                        earned = True
-                    else:
-                        progress = int((wins / req['wins']) * 100) if req['wins'] > 0 else 0
-            
-            elif badge.badge_type == 'battle':
-                if 'battle_wins' in req:
-                    if battle_stats['wins'] and battle_stats['wins'] >= req['battle_wins']:
-                        earned = True
-                    else:
-                        progress = int((battle_stats['wins'] or 0) / req['battle_wins'] * 100) if req['battle_wins'] > 0 else 0
-                elif 'battles' in req:
-                    if battle_stats['total_battles'] and battle_stats['total_battles'] >= req['battles']:
-                        earned = True
-                    else:
-                        progress = int((battle_stats['total_battles'] or 0) / req['battles'] * 100) if req['battles'] > 0 else 0
-            
-            elif badge.badge_type == 'special':
-                # Special badges require custom logic
-                if 'perfect_week' in req:
-                    # Check if user completed all daily challenges in a week
-                    try:
-                        from .models import ChallengeCompletion, DailyChallenge
-                        from datetime import timedelta
-                        today = timezone.now().date()
-                        week_start = today - timedelta(days=7)
-                        week_challenges = DailyChallenge.objects.filter(date__gte=week_start, date__lte=today)
-                        completed = ChallengeCompletion.objects.filter(
-                            user=user,
-                            challenge__in=week_challenges
-                        ).count()
-                        if completed >= week_challenges.count() and week_challenges.count() >= 7:
-                            earned = True
-                    except:
-                        pass
-                    progress = 0
-                elif 'early_completion' in req:
-                    # Check early morning completions (before 10 AM)
-                    # This would need to be tracked separately
-                    progress = 0
-                elif 'late_completion' in req:
-                    # Check late night completions (after 10 PM)
-                    # This would need to be tracked separately
-                    progress = 0
-                elif 'comebacks' in req:
-                    # Track streak breaks and restarts
-                    # This would need to be tracked separately
-                    progress = 0
-            
-            # Award badge if earned
-            if earned:
-                UserBadge.objects.get_or_create(
-                    user=user,
-                    badge=badge,
-                    defaults={'progress': 100}
-                )
-                
-                # Award XP
-                level_info, created = UserLevel.objects.get_or_create(user=user)
-                level_up, new_level = level_info.add_xp(badge.xp_reward)
-                
-                # Create notification
-                Notification.objects.create(
-                    user=user,
-                    notification_type='badge',
-                    title=f'Yangi badge: {badge.name}',
-                    message=f'{badge.icon} {badge.description}',
-                    icon=badge.icon,
-                    link='/accounts/profile/'
-                )
-                
-                # Notify level up if happened
-                if level_up:
-                    Notification.objects.create(
-                        user=user,
-                        notification_type='level_up',
-                        title=f'Level {new_level} ga yetdingiz!',
-                        message=f'🎉 Tabriklaymiz! Siz Level {new_level} ga yetdingiz!',
-                        icon='🎉',
-                        link='/dashboard/'
-                    )
-                
-                logger.info(f"Badge awarded: {user.username} earned {badge.name} (Level up: {level_up})")
-                
-                return {
-                    'badge': badge,
-                    'level_up': level_up,
-                    'new_level': new_level,
-                    'xp_gained': badge.xp_reward
-                }
-            else:
-                # Update progress if badge not earned yet
-                user_badge, created = UserBadge.objects.get_or_create(
-                    user=user,
-                    badge=badge,
-                    defaults={'progress': progress}
-                )
-                if not created:
-                    user_badge.update_progress(min(100, progress))
-        
+        entries = []
+        for result in results:
+            typed_chars = getattr(result, 'typed_chars', None)
+            content = result.code_snippet if result.code_snippet_id else result.text if result.text_id else None
+            if typed_chars and content is not None:
+                entries.append((result.mistakes_list, content.get_normalized_body()[:typed_chars], result.session_type))
+        return ErrorProfile.record(user.id, entries)
+    except Exception as e:
+        if raise_errors:
+            raise
+        logger.error(f"Error updating error profile for user {user.username}: {e}", exc_info=True)
+        return None
+
+
+def check_and_award_badges(user, result=None, raise_errors=False):
+    """Check if user qualifies for any badges and award all of them at once"""
+    try:
+        return award_badges(user)
+    except UserProfile.DoesNotExist:
+        logger.warning(f"UserProfile not found for user {user.username}")
         return None
-        
     except Exception as e:
+        if raise_errors:
+            raise
         logger.error(f"Error checking badges for user {user.username}: {e}", exc_info=True)
         return None
 
 
-def calculate_xp_for_result(result):
+def calculate_xp_for_result(result, profile=None, previous_best=None):
     """Calculate XP reward for a practice result with improved multipliers"""
     base_xp = 10
     
@@ -340,7 +126,8 @@ def calculate_xp_for_result(result):
     
     # Streak bonus
     try:
-        profile = UserProfile.objects.get(user=result.user)
+        if profile is None:
+            profile = UserProfile.objects.get(user=result.user)
         streak_bonus = min(profile.current_streak * 0.1, 1.0)  # Max 100% bonus
     except:
         streak_bonus = 0
@@ -352,9 +139,12 @@ def calculate_xp_for_result(result):
     total_xp = int(base_xp * wpm_multiplier * accuracy_multiplier * (1 + streak_bonus) * session_bonus)
     
     # Record bonus (if this is a new personal best)
-    user_results = UserResult.objects.filter(user=result.user)
-    max_wpm = user_results.aggregate(max_wpm=Max('wpm'))['max_wpm']
-    if result.wpm == max_wpm and result.wpm > 0:
+    if previous_best is None:
+        # No baseline given: UserStats already includes this result
+        is_record = result.wpm == UserStats.for_user(result.user).max_wpm
+    else:
+        is_record = result.wpm > previous_best
+    if is_record and result.wpm > 0:
         total_xp += 50  # New record!
     
     return total_xp
@@ -362,9 +152,22 @@ def calculate_xp_for_result(result):
 
 def award_xp_for_practice(user, result):
     """Award XP for completing a practice"""
+    return award_xp_for_results(user, [result])
+
+
+def award_xp_for_results(user, results, raise_errors=False, previous_best=None):
+    """
+    Award XP for one or more completed practices with a single level update.
+    previous_best is the best WPM before these results (read from UserStats when not given).
+    """
     try:
         level_info, created = UserLevel.objects.get_or_create(user=user)
-        xp_amount = calculate_xp_for_result(result)
+        profile = UserProfile.objects.get(user=user)
+        best = UserStats.for_user(user).max_wpm if previous_best is None else previous_best
+        xp_amount = 0
+        for result in results:
+            xp_amount += calculate_xp_for_result(result, profile, best)
+            best = max(best, result.wpm or 0)
         old_level = level_info.level
         level_up, new_level = level_info.add_xp(xp_amount)
         
@@ -380,7 +183,6 @@ def award_xp_for_practice(user, result):
             )
         
         # Check streak milestones
-        profile = UserProfile.objects.get(user=user)
         if profile.current_streak in [7, 14, 30, 60, 100]:
             Notification.objects.create(
                 user=user,
@@ -400,12 +202,32 @@ def award_xp_for_practice(user, result):
             'next_level_xp': level_info.get_xp_for_next_level()
         }
     except Exception as e:
+        if raise_errors:
+            raise
         logger.error(f"Error awarding XP for user {user.username}: {e}", exc_info=True)
         return None
 
 
 def check_daily_challenge(user, result):
     """Check if user completed today's challenge"""
+    return check_daily_challenge_for_results(user, [result])
+
+
+def _completes_challenge(challenge, result):
+    """Whether a single result satisfies the challenge target"""
+    if challenge.challenge_type == 'speed':
+        return bool(challenge.target_wpm and result.wpm >= challenge.target_wpm)
+    elif challenge.challenge_type == 'accuracy':
+        return bool(challenge.target_accuracy and result.accuracy >= challenge.target_accuracy)
+    elif challenge.challenge_type in ('code', 'text'):
+        return result.session_type == challenge.challenge_type and bool(
+            challenge.target_wpm and result.wpm >= challenge.target_wpm
+        )
+    return False
+
+
+def check_daily_challenge_for_results(user, results, raise_errors=False):
+    """Check today's challenge once for one or more results (first qualifying result completes it)"""
     try:
         today = timezone.now().date()
         challenge, created = DailyChallenge.objects.get_or_create(
@@ -424,24 +246,9 @@ def check_daily_challenge(user, result):
         if ChallengeCompletion.objects.filter(user=user, challenge=challenge).exists():
             return None
         
-        completed = False
-        
-        if challenge.challenge_type == 'speed':
-            if challenge.target_wpm and result.wpm >= challenge.target_wpm:
-                completed = True
-        elif challenge.challenge_type == 'accuracy':
-            if challenge.target_accuracy and result.accuracy >= challenge.target_accuracy:
-                completed = True
-        elif challenge.challenge_type == 'code':
-            if result.session_type == 'code':
-                if challenge.target_wpm and result.wpm >= challenge.target_wpm:
-                    completed = True
-        elif challenge.challenge_type == 'text':
-            if result.session_type == 'text':
-                if challenge.target_wpm and result.wpm >= challenge.target_wpm:
-                    completed = True
+        result = next((r for r in results if _completes_challenge(challenge, r)), None)
         
-        if completed:
+        if result is not None:
             # Award completion
             level_info, _ = UserLevel.objects.get_or_create(user=user)
             level_up, new_level = level_info.add_xp(challenge.reward_xp)
@@ -476,6 +283,8 @@ def check_daily_challenge(user, result):
         return None
         
     except Exception as e:
+        if raise_errors:
+            raise
         logger.error(f"Error checking challenge completion: {e}", exc_info=True)
         return None
 
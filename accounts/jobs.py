@@ -0,0 +1,201 @@
+"""
+DB-backed gamification job queue.
+
+save_result only inserts the UserResult; the post_save signal enqueues a GamificationEvent
+in the same transaction and run_gamification_worker applies streak/XP/badge/challenge
+updates out of band. Events of one user are processed strictly in insertion order.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min, Subquery
+from django.utils import timezone
+from .models import GamificationEvent
+import logging
+
+logger = logging.getLogger('typing_platform')
+
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 10
+STALE_LOCK_SECONDS = 300  # processing events older than this are considered abandoned
+
+
+def is_async_enabled():
+    return getattr(settings, 'GAMIFICATION_ASYNC', True)
+
+
+def _result_payload(result):
+    return {
+        'result_id': result.id,
+        'wpm': result.wpm,
+        'accuracy': result.accuracy,
+        'mistakes': result.mistakes,
+        'session_type': result.session_type,
+        'duration_seconds': result.duration_seconds,
+        'typed_chars': getattr(result, 'typed_chars', None),
+    }
+
+
+def previous_best(user_id):
+    """User's best WPM so far; read before the new results are folded into UserStats"""
+    from typing_practice.models import UserStats
+    return UserStats.objects.filter(user_id=user_id).values_list('max_wpm', flat=True).first() or 0
+
+
+def enqueue_result_event(result):
+    """Queue gamification processing for a freshly created UserResult (post_save, before UserStats is updated)"""
+    return GamificationEvent.objects.create(
+        user_id=result.user_id,
+        event_type='result',
+        payload={**_result_payload(result), 'previous_best': previous_best(result.user_id)},
+    )
+
+
+def enqueue_result_batch_event(user, results, best=None):
+    """Queue one gamification event for results inserted together with bulk_create"""
+    return GamificationEvent.objects.create(
+        user=user,
+        event_type='result_batch',
+        payload={
+            'results': [_result_payload(result) for result in results],
+            'previous_best': previous_best(user.id) if best is None else best,
+        },
+    )
+
+
+def run_result_pipeline(user, result, raise_errors=False, best=None):
+    """Streak, XP, badges and daily challenge for one result (the old synchronous signal chain)"""
+    run_result_batch_pipeline(user, [result], raise_errors=raise_errors, best=best)
+
+
+def run_result_batch_pipeline(user, results, raise_errors=False, best=None):
+    """
+    Streak, XP, badges and daily challenge evaluated once for a group of results.
+    `best` is the user's best WPM before these results (the personal-record baseline).
+    The inline (GAMIFICATION_ASYNC=False) path logs and swallows failures; the worker passes
+    raise_errors=True so a failing step rolls the event back and schedules a retry.
+    """
+    from .gamification import (
+        update_streak, award_xp_for_results, check_and_award_badges, check_daily_challenge_for_results,
+        update_error_profile,
+    )
+    update_error_profile(user, results, raise_errors=raise_errors)
+    update_streak(user, raise_errors=raise_errors)
+    award_xp_for_results(user, results, raise_errors=raise_errors, previous_best=best)
+    check_and_award_badges(user, raise_errors=raise_errors)
+    check_daily_challenge_for_results(user, results, raise_errors=raise_errors)
+
+
+def dispatch_result_batch(user, results, best=None):
+    """Gamification for bulk-inserted results (post_save does not fire for bulk_create)"""
+    if is_async_enabled():
+        enqueue_result_batch_event(user, results, best)
+    else:
+        run_result_batch_pipeline(user, results, best=best)
+
+
+def _load_results(user, payloads):
+    """Result rows for payloads (one query); unsaved stand-ins for rows already deleted"""
+    from typing_practice.models import UserResult
+    existing = UserResult.objects.select_related('text', 'code_snippet').in_bulk(
+        [payload.get('result_id') for payload in payloads if payload.get('result_id')]
+    )
+    results = []
+    for payload in payloads:
+        result = existing.get(payload.get('result_id'))
+        if result is None:
+            result = UserResult(
+                user=user,
+                wpm=payload.get('wpm', 0),
+                accuracy=payload.get('accuracy', 0),
+                mistakes=payload.get('mistakes', 0),
+                session_type=payload.get('session_type', 'text'),
+                duration_seconds=payload.get('duration_seconds', 0),
+            )
+        result.typed_chars = payload.get('typed_chars')
+        results.append(result)
+    return results
+
+
+def process_event(event):
+    """Apply one event. Exceptions propagate so the caller can schedule a retry."""
+    best = event.payload.get('previous_best')
+    if event.event_type == 'result':
+        run_result_pipeline(event.user, _load_results(event.user, [event.payload])[0], raise_errors=True, best=best)
+    elif event.event_type == 'result_batch':
+        results = _load_results(event.user, event.payload.get('results', []))
+        if results:
+            run_result_batch_pipeline(event.user, results, raise_errors=True, best=best)
+    else:
+        raise ValueError(f"Unknown gamification event type: {event.event_type}")
+
+
+def release_stale_locks():
+    """Return events left in 'processing' by a crashed worker to the queue"""
+    cutoff = timezone.now() - timedelta(seconds=STALE_LOCK_SECONDS)
+    return GamificationEvent.objects.filter(status='processing', locked_at__lt=cutoff).update(
+        status='pending', locked_at=None
+    )
+
+
+def claim_events(batch_size=50):
+    """
+    Lock up to batch_size runnable events, at most one per user.
+    An event is runnable only if it is the oldest unfinished event of its user,
+    which keeps per-user ordering even when several workers run. Candidates are those
+    per-user heads, so one user's backlog cannot crowd other users out of a batch.
+    """
+    now = timezone.now()
+    heads = (
+        GamificationEvent.objects.filter(status__in=['pending', 'processing'])
+        .order_by().values('user_id').annotate(first_id=Min('id')).values('first_id')
+    )
+    with transaction.atomic():
+        claimed = list(
+            GamificationEvent.objects.select_for_update(skip_locked=True)
+            .filter(id__in=Subquery(heads), status='pending', available_at__lte=now)
+            .order_by('id')[:batch_size]
+        )
+        if claimed:
+            GamificationEvent.objects.filter(id__in=[event.id for event in claimed]).update(
+                status='processing', locked_at=now
+            )
+    return claimed
+
+
+def _mark_failed(event, error):
+    event.attempts += 1
+    event.last_error = str(error)[:2000]
+    event.locked_at = None
+    if event.attempts >= MAX_ATTEMPTS:
+        event.status = 'failed'
+        logger.error(f"Gamification event {event.id} failed permanently: {error}")
+    else:
+        event.status = 'pending'
+        event.available_at = timezone.now() + timedelta(seconds=RETRY_BASE_SECONDS * (2 ** (event.attempts - 1)))
+        logger.warning(f"Gamification event {event.id} failed (attempt {event.attempts}), will retry: {error}")
+    event.save(update_fields=['attempts', 'last_error', 'locked_at', 'status', 'available_at'])
+
+
+def run_pending(batch_size=50):
+    """Claim and process one batch. Returns number of processed events."""
+    release_stale_locks()
+    events = claim_events(batch_size)
+    for event in events:
+        try:
+            # 'done' commits together with the event's effects, so a crash can never re-apply them
+            with transaction.atomic():
+                process_event(event)
+                GamificationEvent.objects.filter(id=event.id).update(
+                    status='done', processed_at=timezone.now(), locked_at=None
+                )
+        except Exception as e:
+            _mark_failed(event, e)
+    return len(events)
+
+
+def purge_done_events(days=7):
+    """Delete processed events older than `days` days"""
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = GamificationEvent.objects.filter(status='done', processed_at__lt=cutoff).delete()
+    return deleted
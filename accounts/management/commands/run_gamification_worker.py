@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from accounts.jobs import run_pending, purge_done_events
+import time
+import logging
+
+logger = logging.getLogger('typing_platform')
+
+
+class Command(BaseCommand):
+    help = 'Process queued gamification events (streaks, XP, badges, daily challenges)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Number of events claimed per batch (default: 50)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1.0,
+            help='Seconds to wait when the queue is empty (default: 1)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the queue once and exit',
+        )
+        parser.add_argument(
+            '--purge-days',
+            type=int,
+            default=7,
+            help='Delete processed events older than this many days (default: 7)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        purged = purge_done_events(options['purge_days'])
+        if purged:
+            self.stdout.write(f'Purged {purged} processed event(s)')
+
+        total = 0
+        self.stdout.write(self.style.SUCCESS('Gamification worker started'))
+        try:
+            while True:
+                processed = run_pending(batch_size)
+                total += processed
+                if processed:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {total} event(s)'))
+        logger.info(f'Gamification worker stopped after {total} event(s)')
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_gamificationevent'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gamificationevent',
+            name='event_type',
+            field=models.CharField(choices=[('result', 'Mashq natijasi'), ('result_batch', "Natijalar to'plami")], default='result', max_length=20),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.contrib.auth.models import User
 from django.db import models
 from django.core.files.base import ContentFile
+from django.utils import timezone
 from io import BytesIO
 import os
 import logging
@@ -169,17 +170,22 @@ class UserBadge(models.Model):
             models.Index(fields=['user', '-earned_at']),
         ]
     
+    def apply_progress(self, new_progress):
+        """Record higher progress in memory (no save). Returns True if changed."""
+        if new_progress <= self.progress:
+            return False
+        if not self.progress_history:
+            self.progress_history = []
+        self.progress_history.append({
+            'progress': new_progress,
+            'timestamp': timezone.now().isoformat()
+        })
+        self.progress = min(100, new_progress)
+        return True
+    
     def update_progress(self, new_progress):
         """Update progress and save history"""
-        from django.utils import timezone
-        if new_progress > self.progress:
-            if not self.progress_history:
-                self.progress_history = []
-            self.progress_history.append({
-                'progress': new_progress,
-                'timestamp': timezone.now().isoformat()
-            })
-            self.progress = min(100, new_progress)
+        if self.apply_progress(new_progress):
             self.save()
     
     def __str__(self):
@@ -328,4 +334,39 @@ class Notification(models.Model):
     def mark_all_read(cls, user):
         """Mark all unread notifications as read for a user"""
         count = cls.objects.filter(user=user, is_read=False).update(is_read=True)
-        return count
\ No newline at end of file
+        return count
+
+class GamificationEvent(models.Model):
+    """Durable queue of gamification work (streak, XP, badges, challenges) processed by run_gamification_worker"""
+    EVENT_TYPE_CHOICES = [
+        ('result', 'Mashq natijasi'),
+        ('result_batch', 'Natijalar to\'plami'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'Kutilmoqda'),
+        ('processing', 'Bajarilmoqda'),
+        ('done', 'Bajarildi'),
+        ('failed', 'Xatolik'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='gamification_events')
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPE_CHOICES, default='result')
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now, help_text="Qayta urinish vaqti")
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'id']),
+            models.Index(fields=['user', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.event_type} ({self.status})"
@@ -3,7 +3,7 @@ from django.contrib.auth.models import User
 from django.dispatch import receiver
 from .models import UserProfile, UserLevel
 from typing_practice.models import UserResult
-from .gamification import update_streak, award_xp_for_practice, check_and_award_badges, check_daily_challenge
+from .jobs import is_async_enabled, enqueue_result_event, run_result_pipeline
 
 
 @receiver(post_save, sender=User)
@@ -26,15 +26,8 @@ def save_user_profile(sender, instance, **kwargs):
 def handle_user_result(sender, instance, created, **kwargs):
     """Handle gamification when user completes a practice"""
     if created:
-        # Update streak
-        update_streak(instance.user)
-        
-        # Award XP
-        award_xp_for_practice(instance.user, instance)
-        
-        # Check for badges
-        check_and_award_badges(instance.user, instance)
-        
-        # Check daily challenge
-        check_daily_challenge(instance.user, instance)
-
+        if is_async_enabled():
+            # Processed out of band by run_gamification_worker
+            enqueue_result_event(instance)
+        else:
+            run_result_pipeline(instance.user, instance)
@@ -0,0 +1,80 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from typing_practice.models import UserResult
+from .models import Badge, UserBadge, UserLevel, Notification
+from .gamification import check_and_award_badges
+from .badge_rules import build_badge_index
+
+User = get_user_model()
+
+
+class BadgeRuleEngineTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='tester', password='pass')
+        for wpm in (40, 45, 50):
+            UserResult.objects.create(user=self.user, wpm=wpm, accuracy=96, session_type='text')
+
+    def create_badge(self, name, badge_type, requirement, xp_reward=10):
+        return Badge.objects.create(
+            name=name, description=name, badge_type=badge_type,
+            requirement=requirement, xp_reward=xp_reward,
+        )
+
+    def count_queries(self, user):
+        with CaptureQueriesContext(connection) as ctx:
+            check_and_award_badges(user)
+        return len(ctx.captured_queries)
+
+    def test_awards_every_qualifying_badge_at_once(self):
+        self.create_badge('Speed 40', 'speed', {'wpm': 40}, xp_reward=20)
+        self.create_badge('Speed 50', 'speed', {'wpm': 50}, xp_reward=30)
+        self.create_badge('Speed 100', 'speed', {'wpm': 100})
+        self.create_badge('Accurate', 'accuracy', {'accuracy': 95})
+
+        result = check_and_award_badges(self.user)
+
+        self.assertEqual({b.name for b in result['badges']}, {'Speed 40', 'Speed 50', 'Accurate'})
+        self.assertEqual(result['xp_gained'], 60)
+        self.assertEqual(UserLevel.objects.get(user=self.user).total_xp, 60)
+        self.assertEqual(Notification.objects.filter(user=self.user, notification_type='badge').count(), 3)
+        self.assertEqual(UserBadge.objects.get(user=self.user, badge__name='Speed 100').progress, 50)
+
+        # Nothing new on the second run
+        self.assertIsNone(check_and_award_badges(self.user))
+        self.assertEqual(UserLevel.objects.get(user=self.user).total_xp, 60)
+
+    def test_progress_row_is_promoted_when_earned(self):
+        badge = self.create_badge('Speed 80', 'speed', {'wpm': 80})
+        check_and_award_badges(self.user)
+        self.assertEqual(UserBadge.objects.get(user=self.user, badge=badge).progress, 62)
+
+        UserResult.objects.create(user=self.user, wpm=85, accuracy=96, session_type='text')
+        result = check_and_award_badges(self.user)
+        self.assertEqual(result['badges'], [badge])
+        user_badge = UserBadge.objects.get(user=self.user, badge=badge)
+        self.assertEqual(user_badge.progress, 100)
+        self.assertEqual([h['progress'] for h in user_badge.progress_history], [100])
+
+    def test_query_count_does_not_grow_with_badges(self):
+        other = User.objects.create_user(username='other', password='pass')
+        UserResult.objects.create(user=other, wpm=45, accuracy=96, session_type='text')
+
+        for i in range(3):
+            self.create_badge(f'Speed {i}', 'speed', {'wpm': 20 + i})
+            self.create_badge(f'Sessions {i}', 'milestone', {'sessions': 1 + i * 10})
+        few = self.count_queries(self.user)
+
+        for i in range(3, 30):
+            self.create_badge(f'Speed {i}', 'speed', {'wpm': 20 + i})
+            self.create_badge(f'Sessions {i}', 'milestone', {'sessions': 1 + i * 10})
+        many = self.count_queries(other)
+
+        self.assertEqual(few, many)
+
+    def test_index_uses_requirement_key_priority(self):
+        badge = self.create_badge('Perfectionist', 'accuracy', {'perfect_sessions': 10, 'accuracy': 100})
+        unknown = self.create_badge('Unknown', 'speed', {'cpm': 300})
+        index = build_badge_index([badge, unknown])
+        self.assertEqual(list(index), [('accuracy', 'accuracy')])
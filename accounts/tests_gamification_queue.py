@@ -0,0 +1,95 @@
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from typing_practice.models import UserResult
+from .models import GamificationEvent, UserLevel
+from .jobs import claim_events, run_pending, MAX_ATTEMPTS
+
+User = get_user_model()
+
+
+class GamificationQueueTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='tester', password='pass')
+
+    def create_result(self, wpm=40):
+        return UserResult.objects.create(user=self.user, wpm=wpm, accuracy=98, session_type='text')
+
+    def test_result_is_queued_not_processed_inline(self):
+        result = self.create_result()
+        event = GamificationEvent.objects.get(user=self.user)
+        self.assertEqual(event.status, 'pending')
+        self.assertEqual(event.payload['result_id'], result.id)
+        self.assertEqual(UserLevel.objects.get(user=self.user).total_xp, 0)
+
+    def test_worker_processes_events_and_awards_xp(self):
+        self.create_result()
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(GamificationEvent.objects.get(user=self.user).status, 'done')
+        self.assertGreater(UserLevel.objects.get(user=self.user).total_xp, 0)
+
+    def test_one_event_per_user_is_claimed_in_order(self):
+        self.create_result()
+        self.create_result()
+        first, second = GamificationEvent.objects.order_by('id')
+        self.assertEqual([e.id for e in claim_events()], [first.id])
+        # Second event stays blocked while the first is processing
+        self.assertEqual(claim_events(), [])
+        GamificationEvent.objects.filter(id=first.id).update(status='done')
+        self.assertEqual([e.id for e in claim_events()], [second.id])
+
+    def test_one_users_backlog_does_not_starve_others(self):
+        GamificationEvent.objects.bulk_create([GamificationEvent(user=self.user, payload={}) for _ in range(30)])
+        other = User.objects.create_user(username='other', password='pass')
+        late = GamificationEvent.objects.create(user=other, payload={})
+        claimed = claim_events(batch_size=2)
+        self.assertEqual([e.user_id for e in claimed], [self.user.id, other.id])
+        self.assertEqual(claimed[1].id, late.id)
+
+    def test_record_bonus_uses_the_best_at_enqueue_time(self):
+        self.create_result(wpm=50)
+        self.create_result(wpm=60)  # both processed after UserStats.max_wpm is already 60
+        first, second = GamificationEvent.objects.order_by('id')
+        self.assertEqual((first.payload['previous_best'], second.payload['previous_best']), (0, 50))
+        with mock.patch('accounts.gamification.calculate_xp_for_result', return_value=10) as calculate:
+            run_pending()
+            run_pending()
+        self.assertEqual([c.args[2] for c in calculate.call_args_list], [0, 50])
+
+    def test_failed_event_is_retried_then_marked_failed(self):
+        self.create_result()
+        with mock.patch('accounts.jobs.process_event', side_effect=RuntimeError('boom')):
+            run_pending()
+            event = GamificationEvent.objects.get(user=self.user)
+            self.assertEqual(event.status, 'pending')
+            self.assertEqual(event.attempts, 1)
+            for _ in range(MAX_ATTEMPTS - 1):
+                GamificationEvent.objects.filter(id=event.id).update(available_at=event.created_at)
+                run_pending()
+        event.refresh_from_db()
+        self.assertEqual(event.status, 'failed')
+        self.assertIn('boom', event.last_error)
+
+    def test_failing_pipeline_step_rolls_back_and_schedules_a_retry(self):
+        self.create_result()
+        with mock.patch('accounts.gamification.award_badges', side_effect=RuntimeError('badge db down')):
+            run_pending()
+        event = GamificationEvent.objects.get(user=self.user)
+        self.assertEqual((event.status, event.attempts), ('pending', 1))
+        self.assertGreater(event.available_at, timezone.now())
+        self.assertIn('badge db down', event.last_error)
+        # XP awarded before the failing step was rolled back with the event
+        self.assertEqual(UserLevel.objects.get(user=self.user).total_xp, 0)
+
+        GamificationEvent.objects.filter(id=event.id).update(available_at=timezone.now())
+        run_pending()
+        self.assertEqual(GamificationEvent.objects.get(id=event.id).status, 'done')
+        self.assertGreater(UserLevel.objects.get(user=self.user).total_xp, 0)
+
+    @override_settings(GAMIFICATION_ASYNC=False)
+    def test_inline_pipeline_still_swallows_failures(self):
+        with mock.patch('accounts.gamification.award_badges', side_effect=RuntimeError('boom')):
+            self.create_result()
+        self.assertFalse(GamificationEvent.objects.exists())
+        self.assertGreater(UserLevel.objects.get(user=self.user).total_xp, 0)
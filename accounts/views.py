@@ -5,17 +5,17 @@ from django.contrib.auth.models import User
 from django.contrib.auth.views import PasswordResetView, PasswordResetConfirmView, PasswordResetDoneView, PasswordResetCompleteView
 from django.contrib import messages
 from django.utils.translation import gettext_lazy as _
-from django.db.models import Avg, Max, Count, Sum
+from django.db.models import Count, Sum
 from django.utils import timezone
 from django.utils.safestring import mark_safe
 from django.http import HttpResponseRedirect
 from django.urls import reverse_lazy
 from datetime import timedelta
-from collections import defaultdict
 import json
 from .models import UserProfile, UserLevel, UserBadge, Notification
 from .forms import CustomUserCreationForm, CustomAuthenticationForm, UserProfileForm, PasswordResetRequestForm, PasswordResetConfirmForm
-from typing_practice.models import UserResult
+from typing_practice.models import UserResult, UserStats, ErrorProfile
+from typing_practice.archive import daily_progress
 from competitions.models import CompetitionParticipant
 
 
@@ -113,23 +113,12 @@ def profile_view(request, user_id=None):
     # Get user statistics
     user_results = UserResult.objects.filter(user=profile_user)
     
-    # Overall stats
-    total_sessions = user_results.count()
-    avg_wpm = user_results.aggregate(avg=Avg('wpm'))['avg'] or 0
-    max_wpm = user_results.aggregate(max=Max('wpm'))['max'] or 0
-    avg_accuracy = user_results.aggregate(avg=Avg('accuracy'))['avg'] or 0
+    # Overall and text vs code stats (one row, maintained on save)
+    stats = UserStats.for_user(profile_user)
     
-    # Text vs Code stats
-    text_results = user_results.filter(session_type='text')
-    code_results = user_results.filter(session_type='code')
-    
-    text_avg_wpm = text_results.aggregate(avg=Avg('wpm'))['avg'] or 0
-    code_avg_wpm = code_results.aggregate(avg=Avg('wpm'))['avg'] or 0
-    
-    # Recent activity (last 30 days)
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    recent_results = user_results.filter(time__gte=thirty_days_ago)
-    recent_sessions = recent_results.count()
+    # Recent activity (last 30 days, from daily rollups)
+    progress_days = daily_progress(profile_user, since=timezone.now().date() - timedelta(days=30))
+    recent_sessions = sum(day['total_sessions'] for day in progress_days)
     
     # Best performance
     best_result = user_results.order_by('-wpm').first()
@@ -189,19 +178,9 @@ def profile_view(request, user_id=None):
     earned_badges = UserBadge.objects.filter(user=profile_user).select_related('badge').order_by('-earned_at')
     all_badges = UserBadge.objects.filter(user=profile_user).select_related('badge')
     
-    # Progress data (last 30 days, grouped by date)
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    progress_results = list(user_results.filter(time__gte=thirty_days_ago).order_by('time')[:30])
-    # Group by date and calculate average for same dates
-    wpm_by_date = defaultdict(list)
-    accuracy_by_date = defaultdict(list)
-    for r in progress_results:
-        date_str = r.time.strftime('%d.%m')
-        wpm_by_date[date_str].append(float(r.wpm))
-        accuracy_by_date[date_str].append(float(r.accuracy))
-    
-    wpm_progress = [{'date': date, 'wpm': sum(wpms) / len(wpms)} for date, wpms in wpm_by_date.items()]
-    accuracy_progress = [{'date': date, 'accuracy': sum(accs) / len(accs)} for date, accs in accuracy_by_date.items()]
+    # Progress data (last 30 days, one point per day)
+    wpm_progress = [{'date': day['date'].strftime('%d.%m'), 'wpm': day['avg_wpm']} for day in progress_days]
+    accuracy_progress = [{'date': day['date'].strftime('%d.%m'), 'accuracy': day['avg_accuracy']} for day in progress_days]
     
     # Unread notifications (faqat o'z profilida)
     unread_notifications = []
@@ -210,15 +189,18 @@ def profile_view(request, user_id=None):
         unread_notifications = Notification.objects.filter(user=request.user, is_read=False).order_by('-created_at')[:5]
         unread_count = Notification.get_unread_count(request.user)
     
+    # Weak keys widget (own profile only, precomputed summary)
+    error_summary = ErrorProfile.summary_for(profile_user) if profile_user == request.user else None
+    
     context = {
         'profile_user': profile_user,
         'profile': profile,
-        'total_sessions': total_sessions,
-        'avg_wpm': round(avg_wpm, 2),
-        'max_wpm': round(max_wpm, 2),
-        'avg_accuracy': round(avg_accuracy, 2),
-        'text_avg_wpm': round(text_avg_wpm, 2),
-        'code_avg_wpm': round(code_avg_wpm, 2),
+        'total_sessions': stats.total_sessions,
+        'avg_wpm': round(stats.avg_wpm, 2),
+        'max_wpm': round(stats.max_wpm, 2),
+        'avg_accuracy': round(stats.avg_accuracy, 2),
+        'text_avg_wpm': round(stats.text_avg_wpm, 2),
+        'code_avg_wpm': round(stats.code_avg_wpm, 2),
         'recent_sessions': recent_sessions,
         'best_result': best_result,
         'recent_10': recent_10,
@@ -233,6 +215,7 @@ def profile_view(request, user_id=None):
         # Notifications
         'unread_notifications': unread_notifications,
         'unread_count': unread_count,
+        'error_summary': error_summary,
     }
     
     return render(request, 'accounts/profile.html', context)
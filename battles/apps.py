@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BattlesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'battles'
+
+    def ready(self):
+        import battles.signals
+        import typing_platform.state  # registers the shared state cache deploy check
@@ -0,0 +1,191 @@
+"""
+Channel layer for pushing battle frames between connected players.
+
+The layer fans a message out to every subscriber of a group. The default InMemoryChannelLayer
+works inside one ASGI process: each subscription is an asyncio queue bound to its event
+loop, and publish() is thread-safe, so sync views (running in a worker thread) can publish
+too.
+
+CacheChannelLayer shares groups between processes (several ASGI or WSGI workers) through the
+state cache (typing_platform.state): publish() appends to a numbered per-group message log and
+each subscription polls it every POLL_INTERVAL seconds. It is the default when CACHE_BACKEND=redis.
+"""
+import asyncio
+import logging
+import threading
+from collections import defaultdict, deque
+from django.conf import settings
+from django.utils.module_loading import import_string
+from typing_platform.state import cache as state_cache
+
+logger = logging.getLogger('typing_platform')
+
+SUBSCRIPTION_QUEUE_SIZE = 32
+POLL_INTERVAL = 0.25  # seconds between message log reads of a CacheSubscription
+MESSAGE_TIMEOUT = 60
+GROUP_TIMEOUT = 2 * 3600  # longer than any battle time limit
+
+
+class Subscription:
+    """Queue of messages published to one group, read by one connection"""
+
+    def __init__(self, layer, group, loop):
+        self.layer = layer
+        self.group = group
+        self.loop = loop
+        self.pending = deque()
+        self._ready = asyncio.Event()
+
+    def deliver(self, message):
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # Event loop already closed: the connection is gone
+            self.close()
+
+    def _put(self, message):
+        # Progress frames supersede each other, so a slow reader loses the oldest progress frame.
+        # Other frames ('finished') are never dropped, even past SUBSCRIPTION_QUEUE_SIZE.
+        if len(self.pending) >= SUBSCRIPTION_QUEUE_SIZE:
+            for queued in self.pending:
+                if queued.get('type') == 'progress':
+                    self.pending.remove(queued)
+                    break
+            else:
+                if message.get('type') == 'progress':
+                    return
+        self.pending.append(message)
+        self._ready.set()
+
+    async def get(self):
+        while not self.pending:
+            self._ready.clear()
+            await self._ready.wait()
+        return self.pending.popleft()
+
+    def close(self):
+        self.layer.unsubscribe(self)
+
+
+class InMemoryChannelLayer:
+    """Process-local groups of subscriptions"""
+
+    def __init__(self):
+        self._groups = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, group):
+        """New subscription to the group, bound to the running event loop"""
+        subscription = Subscription(self, group, asyncio.get_running_loop())
+        with self._lock:
+            self._groups[group].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            members = self._groups.get(subscription.group)
+            if members is not None:
+                members.discard(subscription)
+                if not members:
+                    del self._groups[subscription.group]
+
+    def publish(self, group, message):
+        """Send a message to every subscriber of the group; returns how many were reached"""
+        with self._lock:
+            members = list(self._groups.get(group, ()))
+        for subscription in members:
+            subscription.deliver(message)
+        return len(members)
+
+
+class CacheSubscription(Subscription):
+    """Subscription that reads its group's message log from the shared cache"""
+
+    def __init__(self, layer, group, loop, last_seq):
+        super().__init__(layer, group, loop)
+        self.last_seq = last_seq
+        self.missing = None
+
+    async def get(self):
+        while not self.pending:
+            await self.fetch()
+            if not self.pending:
+                await asyncio.sleep(POLL_INTERVAL)
+        return self.pending.popleft()
+
+    async def fetch(self):
+        """Queue the messages published since the last read"""
+        seq = await state_cache.aget(self.layer.seq_key(self.group), 0)
+        if seq < self.last_seq:
+            # The log expired and started over
+            self.last_seq = 0
+        first = max(self.last_seq, seq - SUBSCRIPTION_QUEUE_SIZE) + 1
+        if first > seq:
+            return
+        keys = [self.layer.message_key(self.group, number) for number in range(first, seq + 1)]
+        messages = await state_cache.aget_many(keys)
+        for number, key in zip(range(first, seq + 1), keys):
+            message = messages.get(key)
+            if message is None and number != self.missing:
+                # Numbered but not stored yet: read it on the next poll, skip it if it is still missing then
+                self.missing = number
+                return
+            self.last_seq = number
+            if message is not None:
+                self._put(message)
+
+
+class CacheChannelLayer:
+    """Groups shared by every process through the state cache"""
+
+    def seq_key(self, group):
+        return f'channel:{group}:seq'
+
+    def message_key(self, group, number):
+        return f'channel:{group}:{number}'
+
+    def subscribe(self, group):
+        """New subscription to the group; it gets the messages published from now on"""
+        last_seq = state_cache.get(self.seq_key(group), 0)
+        return CacheSubscription(self, group, asyncio.get_running_loop(), last_seq)
+
+    def unsubscribe(self, subscription):
+        pass
+
+    def publish(self, group, message):
+        """Append a message to the group's log; subscribers are polled, so the count is unknown (None)"""
+        key = self.seq_key(group)
+        try:
+            number = state_cache.incr(key)
+        except ValueError:
+            state_cache.add(key, 0, GROUP_TIMEOUT)
+            number = state_cache.incr(key)
+        state_cache.set(self.message_key(group, number), message, MESSAGE_TIMEOUT)
+        return None
+
+
+_layer = None
+_layer_lock = threading.Lock()
+
+
+def get_channel_layer():
+    """Process-wide layer instance of the BATTLE_CHANNEL_LAYER class"""
+    global _layer
+    if _layer is None:
+        with _layer_lock:
+            if _layer is None:
+                path = getattr(settings, 'BATTLE_CHANNEL_LAYER', 'battles.channel_layer.InMemoryChannelLayer')
+                _layer = import_string(path)()
+    return _layer
+
+
+def battle_group(battle_id):
+    return f'battle-{battle_id}'
+
+
+def publish_battle_event(battle_id, message):
+    """Push a message to the players connected to a battle (never raises)"""
+    try:
+        get_channel_layer().publish(battle_group(battle_id), message)
+    except Exception as e:
+        logger.warning(f"Publishing battle {battle_id} event failed: {e}")
@@ -0,0 +1,148 @@
+"""
+WebSocket endpoint for live battle progress: /ws/battles/<battle_id>/
+
+A plain ASGI application (no Channels dependency), routed from typing_platform.asgi. The
+connection is authenticated once from the session cookie and checked against the battle.
+After that, progress frames a player sends are validated, stored in the live cache
+(battles.live, which checkpoints to the DB at a coarse interval) and relayed through the
+channel layer to the other player's socket. Results are still saved by battle_save_result,
+which publishes a "finished" frame.
+"""
+import asyncio
+import json
+import logging
+import math
+import re
+import time
+from http.cookies import SimpleCookie
+from importlib import import_module
+from types import SimpleNamespace
+from urllib.parse import urlparse
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from .channel_layer import get_channel_layer, battle_group
+from . import live
+
+logger = logging.getLogger('typing_platform')
+
+PATH_PATTERN = re.compile(r'^/ws/battles/(?P<battle_id>\d+)/$')
+MIN_FRAME_INTERVAL = 0.25  # seconds between relayed frames of one connection
+MAX_FRAME_BYTES = 1024
+
+
+def _headers(scope):
+    return {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope.get('headers', [])}
+
+
+def _same_origin(headers):
+    """Reject cross-site sockets (the session cookie is sent along with them)"""
+    origin = headers.get('origin')
+    if not origin:
+        return True
+    return urlparse(origin).netloc == headers.get('host')
+
+
+def _user_from_cookie(cookie_header):
+    from django.contrib.auth import get_user
+    cookie = SimpleCookie()
+    cookie.load(cookie_header or '')
+    morsel = cookie.get(settings.SESSION_COOKIE_NAME)
+    if morsel is None:
+        return None
+    session = import_module(settings.SESSION_ENGINE).SessionStore(morsel.value)
+    user = get_user(SimpleNamespace(session=session))
+    return user if user.is_authenticated else None
+
+
+def _authorize(cookie_header, battle_id):
+    """(user, opponent live state) when the cookie's user plays this active battle, else None"""
+    user = _user_from_cookie(cookie_header)
+    if user is None:
+        return None
+    meta = live.battle_meta(battle_id)
+    if meta is None or meta['status'] != 'active' or not live.is_player(meta, user.id):
+        return None
+    return user, live.get_progress(battle_id, live.opponent_id(meta, user.id))
+
+
+def _finite(data, key):
+    """Numeric field of a frame; json.loads accepts NaN, Infinity and 1e400, which are rejected"""
+    value = float(data.get(key, 0))
+    if not math.isfinite(value):
+        raise ValueError(f'{key} is not a finite number')
+    return value
+
+
+def progress_frame(data, user):
+    """Validated progress frame from a client message; raises ValueError"""
+    from typing_practice.utils import validate_wpm, validate_accuracy
+    if not isinstance(data, dict) or data.get('type') != 'progress':
+        raise ValueError('unknown frame')
+    return {
+        'type': 'progress',
+        'user_id': user.id,
+        'wpm': validate_wpm(_finite(data, 'wpm')),
+        'accuracy': validate_accuracy(_finite(data, 'accuracy')),
+        'mistakes': max(0, int(_finite(data, 'mistakes'))),
+        'progress': min(100.0, max(0.0, _finite(data, 'progress'))),
+    }
+
+
+async def battle_progress(scope, receive, send):
+    """ASGI application for one battle progress socket"""
+    match = PATH_PATTERN.match(scope.get('path', ''))
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    headers = _headers(scope)
+    if match is None or not _same_origin(headers):
+        await send({'type': 'websocket.close', 'code': 4403})
+        return
+    battle_id = int(match['battle_id'])
+    access = await sync_to_async(_authorize)(headers.get('cookie'), battle_id)
+    if access is None:
+        await send({'type': 'websocket.close', 'code': 4403})
+        return
+    user, opponent = access
+
+    subscription = get_channel_layer().subscribe(battle_group(battle_id))
+    await send({'type': 'websocket.accept'})
+    if opponent:
+        await send({'type': 'websocket.send', 'text': json.dumps({
+            'type': 'finished' if opponent['is_finished'] else 'progress',
+            'wpm': opponent['wpm'],
+            'progress': opponent['progress'],
+        })})
+
+    async def relay_to_client():
+        while True:
+            event = await subscription.get()
+            # Players only need the other side's frames
+            if event.get('user_id') == user.id:
+                continue
+            await send({'type': 'websocket.send', 'text': json.dumps(event)})
+
+    writer = asyncio.ensure_future(relay_to_client())
+    last_frame = 0.0
+    try:
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+            if message['type'] != 'websocket.receive':
+                continue
+            text = message.get('text') or ''
+            now = time.monotonic()
+            if len(text) > MAX_FRAME_BYTES or now - last_frame < MIN_FRAME_INTERVAL:
+                continue
+            try:
+                frame = progress_frame(json.loads(text), user)
+            except (ValueError, TypeError, OverflowError):
+                continue
+            last_frame = now
+            # Stored first so long-polls woken by the frame already see the new version
+            await sync_to_async(live.record_progress)(battle_id, user.id, frame)
+            get_channel_layer().publish(battle_group(battle_id), frame)
+    finally:
+        writer.cancel()
+        subscription.close()
@@ -0,0 +1,144 @@
+"""
+Cache-resident live battle state.
+
+Progress updates during a battle only overwrite a small per-participant entry in the shared
+cache, and the opponent progress endpoint reads it from there. BattleParticipant is written
+behind: at most one single-row UPDATE per participant every BATTLE_PROGRESS_CHECKPOINT_SECONDS
+(guarded by cache.add, so it holds across processes), plus the full save on finish. DB
+writes therefore no longer depend on how often clients report progress.
+
+Who plays a battle, and whether it is active, is cached as well (`battle_meta`). The
+battles signal handler drops that entry whenever a Battle row is saved.
+
+Every write bumps a per-participant version (cache.incr). The opponent progress endpoint
+uses it as the ETag, and `wait_for_change` lets it hold a long-poll until the version moves.
+"""
+import asyncio
+import logging
+import time
+from django.conf import settings
+from typing_platform.state import cache
+from .channel_layer import get_channel_layer, battle_group
+from .models import Battle, BattleParticipant
+
+logger = logging.getLogger('typing_platform')
+
+PROGRESS_TIMEOUT = 2 * 3600  # longer than any battle time limit
+META_TIMEOUT = 300
+WAIT_SLICE = 1.0  # seconds between cache re-checks while waiting (changes made in other processes)
+STATE_FIELDS = ('wpm', 'accuracy', 'mistakes', 'progress')
+
+
+def progress_key(battle_id, user_id):
+    return f'battle-progress:{battle_id}:{user_id}'
+
+
+def meta_key(battle_id):
+    return f'battle-meta:{battle_id}'
+
+
+def checkpoint_interval():
+    return getattr(settings, 'BATTLE_PROGRESS_CHECKPOINT_SECONDS', 30)
+
+
+def battle_meta(battle_id):
+    """{'status', 'creator_id', 'opponent_id'} of a battle (cached), or None when it does not exist"""
+    key = meta_key(battle_id)
+    meta = cache.get(key)
+    if meta is None:
+        meta = Battle.objects.filter(id=battle_id).values('status', 'creator_id', 'opponent_id').first()
+        if meta is None:
+            return None
+        cache.set(key, meta, META_TIMEOUT)
+    return meta
+
+
+def forget_battle(battle_id):
+    cache.delete(meta_key(battle_id))
+
+
+def is_player(meta, user_id):
+    return user_id is not None and user_id in (meta['creator_id'], meta['opponent_id'])
+
+
+def opponent_id(meta, user_id):
+    """Id of the other player of user_id (None while nobody has joined)"""
+    return meta['opponent_id'] if user_id == meta['creator_id'] else meta['creator_id']
+
+
+def _next_version(battle_id, user_id):
+    key = f'{progress_key(battle_id, user_id)}:version'
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, PROGRESS_TIMEOUT)
+        return cache.incr(key)
+
+
+def _store(battle_id, user_id, state, is_finished):
+    entry = {field: state[field] for field in STATE_FIELDS}
+    entry['is_finished'] = is_finished
+    entry['version'] = _next_version(battle_id, user_id)
+    cache.set(progress_key(battle_id, user_id), entry, PROGRESS_TIMEOUT)
+    return entry
+
+
+def record_progress(battle_id, user_id, state):
+    """Store live progress; returns True when this call also checkpointed it to the database"""
+    entry = _store(battle_id, user_id, state, is_finished=False)
+    interval = checkpoint_interval()
+    if interval <= 0 or not cache.add(f'{progress_key(battle_id, user_id)}:checkpoint', 1, interval):
+        return False
+    BattleParticipant.objects.filter(battle_id=battle_id, user_id=user_id, is_finished=False).update(
+        wpm=entry['wpm'], accuracy=entry['accuracy'], mistakes=entry['mistakes'], progress_percent=entry['progress'],
+    )
+    return True
+
+
+def record_finish(battle_id, user_id, state):
+    """Final state of a participant whose result has just been saved"""
+    _store(battle_id, user_id, state, is_finished=True)
+
+
+def get_progress(battle_id, user_id):
+    """Live state of a participant; loaded from the last checkpoint when the cache has none"""
+    key = progress_key(battle_id, user_id)
+    entry = cache.get(key)
+    if entry is None:
+        row = BattleParticipant.objects.filter(battle_id=battle_id, user_id=user_id).values(
+            'wpm', 'accuracy', 'mistakes', 'progress_percent', 'is_finished',
+        ).first()
+        if row is None:
+            return None
+        entry = {
+            'wpm': row['wpm'], 'accuracy': row['accuracy'], 'mistakes': row['mistakes'],
+            'progress': row['progress_percent'], 'is_finished': row['is_finished'], 'version': 0,
+        }
+        cache.set(key, entry, PROGRESS_TIMEOUT)
+    return entry
+
+
+def etag(battle_id, user_id, entry):
+    return f'"bp-{battle_id}-{user_id}-{entry["version"] if entry else 0}"'
+
+
+async def wait_for_change(battle_id, user_id, version, timeout):
+    """Wait up to `timeout` seconds for a participant's state to pass `version`; returns the latest state"""
+    subscription = get_channel_layer().subscribe(battle_group(battle_id))
+    deadline = time.monotonic() + timeout
+    key = progress_key(battle_id, user_id)
+    try:
+        while True:
+            entry = await cache.aget(key)
+            if entry is not None and entry['version'] != version:
+                return entry
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return entry
+            # Frames published in this process wake the wait early; other processes are seen on the re-check
+            try:
+                await asyncio.wait_for(subscription.get(), min(remaining, WAIT_SLICE))
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        subscription.close()
@@ -0,0 +1,190 @@
+"""
+Quick match queue kept in the shared cache.
+
+A player who asks for a quick match gets a ticket (`mm-ticket:<user_id>`) and is listed in the
+bucket of their mode, battle type, time limit and rating (RATING_BUCKET points wide), so only
+players who chose the same settings are paired. A search only reads
+the buckets within the player's window, which starts at INITIAL_RADIUS buckets on each side
+and widens by one every WIDEN_SECONDS of waiting, so its cost depends on how many players
+are queued nearby and not on the size of the user or rating tables.
+
+Pairing is compare-and-swap: a searcher first claims its own ticket and then the candidate's
+with cache.add, which succeeds for exactly one caller. Whoever holds both claims creates the
+battle and leaves the battle id for the other player, whose status poll picks it up.
+Tickets live for MATCHMAKING_TICKET_SECONDS after the player's last poll, so players who
+closed the page drop out of the queue on their own.
+"""
+import logging
+import time
+from django.conf import settings
+from typing_platform.state import cache
+from .models import BattleRating
+
+logger = logging.getLogger('typing_platform')
+
+RATING_BUCKET = 100
+INITIAL_RADIUS = 1
+WIDEN_SECONDS = 10
+MAX_RADIUS = 5
+MAX_SEARCH_SECONDS = 120
+TIME_LIMITS = (60, 120, 180, 300)  # accepted quick-match time limits (each has its own queue)
+LOCK_TIMEOUT = 5
+LOCK_ATTEMPTS = 20
+
+
+def ticket_timeout():
+    return getattr(settings, 'MATCHMAKING_TICKET_SECONDS', 30)
+
+
+def ticket_key(user_id):
+    return f'mm-ticket:{user_id}'
+
+
+def claim_key(user_id):
+    return f'mm-claim:{user_id}'
+
+
+def result_key(user_id):
+    return f'mm-match:{user_id}'
+
+
+def bucket_key(mode, battle_type, time_limit, bucket):
+    return f'mm-bucket:{mode}:{battle_type}:{time_limit}:{bucket}'
+
+
+def rating_bucket(rating):
+    return rating // RATING_BUCKET
+
+
+def search_radius(ticket, now=None):
+    """Buckets searched on each side of the ticket's own, widening with the time waited"""
+    waited = (now or time.time()) - ticket['enqueued_at']
+    return min(MAX_RADIUS, INITIAL_RADIUS + int(waited // WIDEN_SECONDS))
+
+
+def _update_bucket(key, change):
+    """Apply change(list of user ids) to a bucket under a short cache.add lock"""
+    lock = f'{key}:lock'
+    for _ in range(LOCK_ATTEMPTS):
+        if cache.add(lock, 1, LOCK_TIMEOUT):
+            try:
+                members = change(list(cache.get(key, [])))
+                if members:
+                    cache.set(key, members, MAX_SEARCH_SECONDS + ticket_timeout())
+                else:
+                    cache.delete(key)
+            finally:
+                cache.delete(lock)
+            return True
+        time.sleep(0.01)
+    logger.warning(f"Matchmaking bucket {key} stayed locked")
+    return False
+
+
+def _remove_from_bucket(key, user_ids):
+    user_ids = set(user_ids)
+    _update_bucket(key, lambda members: [uid for uid in members if uid not in user_ids])
+
+
+def _bucket_of(ticket, bucket=None):
+    return bucket_key(ticket['mode'], ticket['battle_type'], ticket['time_limit'],
+                      ticket['bucket'] if bucket is None else bucket)
+
+
+def enqueue(user, mode, battle_type, time_limit):
+    """Put the user in the queue (replacing an older ticket) and return the ticket"""
+    cancel(user.id)
+    rating = BattleRating.objects.filter(user=user).values_list('rating', flat=True).first()
+    if rating is None:
+        rating = BattleRating._meta.get_field('rating').default
+    ticket = {
+        'user_id': user.id,
+        'mode': mode,
+        'battle_type': battle_type,
+        'time_limit': time_limit,
+        'rating': rating,
+        'bucket': rating_bucket(rating),
+        'enqueued_at': time.time(),
+    }
+    cache.set(ticket_key(user.id), ticket, ticket_timeout())
+    _update_bucket(_bucket_of(ticket), lambda members: members + [user.id])
+    return ticket
+
+
+def get_ticket(user_id):
+    return cache.get(ticket_key(user_id))
+
+
+def keep_alive(ticket):
+    """Extend a waiting ticket; returns False once it has waited MAX_SEARCH_SECONDS"""
+    if time.time() - ticket['enqueued_at'] > MAX_SEARCH_SECONDS:
+        cancel(ticket['user_id'])
+        return False
+    cache.touch(ticket_key(ticket['user_id']), ticket_timeout())
+    return True
+
+
+def cancel(user_id):
+    """Leave the queue (no-op without a ticket)"""
+    ticket = cache.get(ticket_key(user_id))
+    cache.delete_many([ticket_key(user_id), claim_key(user_id)])
+    if ticket is not None:
+        _remove_from_bucket(_bucket_of(ticket), [user_id])
+
+
+def _candidates(ticket):
+    """Waiting tickets in the search window, nearest bucket first"""
+    radius = search_radius(ticket)
+    keys = [_bucket_of(ticket, ticket['bucket'])]
+    for distance in range(1, radius + 1):
+        keys += [_bucket_of(ticket, ticket['bucket'] - distance), _bucket_of(ticket, ticket['bucket'] + distance)]
+    buckets = cache.get_many(keys)
+    for key in keys:
+        members = [uid for uid in buckets.get(key, ()) if uid != ticket['user_id']]
+        if not members:
+            continue
+        tickets = cache.get_many([ticket_key(uid) for uid in members])
+        expired = [uid for uid in members if ticket_key(uid) not in tickets]
+        if expired:
+            _remove_from_bucket(key, expired)
+        # Longest waiting first
+        yield from sorted(tickets.values(), key=lambda other: other['enqueued_at'])
+
+
+def claim_opponent(ticket):
+    """
+    Claim the nearest waiting opponent for a ticket; returns the opponent's ticket or None.
+    On success both tickets are held until complete() or release() is called.
+    """
+    me = ticket['user_id']
+    if not cache.add(claim_key(me), me, ticket_timeout()):
+        return None  # someone is pairing with us right now
+    for other in _candidates(ticket):
+        if cache.add(claim_key(other['user_id']), me, ticket_timeout()):
+            # The ticket may have been cancelled between the read and the claim
+            if cache.get(ticket_key(other['user_id'])) is not None:
+                return other
+            cache.delete(claim_key(other['user_id']))
+    cache.delete(claim_key(me))
+    return None
+
+
+def release(ticket, opponent):
+    """Give back the claims taken by claim_opponent (battle creation failed)"""
+    cache.delete_many([claim_key(ticket['user_id']), claim_key(opponent['user_id'])])
+
+
+def complete(ticket, opponent, battle_id):
+    """Take both players out of the queue and leave the battle id for the waiting opponent"""
+    cache.set(result_key(opponent['user_id']), battle_id, ticket_timeout())
+    for player in (ticket, opponent):
+        cache.delete_many([ticket_key(player['user_id']), claim_key(player['user_id'])])
+        _remove_from_bucket(_bucket_of(player), [player['user_id']])
+
+
+def pop_match(user_id):
+    """Battle id a waiting player has been paired into, or None"""
+    battle_id = cache.get(result_key(user_id))
+    if battle_id is not None:
+        cache.delete(result_key(user_id))
+    return battle_id
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Battle
+from . import live
+
+
+@receiver([post_save, post_delete], sender=Battle)
+def forget_battle_meta(sender, instance, **kwargs):
+    """Drop cached players/status so live progress checks see the change"""
+    live.forget_battle(instance.pk)
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import time
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from typing_platform.state import cache
+from . import live
+from .channel_layer import publish_battle_event
+from .models import Battle, BattleParticipant
+
+User = get_user_model()
+
+
+def battle_queries(queries):
+    return [q['sql'] for q in queries if 'battles_' in q['sql']]
+
+
+@override_settings(BATTLE_PROGRESS_CHECKPOINT_SECONDS=30)
+class LiveProgressTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.creator = User.objects.create_user(username='p1', password='pass')
+        self.opponent = User.objects.create_user(username='p2', password='pass')
+        self.battle = Battle.objects.create(creator=self.creator, opponent=self.opponent, mode='text', status='active')
+        BattleParticipant.objects.create(battle=self.battle, user=self.creator)
+        BattleParticipant.objects.create(battle=self.battle, user=self.opponent)
+
+    def report(self, user, progress, wpm=40):
+        self.client.force_login(user)
+        return self.client.post(
+            reverse('battles:update_progress', args=[self.battle.id]),
+            data=json.dumps({'wpm': wpm, 'accuracy': 98, 'mistakes': 1, 'progress': progress}),
+            content_type='application/json',
+        )
+
+    def test_updates_stay_in_cache_between_checkpoints(self):
+        self.report(self.creator, 10)
+        with CaptureQueriesContext(connection) as queries:
+            for progress in (20, 30, 40):
+                self.assertEqual(self.report(self.creator, progress).status_code, 200)
+        self.assertEqual(battle_queries(queries), [])
+
+        participant = BattleParticipant.objects.get(battle=self.battle, user=self.creator)
+        self.assertEqual(participant.progress_percent, 10)  # first checkpoint only
+        self.assertEqual(live.get_progress(self.battle.id, self.creator.id)['progress'], 40)
+
+    def test_opponent_progress_is_read_from_cache(self):
+        self.report(self.creator, 55, wpm=62)
+        self.client.force_login(self.opponent)
+        url = reverse('battles:opponent_progress', args=[self.battle.id])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(url).json()
+        self.assertEqual(battle_queries(queries), [])
+        self.assertEqual((data['progress'], data['wpm'], data['is_finished']), (55, 62, False))
+
+    def test_finish_is_visible_and_status_change_is_noticed(self):
+        self.client.force_login(self.creator)
+        self.client.post(
+            reverse('battles:save_result', args=[self.battle.id]),
+            data=json.dumps({'wpm': 50, 'accuracy': 100, 'mistakes': 0, 'progress': 100}),
+            content_type='application/json',
+        )
+        self.client.force_login(self.opponent)
+        data = self.client.get(reverse('battles:opponent_progress', args=[self.battle.id])).json()
+        self.assertEqual((data['is_finished'], data['accuracy']), (True, 100))
+
+        self.battle.status = 'cancelled'
+        self.battle.save()
+        self.assertEqual(self.report(self.opponent, 20).status_code, 400)
+
+    def test_outsider_is_refused(self):
+        outsider = User.objects.create_user(username='p3', password='pass')
+        self.assertEqual(self.report(outsider, 10).status_code, 403)
+        self.assertEqual(self.client.get(reverse('battles:opponent_progress', args=[self.battle.id])).status_code, 403)
+
+
+@override_settings(BATTLE_PROGRESS_MAX_WAIT_SECONDS=5)
+class ConditionalProgressTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.creator = User.objects.create_user(username='p1', password='pass')
+        self.opponent = User.objects.create_user(username='p2', password='pass')
+        self.battle = Battle.objects.create(creator=self.creator, opponent=self.opponent, mode='text', status='active')
+        BattleParticipant.objects.create(battle=self.battle, user=self.creator)
+        BattleParticipant.objects.create(battle=self.battle, user=self.opponent)
+        self.url = reverse('battles:opponent_progress', args=[self.battle.id])
+        self.state = {'wpm': 30, 'accuracy': 99, 'mistakes': 0, 'progress': 25}
+
+    def test_unchanged_progress_gets_304(self):
+        self.client.force_login(self.opponent)
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        live.record_progress(self.battle.id, self.creator.id, self.state)
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+        self.assertEqual(changed.json()['progress'], 25)
+
+    async def test_long_poll_times_out_with_304(self):
+        client = AsyncClient()
+        await client.aforce_login(self.opponent)
+        etag = (await client.get(self.url))['ETag']
+        started = time.monotonic()
+        response = await client.get(self.url, {'wait': '0.3'}, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertGreaterEqual(time.monotonic() - started, 0.3)
+
+    def test_wsgi_requests_do_not_long_poll(self):
+        self.client.force_login(self.opponent)
+        play = self.client.get(reverse('battles:play', args=[self.battle.id]))
+        self.assertEqual(play.context['progress_wait'], 0)
+        self.assertContains(play, '?wait=0')
+        etag = self.client.get(self.url)['ETag']
+        started = time.monotonic()
+        response = self.client.get(self.url, {'wait': '5'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertLess(time.monotonic() - started, 1)
+
+    @override_settings(BATTLE_PROGRESS_CHECKPOINT_SECONDS=0)
+    async def test_long_poll_returns_as_soon_as_the_opponent_moves(self):
+        client = AsyncClient()
+        await client.aforce_login(self.opponent)
+        etag = (await client.get(self.url))['ETag']
+        started = time.monotonic()
+        request = asyncio.ensure_future(client.get(self.url, {'wait': '5'}, headers={'If-None-Match': etag}))
+        await asyncio.sleep(0.2)
+        # A cache-only write (no checkpoint): the request holds the test's sync thread while it waits
+        live.record_progress(self.battle.id, self.creator.id, self.state)
+        publish_battle_event(self.battle.id, {'type': 'progress', 'user_id': self.creator.id, **self.state})
+        response = await asyncio.wait_for(request, 5)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['wpm'], 30)
+        self.assertLess(time.monotonic() - started, 2)
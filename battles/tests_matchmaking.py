@@ -0,0 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from typing_platform.state import cache
+from typing_practice.models import Text
+from typing_practice.selection import text_pool
+from . import matchmaking
+from .models import Battle, BattleRating
+
+User = get_user_model()
+
+
+class MatchmakingQueueTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        text_pool.invalidate()
+        Text.objects.create(title='T', difficulty='easy', word_count=10, body='quick brown fox')
+        self.first = User.objects.create_user(username='p1', password='pass')
+        self.second = User.objects.create_user(username='p2', password='pass')
+        self.url = reverse('battles:quick_match')
+        self.status_url = reverse('battles:quick_match_status')
+
+    def quick_match(self, user, **data):
+        self.client.force_login(user)
+        return self.client.post(self.url, {'mode': 'text', 'battle_type': 'balanced', **data})
+
+    def status(self, user):
+        self.client.force_login(user)
+        return self.client.get(self.status_url).json()
+
+    def test_second_player_is_paired_with_the_waiting_one(self):
+        self.assertRedirects(self.quick_match(self.first), reverse('battles:list'), fetch_redirect_response=False)
+        self.assertEqual(self.status(self.first)['status'], 'waiting')
+
+        response = self.quick_match(self.second)
+        battle = Battle.objects.get()
+        self.assertRedirects(response, reverse('battles:play', args=[battle.id]), fetch_redirect_response=False)
+        self.assertEqual((battle.creator, battle.opponent, battle.status), (self.second, self.first, 'active'))
+        self.assertTrue(battle.is_auto_match)
+
+        self.assertEqual(self.status(self.first), {'status': 'matched', 'url': reverse('battles:play', args=[battle.id])})
+        self.assertIsNone(matchmaking.get_ticket(self.first.id))
+        self.assertIsNone(matchmaking.get_ticket(self.second.id))
+
+    def test_queues_are_separated_by_mode_battle_type_and_time_limit(self):
+        self.quick_match(self.first, battle_type='speed')
+        self.quick_match(self.second, battle_type='accuracy')
+        self.assertFalse(Battle.objects.exists())
+        self.assertEqual(self.status(self.second)['status'], 'waiting')
+
+        self.quick_match(self.first, time_limit=60)
+        self.quick_match(self.second, time_limit=120)
+        self.assertFalse(Battle.objects.exists())
+        self.quick_match(self.first, time_limit=120)
+        self.assertEqual(Battle.objects.get().time_limit_seconds, 120)
+
+        self.quick_match(self.first, time_limit=7)
+        self.assertIsNone(matchmaking.get_ticket(self.first.id))
+
+    def test_search_window_widens_while_waiting(self):
+        BattleRating.objects.create(user=self.first, rating=1000)
+        BattleRating.objects.create(user=self.second, rating=1350)
+        self.quick_match(self.first)
+        self.quick_match(self.second)
+        self.assertFalse(Battle.objects.exists())
+
+        ticket = matchmaking.get_ticket(self.second.id)
+        ticket['enqueued_at'] -= 2 * matchmaking.WIDEN_SECONDS
+        cache.set(matchmaking.ticket_key(self.second.id), ticket)
+        self.assertEqual(self.status(self.second)['status'], 'matched')
+        self.assertEqual(Battle.objects.get().opponent, self.first)
+
+    def test_expired_and_cancelled_tickets_are_not_matched(self):
+        self.quick_match(self.first)
+        cache.delete(matchmaking.ticket_key(self.first.id))  # ticket timed out
+        self.quick_match(self.second)
+        self.assertFalse(Battle.objects.exists())
+        self.assertEqual(self.status(self.first)['status'], 'expired')
+
+        self.client.force_login(self.second)
+        self.client.post(reverse('battles:quick_match_cancel'))
+        self.assertIsNone(matchmaking.get_ticket(self.second.id))
+        self.assertEqual(cache.get(matchmaking.bucket_key('text', 'balanced', 300, 10)), None)
+
+    def test_claimed_ticket_cannot_be_paired_twice(self):
+        first = matchmaking.enqueue(self.first, 'text', 'balanced', 300)
+        second = matchmaking.enqueue(self.second, 'text', 'balanced', 300)
+        self.assertEqual(matchmaking.claim_opponent(second)['user_id'], self.first.id)
+        # Both tickets are held until the battle is created or the claim is released
+        self.assertIsNone(matchmaking.claim_opponent(first))
+        matchmaking.release(second, first)
+        self.assertEqual(matchmaking.claim_opponent(first)['user_id'], self.second.id)
@@ -0,0 +1,171 @@
+import asyncio
+import json
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from typing_platform.state import cache
+from .channel_layer import SUBSCRIPTION_QUEUE_SIZE, CacheChannelLayer, InMemoryChannelLayer, publish_battle_event
+from . import live
+from .consumers import battle_progress
+from .models import Battle, BattleParticipant
+
+User = get_user_model()
+
+
+class FakeSocket:
+    """Drives the ASGI websocket app like a server would"""
+
+    def __init__(self, path, cookie, origin=None):
+        headers = [(b'host', b'testserver'), (b'cookie', cookie.encode())]
+        if origin:
+            headers.append((b'origin', origin.encode()))
+        self.scope = {'type': 'websocket', 'path': path, 'headers': headers}
+        self.inbox, self.outbox = asyncio.Queue(), asyncio.Queue()
+
+    async def connect(self):
+        self.task = asyncio.ensure_future(battle_progress(self.scope, self.inbox.get, self.outbox.put))
+        await self.inbox.put({'type': 'websocket.connect'})
+        return await self.next()
+
+    async def send_json(self, data):
+        await self.inbox.put({'type': 'websocket.receive', 'text': json.dumps(data)})
+
+    async def next(self, timeout=2):
+        return await asyncio.wait_for(self.outbox.get(), timeout)
+
+    async def close(self):
+        await self.inbox.put({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.wait_for(self.task, 2)
+
+
+def session_cookie(user):
+    client = Client()
+    client.force_login(user)
+    return f"sessionid={client.cookies['sessionid'].value}"
+
+
+class ChannelLayerTests(TestCase):
+    async def test_publish_reaches_subscribers_of_the_group(self):
+        layer = InMemoryChannelLayer()
+        first, second, other = layer.subscribe('a'), layer.subscribe('a'), layer.subscribe('b')
+        self.assertEqual(layer.publish('a', {'n': 1}), 2)
+        self.assertEqual(await first.get(), {'n': 1})
+        self.assertEqual(await second.get(), {'n': 1})
+        self.assertFalse(other.pending)
+        first.close()
+        self.assertEqual(layer.publish('a', {'n': 2}), 1)
+
+    async def test_slow_reader_loses_progress_frames_but_never_finished_ones(self):
+        layer = InMemoryChannelLayer()
+        subscription = layer.subscribe('a')
+        subscription._put({'type': 'finished', 'user_id': 1})
+        for n in range(SUBSCRIPTION_QUEUE_SIZE + 5):
+            subscription._put({'type': 'progress', 'n': n})
+        subscription._put({'type': 'finished', 'user_id': 2})
+        frames = [await subscription.get() for _ in range(len(subscription.pending))]
+        self.assertEqual([f['user_id'] for f in frames if f['type'] == 'finished'], [1, 2])
+        # The newest progress frames are the ones kept
+        self.assertEqual(frames[-2]['n'], SUBSCRIPTION_QUEUE_SIZE + 4)
+
+
+class CacheChannelLayerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    async def test_messages_reach_subscribers_in_other_processes(self):
+        # Separate layer instances stand in for separate worker processes
+        subscription = CacheChannelLayer().subscribe('a')
+        other = CacheChannelLayer().subscribe('b')
+        publisher = CacheChannelLayer()
+        await sync_to_async(publisher.publish)('a', {'n': 1})
+        await sync_to_async(publisher.publish)('a', {'n': 2})
+        self.assertEqual(await asyncio.wait_for(subscription.get(), 2), {'n': 1})
+        self.assertEqual(await asyncio.wait_for(subscription.get(), 2), {'n': 2})
+        await other.fetch()
+        self.assertFalse(other.pending)
+
+    async def test_subscribers_only_get_messages_published_after_subscribing(self):
+        layer = CacheChannelLayer()
+        await sync_to_async(layer.publish)('a', {'n': 1})
+        subscription = layer.subscribe('a')
+        await sync_to_async(layer.publish)('a', {'n': 2})
+        self.assertEqual(await asyncio.wait_for(subscription.get(), 2), {'n': 2})
+
+    async def test_a_message_numbered_but_not_stored_is_retried_then_skipped(self):
+        layer = CacheChannelLayer()
+        subscription = layer.subscribe('a')
+        await cache.aset(layer.seq_key('a'), 1)  # publisher between incr and set
+        await subscription.fetch()
+        self.assertEqual(subscription.last_seq, 0)
+        await sync_to_async(layer.publish)('a', {'n': 2})
+        await subscription.fetch()
+        self.assertEqual([subscription.pending.popleft()], [{'n': 2}])
+        self.assertEqual(subscription.last_seq, 2)
+
+
+class BattleProgressSocketTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.creator = User.objects.create_user(username='p1', password='pass')
+        self.opponent = User.objects.create_user(username='p2', password='pass')
+        self.outsider = User.objects.create_user(username='p3', password='pass')
+        self.battle = Battle.objects.create(creator=self.creator, opponent=self.opponent, mode='text', status='active')
+        BattleParticipant.objects.create(battle=self.battle, user=self.creator)
+        BattleParticipant.objects.create(battle=self.battle, user=self.opponent)
+        self.path = f'/ws/battles/{self.battle.id}/'
+        self.cookies = {user.username: session_cookie(user) for user in (self.creator, self.opponent, self.outsider)}
+
+    async def test_progress_is_relayed_to_the_other_player_only(self):
+        first, second = FakeSocket(self.path, self.cookies['p1']), FakeSocket(self.path, self.cookies['p2'])
+        self.assertEqual((await first.connect())['type'], 'websocket.accept')
+        self.assertEqual((await second.connect())['type'], 'websocket.accept')
+        # Connect-time snapshot of the opponent
+        self.assertEqual(json.loads((await first.next())['text'])['progress'], 0)
+        await second.next()
+
+        await first.send_json({'type': 'progress', 'wpm': 55, 'accuracy': 97, 'mistakes': 2, 'progress': 40})
+        frame = json.loads((await second.next())['text'])
+        self.assertEqual((frame['type'], frame['wpm'], frame['progress']), ('progress', 55, 40))
+        with self.assertRaises(asyncio.TimeoutError):
+            await first.next(timeout=0.2)
+
+        # Frames land in the live cache; the DB only gets the first checkpoint of the interval
+        await asyncio.sleep(0.3)
+        await first.send_json({'type': 'progress', 'wpm': 58, 'accuracy': 97, 'mistakes': 2, 'progress': 60})
+        self.assertEqual(json.loads((await second.next())['text'])['progress'], 60)
+        await asyncio.sleep(0.05)
+        state = await sync_to_async(live.get_progress)(self.battle.id, self.creator.id)
+        self.assertEqual(state['progress'], 60)
+        participant = await sync_to_async(BattleParticipant.objects.get)(battle=self.battle, user=self.creator)
+        self.assertEqual(participant.progress_percent, 40)
+
+        # Finish events published by the (sync) save view reach the socket too
+        await sync_to_async(publish_battle_event)(self.battle.id, {
+            'type': 'finished', 'user_id': self.creator.id, 'wpm': 60, 'battle_finished': False,
+        })
+        self.assertEqual(json.loads((await second.next())['text'])['type'], 'finished')
+        await first.close()
+        await second.close()
+
+    async def test_invalid_frames_are_dropped(self):
+        first, second = FakeSocket(self.path, self.cookies['p1']), FakeSocket(self.path, self.cookies['p2'])
+        await first.connect()
+        await second.connect()
+        await first.next()
+        await second.next()
+        await first.send_json({'type': 'progress', 'wpm': 'fast'})
+        await first.send_json({'type': 'chat', 'text': 'hi'})
+        await first.inbox.put({'type': 'websocket.receive', 'text': '{"type": "progress", "mistakes": 1e400}'})
+        await first.send_json({'type': 'progress', 'progress': float('nan')})
+        with self.assertRaises(asyncio.TimeoutError):
+            await second.next(timeout=0.2)
+        await first.close()
+        await second.close()
+
+    async def test_outsiders_and_cross_site_sockets_are_refused(self):
+        outsider = FakeSocket(self.path, self.cookies['p3'])
+        self.assertEqual(await outsider.connect(), {'type': 'websocket.close', 'code': 4403})
+        cross_site = FakeSocket(self.path, self.cookies['p1'], origin='https://evil.example')
+        self.assertEqual(await cross_site.connect(), {'type': 'websocket.close', 'code': 4403})
+        anonymous = FakeSocket(self.path, '')
+        self.assertEqual(await anonymous.connect(), {'type': 'websocket.close', 'code': 4403})
@@ -7,6 +7,8 @@ urlpatterns = [
     path('', views.battle_list, name='list'),
     path('create/', views.battle_create, name='create'),
     path('quick-match/', views.battle_quick_match, name='quick_match'),
+    path('quick-match/status/', views.battle_quick_match_status, name='quick_match_status'),
+    path('quick-match/cancel/', views.battle_quick_match_cancel, name='quick_match_cancel'),
     path('invite/', views.battle_invite, name='invite'),
     path('invitations/<int:invitation_id>/', views.battle_invitation_respond, name='invitation_respond'),
     path('<int:battle_id>/', views.battle_detail, name='detail'),
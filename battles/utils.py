@@ -1,33 +1,20 @@
 """
-Battle utilities: ELO calculation, rewards, matchmaking, etc.
+Battle utilities: ELO calculation, rewards, etc. (quick match queue: battles.matchmaking)
 """
 from django.utils import timezone
 from django.core.cache import cache
-from django.contrib.auth.models import User
 from .models import Battle, BattleRating, BattleParticipant
 from accounts.models import UserLevel, Notification, Badge, UserBadge
 from accounts.gamification import calculate_xp_for_result
+from typing_platform import presence
 import logging
-import time
-import random
 
 logger = logging.getLogger('typing_platform')
 
-ONLINE_TIMEOUT = 300  # 5 daqiqa
 
-
-def get_active_users():
-    """Get list of currently active user IDs"""
-    roster = cache.get("online-roster", [])
-    now = int(time.time())
-    active = []
-    
-    for uid in roster:
-        timestamp = cache.get(f"online-user:{uid}")
-        if timestamp and (now - timestamp) <= ONLINE_TIMEOUT:
-            active.append(uid)
-    
-    return list(set(active))
+def get_active_users(limit=presence.SAMPLE_SIZE):
+    """Get a bounded sample of currently active user IDs"""
+    return presence.active_users(limit)
 
 
 def calculate_elo_rating(rating1, rating2, result1):
@@ -267,39 +254,6 @@ def check_battle_badges(user, battle):
         logger.error(f"Error checking battle badges for {user.username}: {e}", exc_info=True)
 
 
-def find_match_for_user(user, battle_mode='text', battle_type='balanced', time_limit=300):
-    """Find a suitable opponent for auto-matchmaking"""
-    active_user_ids = get_active_users()
-    
-    # Remove current user
-    active_user_ids = [uid for uid in active_user_ids if uid != user.id]
-    
-    if not active_user_ids:
-        return None
-    
-    # Get user's rating
-    user_rating, _ = BattleRating.objects.get_or_create(user=user)
-    
-    # Find users with similar rating (±200 points)
-    min_rating = user_rating.rating - 200
-    max_rating = user_rating.rating + 200
-    
-    # Try to find user with similar rating
-    similar_users = BattleRating.objects.filter(
-        user_id__in=active_user_ids,
-        rating__gte=min_rating,
-        rating__lte=max_rating
-    ).exclude(user=user).order_by('?')[:5]
-    
-    if similar_users.exists():
-        opponent = similar_users.first().user
-    else:
-        # If no similar rating, pick random active user
-        opponent = User.objects.filter(id__in=active_user_ids).exclude(id=user.id).order_by('?').first()
-    
-    return opponent
-
-
 def determine_battle_winner(battle):
     """Determine winner based on battle type"""
     participants = battle.participants.filter(is_finished=True)
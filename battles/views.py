@@ -1,22 +1,30 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404, HttpResponseNotModified
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
 from django.db.models import Q
 from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.conf import settings
+from asgiref.sync import sync_to_async
 from .models import Battle, BattleParticipant, BattleRating, BattleInvitation
-from typing_practice.models import Text, CodeSnippet
+from .channel_layer import publish_battle_event
+from . import live, matchmaking
+from typing_practice.models import Text
 from typing_practice.utils import get_random_text, get_random_code
+from typing_practice.scoring import score_submission, reconcile_metrics
+from typing_practice.highlighting import highlight_context
 from .utils import (
-    update_battle_ratings, award_battle_rewards, determine_battle_winner,
-    find_match_for_user, get_active_users
+    update_battle_ratings, award_battle_rewards, determine_battle_winner
 )
 from accounts.models import Notification
 import json
 import logging
+import time
 from datetime import timedelta
 
 logger = logging.getLogger('typing_platform')
@@ -68,6 +76,7 @@ def battle_list(request):
         'pending_battles': pending_battles,
         'user_battles': user_battles,
         'user_rating': user_rating,
+        'matchmaking_ticket': matchmaking.get_ticket(request.user.id),
         'status_filter': status_filter,
         'mode_filter': mode_filter,
         'search_query': search_query,
@@ -86,7 +95,7 @@ def battle_create(request):
         
         # Get random text or code
         if mode == 'text':
-            text = get_random_text()
+            text = get_random_text(seen_by=[request.user])
             if not text:
                 messages.error(request, 'Matnlar mavjud emas.')
                 return redirect('battles:list')
@@ -100,14 +109,10 @@ def battle_create(request):
             )
         else:
             # Get random code
-            from typing_practice.models import CodeSnippet
-            import random
-            code_ids = list(CodeSnippet.objects.values_list('id', flat=True))
-            if not code_ids:
+            code = get_random_code(language=None, difficulty=None, seen_by=[request.user])
+            if not code:
                 messages.error(request, 'Kod namunasi mavjud emas.')
                 return redirect('battles:list')
-            random_id = random.choice(code_ids)
-            code = CodeSnippet.objects.get(id=random_id)
             
             battle = Battle.objects.create(
                 creator=request.user,
@@ -219,21 +224,25 @@ def battle_play(request, battle_id):
     
     return render(request, 'battles/play.html', {
         'battle': battle,
+        'progress_wait': _progress_wait_limit(request),
+        **highlight_context(battle.code_snippet if battle.mode == 'code' else None),
     })
 
 
 @login_required
 @require_http_methods(["POST"])
 def battle_update_progress(request, battle_id):
-    """Update real-time progress during battle (without finishing)"""
+    """Update real-time progress during battle (cache only; checkpointed to the DB at a coarse interval)"""
     try:
-        battle = get_object_or_404(Battle, id=battle_id)
+        meta = live.battle_meta(battle_id)
+        if meta is None:
+            return JsonResponse({'error': 'Jang topilmadi'}, status=404)
         
-        if battle.status != 'active':
+        if meta['status'] != 'active':
             return JsonResponse({'error': 'Jang faol emas'}, status=400)
         
         # Check if user is participant
-        if battle.creator != request.user and battle.opponent != request.user:
+        if not live.is_player(meta, request.user.id):
             return JsonResponse({'error': 'Siz bu jangda ishtirok etmaysiz'}, status=403)
         
         # Parse data
@@ -248,19 +257,11 @@ def battle_update_progress(request, battle_id):
             logger.warning(f"Invalid data in battle_update_progress: {e}")
             return JsonResponse({'error': 'Noto\'g\'ri ma\'lumot formati'}, status=400)
         
-        # Save or update participant result (without marking as finished)
-        participant, created = BattleParticipant.objects.get_or_create(
-            battle=battle,
-            user=request.user
-        )
-        
-        # Update real-time progress (don't set is_finished=True)
-        participant.wpm = wpm
-        participant.accuracy = accuracy
-        participant.mistakes = mistakes
-        participant.progress_percent = min(100, max(0, progress))
-        # Don't set is_finished or finished_at here
-        participant.save()
+        progress = min(100, max(0, progress))
+        state = {'wpm': wpm, 'accuracy': accuracy, 'mistakes': mistakes, 'progress': progress}
+        live.record_progress(battle_id, request.user.id, state)
+        # Opponent connected over the WebSocket gets the frame pushed
+        publish_battle_event(battle_id, {'type': 'progress', 'user_id': request.user.id, **state})
         
         return JsonResponse({
             'success': True,
@@ -277,7 +278,7 @@ def battle_update_progress(request, battle_id):
 def battle_save_result(request, battle_id):
     """Save battle result"""
     try:
-        battle = get_object_or_404(Battle, id=battle_id)
+        battle = get_object_or_404(Battle.objects.select_related('text', 'code_snippet'), id=battle_id)
         
         if battle.status != 'active':
             return JsonResponse({'error': 'Jang faol emas'}, status=400)
@@ -294,10 +295,28 @@ def battle_save_result(request, battle_id):
             accuracy = validate_accuracy(data.get('accuracy', 0))
             mistakes = max(0, int(data.get('mistakes', 0)))
             progress = float(data.get('progress', 0))  # 0-100
+            typed_text = data.get('typed_text')
+            duration_seconds = max(0, float(data.get('duration_seconds', 0)))
         except (ValueError, TypeError, json.JSONDecodeError) as e:
             logger.warning(f"Invalid data in battle_save_result: {e}")
             return JsonResponse({'error': 'Noto\'g\'ri ma\'lumot formati'}, status=400)
         
+        # Server-side metrics (battles can end on time limit, so partial input is allowed)
+        if typed_text is not None:
+            if battle.mode == 'code' and battle.code_snippet_id:
+                session_type, original = 'code', battle.code_snippet.get_normalized_body()
+            elif battle.text_id:
+                session_type, original = 'text', battle.text.get_normalized_body()
+            else:
+                session_type, original = None, None
+            if session_type:
+                score = score_submission(typed_text, original, duration_seconds, session_type, original_is_normalized=True)
+                wpm, accuracy, mistakes = reconcile_metrics(
+                    wpm, accuracy, mistakes, score,
+                    username=request.user.username,
+                    context='Battle',
+                )
+        
         # Save or update participant result
         participant, created = BattleParticipant.objects.get_or_create(
             battle=battle,
@@ -345,6 +364,20 @@ def battle_save_result(request, battle_id):
                     link=f'/battles/{battle.id}/'
                 )
         
+        live.record_finish(battle.id, request.user.id, {
+            'wpm': wpm, 'accuracy': accuracy, 'mistakes': mistakes, 'progress': participant.progress_percent,
+        })
+        
+        # Connected opponent sees the finish (and the outcome) immediately
+        publish_battle_event(battle.id, {
+            'type': 'finished',
+            'user_id': request.user.id,
+            'wpm': wpm,
+            'progress': participant.progress_percent,
+            'battle_finished': battle_finished,
+            'winner': battle.winner.username if battle.winner else None,
+        })
+        
         logger.info(f"Battle result saved: user={request.user.username}, battle={battle_id}, wpm={wpm}")
         
         return JsonResponse({
@@ -413,79 +446,130 @@ def battle_rematch(request, battle_id):
     return redirect('battles:play', battle_id=battle.id)
 
 
+def _create_auto_match(ticket, opponent_ticket):
+    """Battle between two paired queue tickets, or None when there is no content to play"""
+    creator = User.objects.get(id=ticket['user_id'])
+    opponent = User.objects.get(id=opponent_ticket['user_id'])
+    mode = ticket['mode']
+    if mode == 'text':
+        text = get_random_text(seen_by=[creator, opponent])
+        if not text:
+            return None
+        content = {'text': text}
+    else:
+        code = get_random_code(language=None, difficulty=None, seen_by=[creator, opponent])
+        if not code:
+            return None
+        content = {'code_snippet': code}
+    
+    battle = Battle.objects.create(
+        creator=creator,
+        opponent=opponent,
+        mode=mode,
+        battle_type=ticket['battle_type'],
+        time_limit_seconds=ticket['time_limit'],
+        is_auto_match=True,
+        **content,
+    )
+    
+    # Create participants
+    BattleParticipant.objects.create(battle=battle, user=creator)
+    BattleParticipant.objects.create(battle=battle, user=opponent)
+    
+    # Start battle
+    battle.start()
+    
+    # Send notification to opponent
+    Notification.objects.create(
+        user=opponent,
+        notification_type='battle',
+        title='Raqib topildi!',
+        message=f'{creator.username} bilan tezkor jang boshlandi!',
+        icon='⚔️',
+        link=f'/battles/{battle.id}/play/'
+    )
+    return battle
+
+
+def _pair_ticket(ticket):
+    """Try to pair a queued ticket; returns (battle, opponent ticket), battle None when unpaired"""
+    opponent_ticket = matchmaking.claim_opponent(ticket)
+    if opponent_ticket is None:
+        return None, None
+    try:
+        battle = _create_auto_match(ticket, opponent_ticket)
+    except Exception:
+        matchmaking.release(ticket, opponent_ticket)
+        raise
+    if battle is None:
+        matchmaking.release(ticket, opponent_ticket)
+        return None, opponent_ticket
+    matchmaking.complete(ticket, opponent_ticket, battle.id)
+    logger.info(f"Quick match: battle={battle.id}, users={ticket['user_id']},{opponent_ticket['user_id']}")
+    return battle, opponent_ticket
+
+
 @login_required
 def battle_quick_match(request):
-    """Auto-matchmaking: find opponent and create battle"""
+    """Auto-matchmaking: join the queue and pair with a waiting player of similar rating"""
     if request.method == 'POST':
         mode = request.POST.get('mode', 'text')
         battle_type = request.POST.get('battle_type', 'balanced')
-        time_limit = int(request.POST.get('time_limit', 300))
-        
-        # Find opponent
-        opponent = find_match_for_user(request.user, mode, battle_type, time_limit)
-        
-        if not opponent:
-            messages.error(request, 'Hozircha mos raqib topilmadi. Keyinroq urinib ko\'ring.')
+        try:
+            time_limit = int(request.POST.get('time_limit', 300))
+        except ValueError:
+            time_limit = None
+        if (mode not in dict(Battle.MODE_CHOICES) or battle_type not in dict(Battle.BATTLE_TYPE_CHOICES)
+                or time_limit not in matchmaking.TIME_LIMITS):
+            messages.error(request, 'Noto\'g\'ri jang parametrlari.')
             return redirect('battles:list')
         
-        # Create battle
-        if mode == 'text':
-            text = get_random_text()
-            if not text:
-                messages.error(request, 'Matnlar mavjud emas.')
-                return redirect('battles:list')
-            battle = Battle.objects.create(
-                creator=request.user,
-                opponent=opponent,
-                mode=mode,
-                text=text,
-                battle_type=battle_type,
-                time_limit_seconds=time_limit,
-                is_auto_match=True,
-            )
-        else:
-            from typing_practice.models import CodeSnippet
-            import random
-            code_ids = list(CodeSnippet.objects.values_list('id', flat=True))
-            if not code_ids:
-                messages.error(request, 'Kod namunasi mavjud emas.')
-                return redirect('battles:list')
-            random_id = random.choice(code_ids)
-            code = CodeSnippet.objects.get(id=random_id)
-            
-            battle = Battle.objects.create(
-                creator=request.user,
-                opponent=opponent,
-                mode=mode,
-                code_snippet=code,
-                battle_type=battle_type,
-                time_limit_seconds=time_limit,
-                is_auto_match=True,
-            )
-        
-        # Create participants
-        BattleParticipant.objects.create(battle=battle, user=request.user)
-        BattleParticipant.objects.create(battle=battle, user=opponent)
-        
-        # Start battle
-        battle.start()
+        ticket = matchmaking.enqueue(request.user, mode, battle_type, time_limit)
+        battle, opponent_ticket = _pair_ticket(ticket)
         
-        # Send notification to opponent
-        Notification.objects.create(
-            user=opponent,
-            notification_type='battle',
-            title='Yangi battle taklifi!',
-            message=f'{request.user.username} sizni battlega taklif qildi!',
-            icon='⚔️',
-            link=f'/battles/{battle.id}/play/'
-        )
+        if battle:
+            messages.success(request, f'Raqib topildi: {battle.opponent.username}!')
+            return redirect('battles:play', battle_id=battle.id)
+        if opponent_ticket:
+            matchmaking.cancel(request.user.id)
+            messages.error(request, 'Matnlar mavjud emas.' if mode == 'text' else 'Kod namunasi mavjud emas.')
+            return redirect('battles:list')
         
-        messages.success(request, f'Raqib topildi: {opponent.username}!')
-        return redirect('battles:play', battle_id=battle.id)
+        messages.info(request, 'Raqib qidirilmoqda... Sahifani yopmang.')
+        return redirect('battles:list')
     
     return redirect('battles:list')
 
 
+@login_required
+@require_http_methods(["GET"])
+def battle_quick_match_status(request):
+    """Queue status polled by a waiting player (keeps the ticket alive and retries pairing)"""
+    battle_id = matchmaking.pop_match(request.user.id)
+    if battle_id is None:
+        ticket = matchmaking.get_ticket(request.user.id)
+        if ticket is None or not matchmaking.keep_alive(ticket):
+            return JsonResponse({'status': 'expired'})
+        battle, _ = _pair_ticket(ticket)
+        if battle is None:
+            return JsonResponse({
+                'status': 'waiting',
+                'waited': int(time.time() - ticket['enqueued_at']),
+                'rating_range': (matchmaking.search_radius(ticket) + 1) * matchmaking.RATING_BUCKET,
+            })
+        battle_id = battle.id
+    return JsonResponse({'status': 'matched', 'url': reverse('battles:play', args=[battle_id])})
+
+
+@login_required
+@require_http_methods(["POST"])
+def battle_quick_match_cancel(request):
+    """Leave the quick match queue"""
+    matchmaking.cancel(request.user.id)
+    messages.info(request, 'Raqib qidirish bekor qilindi.')
+    return redirect('battles:list')
+
+
 @login_required
 def battle_invite(request):
     """Send battle invitation to a user"""
@@ -556,7 +640,7 @@ def battle_invitation_respond(request, invitation_id):
     if action == 'accept':
         # Create battle
         if invitation.battle_mode == 'text':
-            text = get_random_text()
+            text = get_random_text(seen_by=[invitation.from_user, request.user])
             if not text:
                 messages.error(request, 'Matnlar mavjud emas.')
                 return redirect('battles:list')
@@ -569,14 +653,10 @@ def battle_invitation_respond(request, invitation_id):
                 time_limit_seconds=invitation.time_limit_seconds,
             )
         else:
-            from typing_practice.models import CodeSnippet
-            import random
-            code_ids = list(CodeSnippet.objects.values_list('id', flat=True))
-            if not code_ids:
+            code = get_random_code(language=None, difficulty=None, seen_by=[invitation.from_user, request.user])
+            if not code:
                 messages.error(request, 'Kod namunasi mavjud emas.')
                 return redirect('battles:list')
-            random_id = random.choice(code_ids)
-            code = CodeSnippet.objects.get(id=random_id)
             
             battle = Battle.objects.create(
                 creator=invitation.from_user,
@@ -614,30 +694,69 @@ def battle_invitation_respond(request, invitation_id):
     return redirect('battles:list')
 
 
+def _progress_wait_limit(request):
+    """Longest opponent-progress long-poll for this server: 0 (plain ETag polling) unless served over ASGI"""
+    # A held request ties up a whole sync WSGI worker, so only the ASGI event loop long-polls
+    if not isinstance(request, ASGIRequest):
+        return 0
+    return getattr(settings, 'BATTLE_PROGRESS_MAX_WAIT_SECONDS', 20)
+
+
+def _progress_etag_matches(request, etag):
+    if_none_match = request.headers.get('If-None-Match', '')
+    return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+
+
 @login_required
 @require_http_methods(["GET"])
-def battle_opponent_progress(request, battle_id):
-    """Get opponent's real-time progress (API endpoint)"""
-    battle = get_object_or_404(Battle, id=battle_id)
-    
-    if battle.creator != request.user and battle.opponent != request.user:
+async def battle_opponent_progress(request, battle_id):
+    """
+    Get opponent's real-time progress (API endpoint, served from the live cache).
+    The ETag carries the opponent's progress version: a matching If-None-Match gets 304, and
+    with ?wait=N the request is held up to N seconds until the version changes (under ASGI only).
+    """
+    user = await request.auser()
+    meta = await sync_to_async(live.battle_meta)(battle_id)
+    if meta is None:
+        raise Http404
+    
+    if not live.is_player(meta, user.id):
         return JsonResponse({'error': 'Ruxsat berilmagan'}, status=403)
     
-    opponent = battle.opponent if battle.creator == request.user else battle.creator
-    participant = BattleParticipant.objects.filter(battle=battle, user=opponent).first()
+    opponent_id = live.opponent_id(meta, user.id)
+    state = await sync_to_async(live.get_progress)(battle_id, opponent_id) if opponent_id else None
+    etag = live.etag(battle_id, opponent_id, state)
     
-    if participant:
+    try:
+        wait = min(float(request.GET.get('wait', 0)), _progress_wait_limit(request))
+    except ValueError:
+        wait = 0
+    if wait > 0 and opponent_id and _progress_etag_matches(request, etag) and not (state and state['is_finished']):
+        state = await live.wait_for_change(battle_id, opponent_id, state['version'] if state else 0, wait) or state
+        etag = live.etag(battle_id, opponent_id, state)
+    
+    if _progress_etag_matches(request, etag):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+    
+    if state:
         # Return current WPM even if not finished (for real-time chart)
-        return JsonResponse({
-            'wpm': participant.wpm,  # Show real-time WPM, not just when finished
-            'accuracy': participant.accuracy if participant.is_finished else None,
-            'progress': participant.progress_percent,
-            'is_finished': participant.is_finished,
+        response = JsonResponse({
+            'wpm': state['wpm'],  # Show real-time WPM, not just when finished
+            'accuracy': state['accuracy'] if state['is_finished'] else None,
+            'progress': state['progress'],
+            'is_finished': state['is_finished'],
+            'version': state['version'],
         })
     else:
-        return JsonResponse({
+        response = JsonResponse({
             'wpm': None,
             'accuracy': None,
             'progress': 0,
             'is_finished': False,
+            'version': 0,
         })
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    return response
@@ -9,7 +9,9 @@ from django.db.models import Avg, Max
 from django.db import transaction
 from .models import Competition, CompetitionParticipant, CompetitionStage, CompetitionParticipantStage, Certificate
 from typing_practice.models import Text, CodeSnippet
-from typing_practice.utils import get_random_text, get_random_code
+from typing_practice.scoring import score_submission, reconcile_metrics
+from typing_practice.highlighting import highlight_context
+from typing_practice.selection import text_pool, code_pool
 import json
 import secrets
 import random
@@ -144,18 +146,15 @@ def competition_create(request):
         # Create 3 stages with random texts/codes (optimized)
         with transaction.atomic():
             if mode == 'text':
-                # Get all available texts for this difficulty
-                from typing_practice.models import Text
-                available_texts = list(Text.objects.filter(difficulty=difficulty).values_list('id', flat=True))
+                # Select 3 random unique texts for this difficulty from the selection pool
+                available_texts = text_pool.ids(difficulty, None)
                 
                 if len(available_texts) < 3:
                     messages.error(request, f'Yetarli matnlar topilmadi (kamida 3 ta kerak, hozir {len(available_texts)} ta mavjud).')
                     competition.delete()
                     return redirect('competitions:list')
                 
-                # Select 3 random unique texts
-                import random
-                selected_text_ids = random.sample(available_texts, min(3, len(available_texts)))
+                selected_text_ids = text_pool.sample(3, difficulty, None)
                 selected_texts = Text.objects.filter(id__in=selected_text_ids)
                 
                 for i, text in enumerate(selected_texts, 1):
@@ -166,14 +165,9 @@ def competition_create(request):
                     )
                     
             elif mode == 'code':
-                # Use optimized random selection
-                selected_codes = []
-                for _ in range(3):
-                    code = get_random_code('python', difficulty)  # Default to python, can be extended
-                    if code and code not in selected_codes:
-                        selected_codes.append(code)
-                    if len(selected_codes) >= 3:
-                        break
+                # Select 3 random unique snippets from the selection pool (python by default, can be extended)
+                selected_code_ids = code_pool.sample(3, 'python', difficulty)
+                selected_codes = list(CodeSnippet.objects.filter(id__in=selected_code_ids))
                 
                 if len(selected_codes) >= 3:
                     for i, code in enumerate(selected_codes, 1):
@@ -307,13 +301,10 @@ def competition_play(request, competition_id, stage_number=1):
     stages_count = CompetitionStage.objects.filter(competition=competition).count()
     if stages_count == 0:
         # Create stages for old competitions
-        from typing_practice.models import Text, CodeSnippet
-        import random
-        
         if competition.mode == 'text':
-            available_texts = list(Text.objects.filter(difficulty=competition.difficulty).values_list('id', flat=True))
+            available_texts = text_pool.ids(competition.difficulty, None)
             if len(available_texts) >= 3:
-                selected_text_ids = random.sample(available_texts, min(3, len(available_texts)))
+                selected_text_ids = text_pool.sample(3, competition.difficulty, None)
                 selected_texts = Text.objects.filter(id__in=selected_text_ids)
                 for i, text in enumerate(selected_texts, 1):
                     CompetitionStage.objects.get_or_create(
@@ -325,12 +316,9 @@ def competition_play(request, competition_id, stage_number=1):
                 messages.error(request, 'Musobaqa uchun matnlar topilmadi. Iltimos, admin bilan bog\'laning.')
                 return redirect('competitions:detail', competition_id=competition.id)
         elif competition.mode == 'code':
-            available_codes = list(CodeSnippet.objects.filter(
-                language='python',
-                difficulty=competition.difficulty
-            ).values_list('id', flat=True))
+            available_codes = code_pool.ids('python', competition.difficulty)
             if len(available_codes) >= 3:
-                selected_code_ids = random.sample(available_codes, min(3, len(available_codes)))
+                selected_code_ids = code_pool.sample(3, 'python', competition.difficulty)
                 selected_codes = CodeSnippet.objects.filter(id__in=selected_code_ids)
                 for i, code in enumerate(selected_codes, 1):
                     CompetitionStage.objects.get_or_create(
@@ -381,6 +369,7 @@ def competition_play(request, competition_id, stage_number=1):
         'participant_stage': participant_stage,
         'stage_number': stage_number,
         'all_stages': all_stages,
+        **highlight_context(stage.code_snippet),
     })
 
 
@@ -408,7 +397,11 @@ def competition_save_result(request, competition_id, stage_number):
         if stage_number < 1 or stage_number > 3:
             return JsonResponse({'error': 'Noto\'g\'ri bosqich raqami'}, status=400)
         
-        stage = get_object_or_404(CompetitionStage, competition=competition, stage_number=stage_number)
+        stage = get_object_or_404(
+            CompetitionStage.objects.select_related('text', 'code_snippet'),
+            competition=competition,
+            stage_number=stage_number
+        )
         
         # Parse and validate data
         try:
@@ -423,73 +416,18 @@ def competition_save_result(request, competition_id, stage_number):
             logger.warning(f"Invalid data in competition_save_result: {e}")
             return JsonResponse({'error': 'Noto\'g\'ri ma\'lumot formati'}, status=400)
         
-        # Server-side validation and metrics calculation
-        def normalize_text(s: str) -> str:
-            if not isinstance(s, str):
-                return ''
-            # Normalize whitespace for plain texts: collapse all whitespace to single spaces
-            return ' '.join(s.replace('\r\n', '\n').split())
-        
-        def normalize_code(s: str) -> str:
-            if not isinstance(s, str):
-                return ''
-            # Normalize line endings and strip trailing spaces per line
-            return '\n'.join([line.rstrip() for line in s.replace('\r\n', '\n').split('\n')])
-        
         # Validate typed text against original and calculate server-side metrics
-        if stage.text:
-            original_norm = normalize_text(stage.text.body)
-            typed_norm = normalize_text(typed_text)
-            
-            # Calculate server-side metrics
-            typed_chars = len(typed_norm)
-            typed_words = len(typed_norm.split()) if typed_norm.strip() else 0
-            mismatches = 0
-            # per-char mismatch counting against original
-            for i, ch in enumerate(typed_norm):
-                if i >= len(original_norm) or ch != original_norm[i]:
-                    mismatches += 1
-            mismatches += max(0, len(original_norm) - len(typed_norm))
-            server_accuracy = round(((typed_chars - mismatches) / typed_chars) * 100, 2) if typed_chars > 0 else 100.0
-            server_wpm = round((typed_words / duration_seconds) * 60, 2) if duration_seconds > 0 else 0.0
-            server_mistakes = mismatches
-            
-            # Override client values if they differ significantly
-            if abs(server_wpm - wpm) / (server_wpm + 1e-6) > 0.2:
-                logger.info(f"Competition WPM mismatch for user {request.user.username}: client={wpm}, server={server_wpm}")
-                wpm = server_wpm
-            if abs(server_accuracy - accuracy) > 10:
-                logger.info(f"Competition accuracy mismatch for user {request.user.username}: client={accuracy}, server={server_accuracy}")
-                accuracy = server_accuracy
-            if abs(server_mistakes - mistakes) > 2:
-                logger.info(f"Competition mistakes mismatch for user {request.user.username}: client={mistakes}, server={server_mistakes}")
-                mistakes = server_mistakes
-                
-        elif stage.code_snippet:
-            original_norm = normalize_code(stage.code_snippet.code_body)
-            typed_norm = normalize_code(typed_text)
-            
-            # Calculate server-side metrics for code (chars based)
-            typed_chars = len(typed_norm)
-            mismatches = 0
-            for i, ch in enumerate(typed_norm):
-                if i >= len(original_norm) or ch != original_norm[i]:
-                    mismatches += 1
-            mismatches += max(0, len(original_norm) - len(typed_norm))
-            server_accuracy = round(((typed_chars - mismatches) / typed_chars) * 100, 2) if typed_chars > 0 else 100.0
-            server_wpm = round(((typed_chars / 5.0) / duration_seconds) * 60, 2) if duration_seconds > 0 else 0.0
-            server_mistakes = mismatches
-            
-            # Override client values if they differ significantly
-            if abs(server_wpm - wpm) / (server_wpm + 1e-6) > 0.2:
-                logger.info(f"Competition Code WPM mismatch for user {request.user.username}: client={wpm}, server={server_wpm}")
-                wpm = server_wpm
-            if abs(server_accuracy - accuracy) > 10:
-                logger.info(f"Competition Code accuracy mismatch for user {request.user.username}: client={accuracy}, server={server_accuracy}")
-                accuracy = server_accuracy
-            if abs(server_mistakes - mistakes) > 2:
-                logger.info(f"Competition Code mistakes mismatch for user {request.user.username}: client={mistakes}, server={server_mistakes}")
-                mistakes = server_mistakes
+        if stage.text or stage.code_snippet:
+            if stage.text:
+                session_type, original, context = 'text', stage.text.get_normalized_body(), 'Competition'
+            else:
+                session_type, original, context = 'code', stage.code_snippet.get_normalized_body(), 'Competition Code'
+            score = score_submission(typed_text, original, duration_seconds, session_type, original_is_normalized=True)
+            wpm, accuracy, mistakes = reconcile_metrics(
+                wpm, accuracy, mistakes, score,
+                username=request.user.username,
+                context=context,
+            )
         
         # Save stage result with transaction
         with transaction.atomic():
@@ -74,13 +74,13 @@ echo ""
 echo -e "${GREEN}✅ Deployment tayyor!${NC}"
 echo ""
 echo "📋 Keyingi qadamlar:"
-echo "1. Gunicorn orqali server ishga tushiring:"
-echo "   gunicorn typing_platform.wsgi:application --bind 0.0.0.0:8000 --workers 4"
+echo "1. Uvicorn (ASGI) orqali server ishga tushiring (bir nechta worker uchun .env da CACHE_BACKEND=redis):"
+echo "   uvicorn typing_platform.asgi:application --host 127.0.0.1 --port 8000 --workers 4 --proxy-headers"
 echo ""
 echo "2. Systemd service yaratish (tavsiya qilinadi):"
 echo "   sudo nano /etc/systemd/system/typing-platform.service"
 echo ""
-echo "3. Nginx konfiguratsiyasi:"
+echo "3. Nginx konfiguratsiyasi (/ws/ uchun Upgrade/Connection sarlavhalari bilan):"
 echo "   DEPLOYMENT.md faylini ko'ring"
 echo ""
 echo -e "${GREEN}🎉 Muvaffaqiyatli!${NC}"
@@ -1,11 +1,10 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.db.models import Avg, Max, Count
 from django.utils import timezone
 from django.core.cache import cache
 from django.core.paginator import Paginator
 from datetime import timedelta
-from typing_practice.models import UserResult
+from typing_practice.archive import period_totals, summarize
 from django.contrib.auth.models import User
 from accounts.models import UserProfile
 import logging
@@ -13,6 +12,36 @@ import logging
 logger = logging.getLogger('typing_platform')
 
 
+def _period_start(period):
+    """First date included in a leaderboard period (None = all time)"""
+    if period == 'week':
+        return timezone.now().date() - timedelta(days=7)
+    if period == 'month':
+        return timezone.now().date() - timedelta(days=30)
+    return None
+
+
+def _leaderboard_stats(totals):
+    """period_totals -> list of per-user stat dicts with user fields"""
+    users = {
+        u['id']: u for u in User.objects.filter(id__in=list(totals)).values('id', 'username', 'first_name', 'last_name')
+    }
+    user_stats = []
+    for user_id, user_totals in totals.items():
+        user = users.get(user_id)
+        if not user or not user_totals['sessions']:
+            continue
+        stat = summarize(user_totals)
+        stat.update({
+            'user__id': user_id,
+            'user__username': user['username'],
+            'user__first_name': user['first_name'],
+            'user__last_name': user['last_name'],
+        })
+        user_stats.append(stat)
+    return user_stats
+
+
 @login_required
 def index(request):
     period = request.GET.get('period', 'all')
@@ -35,19 +64,10 @@ def index(request):
     leaderboard_data = cache.get(cache_key)
     
     if leaderboard_data is None:
-        # Calculate date range
-        if period == 'week':
-            start_date = timezone.now() - timedelta(days=7)
-        elif period == 'month':
-            start_date = timezone.now() - timedelta(days=30)
-        else:
-            start_date = None
-        
-        # Filter results
-        if start_date:
-            results = UserResult.objects.filter(time__gte=start_date)
-        else:
-            results = UserResult.objects.all()
+        # Totals come from daily rollups plus not yet archived results
+        start_date = _period_start(period)
+        session_type = 'code' if leaderboard_type == 'code_wpm' else None
+        user_stats = _leaderboard_stats(period_totals(since=start_date, session_type=session_type))
         
         # Helper function to build leaderboard data
         def build_leaderboard_data(user_stats, include_accuracy=False):
@@ -90,36 +110,16 @@ def index(request):
             
             return leaderboard_data
         
-        # Get leaderboard based on type with optimized query
-        if leaderboard_type == 'wpm':
-            # Overall WPM leaderboard - ordered by average WPM, then max WPM, then username for consistency
-            user_stats = results.values('user__username', 'user__id', 'user__first_name', 'user__last_name').annotate(
-                avg_wpm=Avg('wpm'),
-                max_wpm=Max('wpm'),
-                total_sessions=Count('id')
-            ).filter(total_sessions__gte=1).order_by('-avg_wpm', '-max_wpm', 'user__username')
-            
-            leaderboard_data = build_leaderboard_data(user_stats, include_accuracy=False)
-        
-        elif leaderboard_type == 'code_wpm':
-            # Code WPM leaderboard - ordered by average WPM, then max WPM, then username for consistency
-            code_results = results.filter(session_type='code')
-            user_stats = code_results.values('user__username', 'user__id', 'user__first_name', 'user__last_name').annotate(
-                avg_wpm=Avg('wpm'),
-                max_wpm=Max('wpm'),
-                total_sessions=Count('id')
-            ).filter(total_sessions__gte=1).order_by('-avg_wpm', '-max_wpm', 'user__username')
-            
+        # Get leaderboard based on type
+        if leaderboard_type in ('wpm', 'code_wpm'):
+            # WPM leaderboards - ordered by average WPM, then max WPM, then username for consistency
+            user_stats.sort(key=lambda stat: (-stat['avg_wpm'], -stat['max_wpm'], stat['user__username']))
             leaderboard_data = build_leaderboard_data(user_stats, include_accuracy=False)
         
         else:  # accuracy
             # Accuracy leaderboard - ordered by accuracy, then avg WPM, then username for consistency
-            user_stats = results.values('user__username', 'user__id', 'user__first_name', 'user__last_name').annotate(
-                avg_accuracy=Avg('accuracy'),
-                avg_wpm=Avg('wpm'),
-                total_sessions=Count('id')
-            ).filter(total_sessions__gte=5).order_by('-avg_accuracy', '-avg_wpm', 'user__username')
-            
+            user_stats = [stat for stat in user_stats if stat['total_sessions'] >= 5]
+            user_stats.sort(key=lambda stat: (-stat['avg_accuracy'], -stat['avg_wpm'], stat['user__username']))
             leaderboard_data = build_leaderboard_data(user_stats, include_accuracy=True)
         
         # Cache for 5 minutes
@@ -140,20 +140,8 @@ def index(request):
     user_stats = None
     if user_rank:
         # Get user's stats for comparison
-        user_results = UserResult.objects.filter(user=request.user)
-        if period == 'week':
-            start_date = timezone.now() - timedelta(days=7)
-            user_results = user_results.filter(time__gte=start_date)
-        elif period == 'month':
-            start_date = timezone.now() - timedelta(days=30)
-            user_results = user_results.filter(time__gte=start_date)
-        
-        user_stats = user_results.aggregate(
-            avg_wpm=Avg('wpm'),
-            max_wpm=Max('wpm'),
-            avg_accuracy=Avg('accuracy'),
-            total_sessions=Count('id')
-        )
+        user_totals = period_totals(since=_period_start(period), user=request.user)
+        user_stats = summarize(user_totals.get(request.user.id))
         
         # Compare with top 3
         top_3 = list(leaderboard_data[:3]) if len(leaderboard_data) >= 3 else list(leaderboard_data)
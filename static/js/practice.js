@@ -71,6 +71,28 @@ window.TP_utils = (function(){
         return String(s).replace(/[&<>"']/g, function(m){ return {'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;',"'":'&#39;'}[m]; });
     }
 
+    // Keystroke recorder: diffs successive input values into [t_ms, code] events (8 = backspace)
+    function createKeystrokeRecorder(limit){
+        const max = limit || 20000;
+        let events = [], previous = '';
+        return {
+            record(value, t_ms){
+                const t = Math.max(0, Math.round(t_ms));
+                const n = Math.min(previous.length, value.length);
+                let p = 0;
+                while(p < n && previous[p] === value[p]) p++;
+                for(let i = previous.length; i > p && events.length < max; i--) events.push([t, 8]);
+                for(const ch of value.slice(p)){
+                    if(events.length >= max) break;
+                    events.push([t, ch.codePointAt(0)]);
+                }
+                previous = value;
+            },
+            reset(){ events = []; previous = ''; },
+            events(){ return events; }
+        };
+    }
+
     // Offline save queue (very small): store pending payloads in localStorage under 'tp_offline_queue'
     function enqueueOfflineSave(payload){
         try{
@@ -80,21 +102,21 @@ window.TP_utils = (function(){
             localStorage.setItem(key, JSON.stringify(arr));
         }catch(e){ console.warn('enqueueOfflineSave failed', e); }
     }
+    // Flush the queue through the batch endpoint: one request per 50 results
     async function flushOfflineQueue(url, csrf){
         try{
             const key = 'tp_offline_queue';
             const arr = JSON.parse(localStorage.getItem(key) || '[]');
             if(!arr.length) return;
-            const remaining = [];
-            for(const item of arr){
-                try{
-                    const res = await autoSave(url, item.payload, csrf);
-                    if(!res.ok) remaining.push(item);
-                }catch(e){ remaining.push(item); }
-            }
+            const batch = arr.slice(0, 50);
+            const res = await autoSave(url, {results: batch.map(item => item.payload)}, csrf);
+            if(!res.ok) return; // keep the queue for the next attempt
+            // Every sent item got an answer (saved or rejected), items queued meanwhile stay
+            const remaining = JSON.parse(localStorage.getItem(key) || '[]').slice(batch.length);
             localStorage.setItem(key, JSON.stringify(remaining));
+            if(remaining.length) await flushOfflineQueue(url, csrf);
         }catch(e){ console.warn('flushOfflineQueue failed', e); }
     }
 
-    return { showToast, animateCounter, autoSave, updateProgressBar, enqueueOfflineSave, flushOfflineQueue, renderPerChar, escapeHtml };
+    return { showToast, animateCounter, autoSave, updateProgressBar, createKeystrokeRecorder, enqueueOfflineSave, flushOfflineQueue, renderPerChar, escapeHtml };
 })();
@@ -13,4 +13,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'typing_platform.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up
+from battles.consumers import battle_progress  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """Django for HTTP, the battle progress socket for WebSockets"""
+    if scope['type'] == 'websocket':
+        return await battle_progress(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -1,27 +1,13 @@
-from django.core.cache import cache
 from django.contrib.auth import get_user_model
 from accounts.models import Notification
-import time
-
-ONLINE_TIMEOUT = 300  # 5 daqiqa (soniya)
+from . import presence
 
 
 def online_count(request):
     """
     Context processor to provide online user count and total users count.
-    Only counts users who were active within ONLINE_TIMEOUT seconds.
+    The online count is read from the presence buckets (O(1), see typing_platform.presence).
     """
-    # Get roster of potentially online users
-    roster = cache.get("online-roster", [])
-    now = int(time.time())
-    alive = []
-    
-    # Check each user's last activity timestamp
-    for uid in roster:
-        timestamp = cache.get(f"online-user:{uid}")
-        if timestamp and (now - timestamp) <= ONLINE_TIMEOUT:
-            alive.append(uid)
-    
     # Get total registered users count
     User = get_user_model()
     try:
@@ -38,7 +24,7 @@ def online_count(request):
             pass
     
     return {
-        "online_count": len(set(alive)),
+        "online_count": presence.online_count(),
         "total_users_count": total_users_count,
         "unread_notifications": unread_notifications,
     }
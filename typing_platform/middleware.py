@@ -1,11 +1,8 @@
-import time
-from django.core.cache import cache
-
-ONLINE_TIMEOUT = 300  # 5 daqiqa ichida ko'ringanlar "online"
+from . import presence
 
 
 class ActiveUserMiddleware:
-    """Track active users by updating their last seen timestamp in cache"""
+    """Track active users in the time-bucketed presence sets (typing_platform.presence)"""
     
     def __init__(self, get_response):
         self.get_response = get_response
@@ -13,18 +10,9 @@ class ActiveUserMiddleware:
     def __call__(self, request):
         response = self.get_response(request)
         
-        # Only track authenticated users
+        # Only track authenticated users (throttled to one write per PRESENCE_WRITE_SECONDS)
         if request.user.is_authenticated:
-            now = int(time.time())
-            uid = request.user.id
-            
-            # Store user's last activity timestamp
-            cache.set(f"online-user:{uid}", now, ONLINE_TIMEOUT)
-            
-            # Maintain a roster of online users (set as list for cache compatibility)
-            roster = set(cache.get("online-roster", []))
-            roster.add(uid)
-            cache.set("online-roster", list(roster), ONLINE_TIMEOUT)
+            presence.touch(request.user.id)
         
         return response
 
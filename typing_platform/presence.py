@@ -0,0 +1,89 @@
+"""
+Online presence kept in the shared cache as time buckets.
+
+Time is cut into BUCKET_SECONDS buckets. A user counts as online while they have been seen
+in the current or the previous bucket. Every key a write touches is independent, so
+concurrent requests never overwrite each other:
+
+- `presence:<bucket>:<uid>` marks the user as seen in the bucket (cache.add, first write wins)
+- `presence:<bucket>:count` counts the users marked in the bucket (cache.incr)
+- `presence:<bucket>:fresh` counts the ones that were not already in the previous bucket,
+  so the online count is count(previous) + fresh(current): two keys, whatever the number
+  of users
+- `presence:<bucket>:slot:<n>` holds the first SAMPLE_SIZE users of the bucket; the n comes
+  from the count increment, so slots never collide
+
+A user is written at most once per PRESENCE_WRITE_SECONDS (guarded by cache.add), and
+reads use get_many.
+"""
+import time
+from django.conf import settings
+from typing_platform.state import cache
+
+BUCKET_SECONDS = 60
+SAMPLE_SIZE = 200
+KEY_TIMEOUT = 3 * BUCKET_SECONDS  # a bucket is read while current and while previous
+
+
+def current_bucket(now=None):
+    return int(now if now is not None else time.time()) // BUCKET_SECONDS
+
+
+def write_interval():
+    # Writing less often than once per bucket would let active users drop out
+    return min(getattr(settings, 'PRESENCE_WRITE_SECONDS', 30), BUCKET_SECONDS)
+
+
+def _key(bucket, suffix):
+    return f'presence:{bucket}:{suffix}'
+
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, KEY_TIMEOUT)
+        return cache.incr(key)
+
+
+def touch(user_id, now=None):
+    """Record that a user is active; returns False when throttled or already counted"""
+    if not cache.add(f'presence-throttle:{user_id}', 1, write_interval()):
+        return False
+    bucket = current_bucket(now)
+    if not cache.add(_key(bucket, user_id), 1, KEY_TIMEOUT):
+        return False
+    position = _incr(_key(bucket, 'count'))
+    if cache.get(_key(bucket - 1, user_id)) is None:
+        _incr(_key(bucket, 'fresh'))
+    if position <= SAMPLE_SIZE:
+        cache.set(_key(bucket, f'slot:{position}'), user_id, KEY_TIMEOUT)
+    return True
+
+
+def online_count(now=None):
+    """Number of users seen in the current or previous bucket (two cache reads)"""
+    bucket = current_bucket(now)
+    counts = cache.get_many([_key(bucket - 1, 'count'), _key(bucket, 'fresh')])
+    return sum(counts.values())
+
+
+def is_online(user_id, now=None):
+    bucket = current_bucket(now)
+    return bool(cache.get_many([_key(bucket, user_id), _key(bucket - 1, user_id)]))
+
+
+def active_users(limit=SAMPLE_SIZE, now=None):
+    """Up to `limit` ids of online users, most recently bucketed first (one get_many)"""
+    bucket = current_bucket(now)
+    limit = min(limit, SAMPLE_SIZE)
+    keys = [_key(b, f'slot:{n}') for b in (bucket, bucket - 1) for n in range(1, limit + 1)]
+    slots = cache.get_many(keys)
+    active = []
+    for key in keys:
+        user_id = slots.get(key)
+        if user_id is not None and user_id not in active:
+            active.append(user_id)
+            if len(active) == limit:
+                break
+    return active
@@ -112,6 +112,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'typing_platform.wsgi.application'
+ASGI_APPLICATION = 'typing_platform.asgi.application'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/6.0/ref/settings/#default-auto-field
@@ -210,33 +211,28 @@ else:
 # Caching
 # Production uchun Redis tavsiya qilinadi, lekin LocMemCache ham ishlaydi
 CACHE_BACKEND = get_env_variable('CACHE_BACKEND', 'locmem')
+# "state" keshi: jang jarayoni, tezkor jang navbati, onlayn foydalanuvchilar va ko'rilgan matnlar
+# (typing_platform.state). Bu ma'lumotlar faqat keshda turadi, shuning uchun alohida alias, muddatsiz
+# va katta MAX_ENTRIES bilan. Bir nechta worker uchun u umumiy (Redis) bo'lishi shart.
+STATE_CACHE_MAX_ENTRIES = int(get_env_variable('STATE_CACHE_MAX_ENTRIES', '100000'))
 
 if CACHE_BACKEND == 'redis':
-    try:
-        CACHES = {
-            'default': {
-                'BACKEND': 'django.core.cache.backends.redis.RedisCache',
-                'LOCATION': get_env_variable('REDIS_URL', 'redis://127.0.0.1:6379/1'),
-                'TIMEOUT': 300,  # 5 minutes
-                'OPTIONS': {
-                    'CLIENT_CLASS': 'django_redis.client.DefaultClient',
-                }
-            }
-        }
-    except ImportError:
-        # Redis library yo'q bo'lsa, LocMemCache ishlatiladi
-        CACHES = {
-            'default': {
-                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-                'LOCATION': 'unique-snowflake',
-                'TIMEOUT': 300,
-                'OPTIONS': {
-                    'MAX_ENTRIES': 1000
-                }
-            }
-        }
+    REDIS_URL = get_env_variable('REDIS_URL', 'redis://127.0.0.1:6379/1')
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'TIMEOUT': 300,  # 5 minutes
+        },
+        'state': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': get_env_variable('STATE_REDIS_URL', REDIS_URL),
+            'TIMEOUT': None,  # har bir kalit o'z muddatini beradi
+            'KEY_PREFIX': 'state',
+        },
+    }
 else:
-    # Default LocMemCache
+    # Default LocMemCache (faqat bitta jarayon: development yoki bitta worker)
     CACHES = {
         'default': {
             'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
@@ -245,9 +241,61 @@ else:
             'OPTIONS': {
                 'MAX_ENTRIES': 1000
             }
-        }
+        },
+        'state': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'typing-state',
+            'TIMEOUT': None,
+            'OPTIONS': {
+                'MAX_ENTRIES': STATE_CACHE_MAX_ENTRIES
+            }
+        },
     }
 
+# Practice content selection pool (typing_practice.selection)
+# True bo'lsa Text/CodeSnippet obyektlari ham xotirada saqlanadi (tanlash 0 ta query)
+CONTENT_POOL_CACHE_OBJECTS = get_env_variable('CONTENT_POOL_CACHE_OBJECTS', 'False') == 'True'
+# Boshqa worker'lardagi o'zgarishlar (keshdagi versiya) ko'pi bilan shuncha soniyada bir marta tekshiriladi
+CONTENT_POOL_VERSION_CHECK_SECONDS = int(get_env_variable('CONTENT_POOL_VERSION_CHECK_SECONDS', '5'))
+# Foydalanuvchi ko'rgan matnlar bitmap'i (typing_practice.seen) keshda shuncha soniya saqlanadi
+SEEN_CACHE_TIMEOUT = int(get_env_variable('SEEN_CACHE_TIMEOUT', str(30 * 24 * 3600)))
+# Bitmap hajmi eng katta ID ga qarab o'sadi, lekin shu bitdan oshmaydi (65536 bit = 8 KB)
+SEEN_MAX_BITS = int(get_env_variable('SEEN_MAX_BITS', str(1 << 16)))
+
+# Gamification (XP, badge, streak) - run_gamification_worker orqali fon rejimida
+# False bo'lsa natija saqlash so'rovi ichida sinxron bajariladi
+GAMIFICATION_ASYNC = get_env_variable('GAMIFICATION_ASYNC', 'True') == 'True'
+
+# Frontend telemetriya (typing_practice.telemetry) - xotirada yig'ilib, partiyalab yoziladi
+TELEMETRY_DIR = LOG_DIR / 'telemetry'
+TELEMETRY_FLUSH_SIZE = int(get_env_variable('TELEMETRY_FLUSH_SIZE', '200'))
+TELEMETRY_FLUSH_SECONDS = int(get_env_variable('TELEMETRY_FLUSH_SECONDS', '10'))
+# True: partiyalar fon oqimida yoziladi (so'rov kutmaydi); False: hisobni to'ldirgan so'rov o'zi yozadi
+TELEMETRY_BACKGROUND_FLUSH = get_env_variable('TELEMETRY_BACKGROUND_FLUSH', 'True') == 'True'
+# Alohida hisoblanadigan hodisa turlari (vergul bilan); boshqalari "other" hisoblagichiga qo'shiladi
+TELEMETRY_EVENT_TYPES = [e.strip() for e in get_env_variable(
+    'TELEMETRY_EVENT_TYPES', 'offline_queue,replay_open,socket_fallback,js_error').split(',') if e.strip()]
+# Kunlik JSONL fayllar shuncha kun saqlanadi, eskilari o'chiriladi
+TELEMETRY_RETENTION_DAYS = int(get_env_variable('TELEMETRY_RETENTION_DAYS', '30'))
+
+# Jang jarayoni WebSocket orqali (battles.consumers). InMemoryChannelLayer bitta jarayon ichida ishlaydi;
+# CacheChannelLayer "state" keshi orqali barcha worker'larga yetkazadi (CACHE_BACKEND=redis bo'lsa default)
+BATTLE_CHANNEL_LAYER = get_env_variable('BATTLE_CHANNEL_LAYER', (
+    'battles.channel_layer.CacheChannelLayer' if CACHE_BACKEND == 'redis'
+    else 'battles.channel_layer.InMemoryChannelLayer'))
+# Jang jarayoni keshda saqlanadi; BattleParticipant'ga har bir o'yinchi uchun ko'pi bilan shuncha soniyada bir marta yoziladi
+BATTLE_PROGRESS_CHECKPOINT_SECONDS = int(get_env_variable('BATTLE_PROGRESS_CHECKPOINT_SECONDS', '30'))
+# opponent-progress/?wait=N long-poll so'rovini ushlab turishning yuqori chegarasi (soniya)
+BATTLE_PROGRESS_MAX_WAIT_SECONDS = int(get_env_variable('BATTLE_PROGRESS_MAX_WAIT_SECONDS', '20'))
+# Tezkor jang navbati (battles.matchmaking): so'nggi status so'rovidan keyin ticket shuncha soniya yashaydi
+MATCHMAKING_TICKET_SECONDS = int(get_env_variable('MATCHMAKING_TICKET_SECONDS', '30'))
+
+# Online userlar (typing_platform.presence) - har bir user uchun keshga ko'pi bilan shuncha soniyada bir marta yoziladi
+PRESENCE_WRITE_SECONDS = int(get_env_variable('PRESENCE_WRITE_SECONDS', '30'))
+
+# Kod sintaksisini serverda ranglash (typing_practice.highlighting) - content hash bo'yicha keshlanadi
+CODE_HIGHLIGHT_CACHE_TIMEOUT = int(get_env_variable('CODE_HIGHLIGHT_CACHE_TIMEOUT', str(7 * 24 * 3600)))
+
 # Logging
 LOGGING = {
     'version': 1,
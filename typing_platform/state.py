@@ -0,0 +1,33 @@
+"""
+Cache for shared runtime state: live battle progress, the quick match queue, online presence
+and seen sets (battles.live, battles.matchmaking, typing_platform.presence, typing_practice.seen).
+
+These keys are the only copy of their data between writes, so they live in their own cache alias
+(STATE_CACHE) with no default timeout and no small entry limit, instead of the default cache whose
+entries can be culled. The alias must be shared by every process (Redis in production);
+`manage.py check --deploy` warns when it is process-local.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.checks import Tags, Warning, register
+from django.utils.connection import ConnectionProxy
+
+STATE_CACHE = 'state'
+LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+cache = ConnectionProxy(caches, STATE_CACHE)
+
+
+@register(Tags.caches, deploy=True)
+def check_state_cache(app_configs, **kwargs):
+    backend = settings.CACHES.get(STATE_CACHE, {}).get('BACKEND')
+    if backend in LOCAL_BACKENDS:
+        return [Warning(
+            f"The '{STATE_CACHE}' cache uses {backend.rsplit('.', 1)[-1]}, which is not shared between processes.",
+            hint="Set CACHE_BACKEND=redis: battle progress, matchmaking and presence need one cache for all workers.",
+            id='typing_platform.W001',
+        )]
+    return []
@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from .state import cache
+from . import presence
+from .context_processors import online_count
+
+User = get_user_model()
+
+MINUTE = presence.BUCKET_SECONDS
+START = 1_000_000 * MINUTE  # start of a bucket
+
+
+class PresenceTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_users_stay_online_for_the_current_and_previous_bucket(self):
+        presence.touch(1, now=START)
+        presence.touch(2, now=START + 10)
+        self.assertEqual(presence.online_count(now=START + 20), 2)
+        self.assertTrue(presence.is_online(1, now=START + MINUTE + 30))
+        self.assertEqual(presence.online_count(now=START + MINUTE + 30), 2)
+        self.assertEqual(presence.online_count(now=START + 2 * MINUTE), 0)
+        self.assertFalse(presence.is_online(1, now=START + 2 * MINUTE))
+
+    def test_users_seen_in_both_buckets_are_counted_once(self):
+        presence.touch(1, now=START)
+        cache.delete('presence-throttle:1')
+        presence.touch(1, now=START + MINUTE)
+        presence.touch(2, now=START + MINUTE)
+        self.assertEqual(presence.online_count(now=START + MINUTE), 2)
+        self.assertEqual(presence.active_users(now=START + MINUTE), [1, 2])
+
+    @override_settings(PRESENCE_WRITE_SECONDS=30)
+    def test_writes_are_throttled_per_user(self):
+        self.assertTrue(presence.touch(1, now=START))
+        self.assertFalse(presence.touch(1, now=START + 1))
+        self.assertTrue(presence.touch(2, now=START + 1))
+
+    def test_active_user_sample_is_bounded(self):
+        for user_id in range(1, 11):
+            presence.touch(user_id, now=START)
+        self.assertEqual(presence.active_users(limit=3, now=START), [1, 2, 3])
+        self.assertEqual(presence.online_count(now=START), 10)
+
+
+class ActiveUserMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_requests_mark_the_user_online(self):
+        user = User.objects.create_user(username='online', password='pass')
+        self.client.force_login(user)
+        response = self.client.get(reverse('home'))
+        self.assertTrue(presence.is_online(user.id))
+        self.assertEqual(online_count(response.wsgi_request)['online_count'], 1)
@@ -0,0 +1,22 @@
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from . import state
+
+LOCMEM = 'django.core.cache.backends.locmem.LocMemCache'
+REDIS = 'django.core.cache.backends.redis.RedisCache'
+
+
+class StateCacheTests(SimpleTestCase):
+    def test_state_keys_live_outside_the_default_cache(self):
+        state.cache.set('state-test', 1)
+        self.assertIsNone(caches['default'].get('state-test'))
+        self.assertEqual(caches[state.STATE_CACHE].get('state-test'), 1)
+        state.cache.delete('state-test')
+
+    @override_settings(CACHES={'default': {'BACKEND': LOCMEM}, 'state': {'BACKEND': LOCMEM}})
+    def test_deploy_check_warns_about_a_process_local_state_cache(self):
+        self.assertEqual([w.id for w in state.check_state_cache(None)], ['typing_platform.W001'])
+
+    @override_settings(CACHES={'default': {'BACKEND': LOCMEM}, 'state': {'BACKEND': REDIS}})
+    def test_deploy_check_accepts_a_shared_state_cache(self):
+        self.assertEqual(state.check_state_cache(None), [])
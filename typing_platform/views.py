@@ -1,13 +1,11 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
-from django.db.models import Avg, Max, Count
-from django.core.cache import cache
 from django.core.paginator import Paginator
 from django.utils import timezone
 from django.utils.safestring import mark_safe
 import json
-from collections import defaultdict
-from typing_practice.models import UserResult
+from typing_practice.models import UserResult, UserStats
+from typing_practice.archive import daily_progress
 from competitions.models import Competition, CompetitionParticipant
 from accounts.models import UserProfile, UserLevel, UserBadge, DailyChallenge, ChallengeCompletion, Notification
 import logging
@@ -25,26 +23,8 @@ def home(request):
 def dashboard(request):
     user = request.user
     
-    # Try to get cached stats
-    cache_key = f'user_stats_{user.id}'
-    cached_stats = cache.get(cache_key)
-    
-    if cached_stats:
-        stats = cached_stats
-    else:
-        # Get user statistics with optimized query
-        results = UserResult.objects.filter(user=user)
-        
-        # Single aggregate query for all stats
-        stats = results.aggregate(
-            avg_wpm=Avg('wpm'),
-            max_wpm=Max('wpm'),
-            avg_accuracy=Avg('accuracy'),
-            total_sessions=Count('id')
-        )
-        
-        # Cache for 1 minute
-        cache.set(cache_key, stats, 60)
+    # Running stats (one row, maintained on save)
+    stats = UserStats.for_user(user)
     
     # Recent results with pagination
     results = UserResult.objects.filter(user=user).select_related('text', 'code_snippet')[:10]
@@ -73,27 +53,19 @@ def dashboard(request):
     if today_challenge:
         challenge_completed = ChallengeCompletion.objects.filter(user=user, challenge=today_challenge).exists()
     
-    # Recent progress data (last 10 results, grouped by date)
-    progress_data = UserResult.objects.filter(user=user).order_by('-time')[:10]
-    # Group by date and calculate average for same dates
-    wpm_by_date = defaultdict(list)
-    accuracy_by_date = defaultdict(list)
-    for r in reversed(progress_data):
-        date_str = r.time.strftime('%d.%m')
-        wpm_by_date[date_str].append(r.wpm)
-        accuracy_by_date[date_str].append(r.accuracy)
-    
-    wpm_data = [{'date': date, 'wpm': sum(wpms) / len(wpms)} for date, wpms in wpm_by_date.items()]
-    accuracy_data = [{'date': date, 'accuracy': sum(accs) / len(accs)} for date, accs in accuracy_by_date.items()]
+    # Recent progress data (last 10 active days, from daily rollups)
+    progress_days = daily_progress(user, limit=10)
+    wpm_data = [{'date': day['date'].strftime('%d.%m'), 'wpm': day['avg_wpm']} for day in progress_days]
+    accuracy_data = [{'date': day['date'].strftime('%d.%m'), 'accuracy': day['avg_accuracy']} for day in progress_days]
     
     # Unread notifications count
     unread_notifications = Notification.get_unread_count(user)
     
     context = {
-        'avg_wpm': round(stats.get('avg_wpm') or 0, 2),
-        'max_wpm': round(stats.get('max_wpm') or 0, 2),
-        'avg_accuracy': round(stats.get('avg_accuracy') or 0, 2),
-        'total_sessions': stats.get('total_sessions') or 0,
+        'avg_wpm': round(stats.avg_wpm, 2),
+        'max_wpm': round(stats.max_wpm, 2),
+        'avg_accuracy': round(stats.avg_accuracy, 2),
+        'total_sessions': stats.total_sessions,
         'recent_results': results,
         'user_competitions': user_competitions,
         'pending_competitions': pending_competitions,
@@ -1,10 +1,12 @@
 from django.contrib import admin
-from .models import Text, CodeSnippet, UserResult
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast, NullIf
+from .models import Text, CodeSnippet, UserResult, UserStats, TextStats, DailyResultRollup, KeystrokeTimeline, ErrorProfile, TelemetryCounter
 
 
 @admin.register(Text)
 class TextAdmin(admin.ModelAdmin):
-    list_display = ['title', 'difficulty', 'word_count', 'created_at']
+    list_display = ['title', 'difficulty', 'word_count', 'difficulty_score', 'created_at']
     list_filter = ['difficulty', 'word_count', 'created_at']
     search_fields = ['title', 'body']
     fields = ['title', 'difficulty', 'word_count', 'body']
@@ -12,7 +14,8 @@ class TextAdmin(admin.ModelAdmin):
     
     def save_model(self, request, obj, form, change):
         # Validate word count matches actual body word count
-        actual_word_count = len(obj.body.split())
+        obj.refresh_content_metadata()
+        actual_word_count = obj.body_word_count
         if abs(actual_word_count - obj.word_count) > 2:  # Allow 2 words difference
             from django.contrib import messages
             messages.warning(request, f'Eslatma: Matndagi haqiqiy so\'zlar soni ({actual_word_count}) belgilangan so\'zlar sonidan ({obj.word_count}) farq qiladi.')
@@ -21,14 +24,88 @@ class TextAdmin(admin.ModelAdmin):
 
 @admin.register(CodeSnippet)
 class CodeSnippetAdmin(admin.ModelAdmin):
-    list_display = ['title', 'language', 'difficulty', 'created_at']
+    list_display = ['title', 'language', 'difficulty', 'difficulty_score', 'indent_depth', 'created_at']
     list_filter = ['language', 'difficulty', 'created_at']
     search_fields = ['title', 'code_body']
 
 
 @admin.register(UserResult)
 class UserResultAdmin(admin.ModelAdmin):
-    list_display = ['user', 'session_type', 'wpm', 'accuracy', 'date', 'time']
-    list_filter = ['session_type', 'date', 'time']
+    list_display = ['user', 'session_type', 'wpm', 'accuracy', 'date', 'time', 'rolled_up']
+    list_filter = ['session_type', 'rolled_up', 'date', 'time']
     search_fields = ['user__username']
     readonly_fields = ['time', 'date']
+
+
+@admin.register(UserStats)
+class UserStatsAdmin(admin.ModelAdmin):
+    list_display = ['user', 'total_sessions', 'max_wpm', 'text_sessions', 'code_sessions', 'updated_at']
+    search_fields = ['user__username']
+    readonly_fields = [field.name for field in UserStats._meta.fields]
+
+
+@admin.register(TextStats)
+class TextStatsAdmin(admin.ModelAdmin):
+    """Texts and snippets ordered by observed difficulty: lowest average accuracy, then lowest WPM"""
+    list_display = ['content', 'attempts', 'observed_accuracy', 'observed_wpm', 'average_mistakes', 'max_wpm']
+    list_filter = ['text__difficulty', 'code_snippet__language', 'code_snippet__difficulty']
+    search_fields = ['text__title', 'code_snippet__title']
+    list_select_related = ['text', 'code_snippet']
+    readonly_fields = [field.name for field in TextStats._meta.fields]
+
+    def get_queryset(self, request):
+        attempts = NullIf(Cast('attempts', FloatField()), 0.0)
+        return super().get_queryset(request).annotate(
+            avg_accuracy_value=F('total_accuracy') / attempts,
+            avg_wpm_value=F('total_wpm') / attempts,
+            avg_mistakes_value=F('total_mistakes') / attempts,
+        ).filter(attempts__gt=0).order_by('avg_accuracy_value', 'avg_wpm_value')
+
+    @admin.display(description='Avg accuracy', ordering='avg_accuracy_value')
+    def observed_accuracy(self, obj):
+        return round(obj.avg_accuracy, 1)
+
+    @admin.display(description='Avg WPM', ordering='avg_wpm_value')
+    def observed_wpm(self, obj):
+        return round(obj.avg_wpm, 1)
+
+    @admin.display(description='Avg mistakes', ordering='avg_mistakes_value')
+    def average_mistakes(self, obj):
+        return round(obj.avg_mistakes, 1)
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(DailyResultRollup)
+class DailyResultRollupAdmin(admin.ModelAdmin):
+    list_display = ['user', 'date', 'session_type', 'sessions', 'max_wpm']
+    list_filter = ['session_type', 'date']
+    search_fields = ['user__username']
+    readonly_fields = [field.name for field in DailyResultRollup._meta.fields]
+
+
+@admin.register(KeystrokeTimeline)
+class KeystrokeTimelineAdmin(admin.ModelAdmin):
+    list_display = ['result', 'keystroke_count', 'duration_ms', 'median_interval_ms', 'suspicion', 'flags']
+    list_filter = ['analysis_version']
+    search_fields = ['result__user__username']
+    ordering = ['-suspicion']
+    exclude = ['data']
+    readonly_fields = [field.name for field in KeystrokeTimeline._meta.fields if field.name != 'data']
+
+
+@admin.register(ErrorProfile)
+class ErrorProfileAdmin(admin.ModelAdmin):
+    list_display = ['user', 'updated_at']
+    search_fields = ['user__username']
+    exclude = ['counts']
+    readonly_fields = ['user', 'summary', 'updated_at']
+
+
+@admin.register(TelemetryCounter)
+class TelemetryCounterAdmin(admin.ModelAdmin):
+    list_display = ['event_type', 'date', 'count']
+    list_filter = ['date', 'event_type']
+    search_fields = ['event_type']
+    readonly_fields = ['event_type', 'date', 'count']
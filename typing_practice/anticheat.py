@@ -0,0 +1,153 @@
+"""
+Keystroke-timing plausibility checks for practice results.
+
+A stored keystroke timeline (see typing_practice.keystrokes) is analysed as NumPy arrays:
+
+- inter-key intervals: median and coefficient of variation (robotic, too even rhythm)
+- paste bursts: runs of characters arriving with (almost) no delay between them
+- sustained rate: most characters typed in any PEAK_WINDOW_MS window
+- history: median interval compared with the user's recent unflagged sessions
+- duration: client-reported duration compared with the timeline's own duration
+
+analyze_timeline() is cheap enough for the save path (a few vectorized passes over at most
+MAX_KEYSTROKES events); the rescore_keystrokes command re-runs it over stored timelines.
+"""
+import logging
+from .keystrokes import BACKSPACE
+
+logger = logging.getLogger('typing_platform')
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logger.warning("NumPy is not installed. Keystroke timing analysis is disabled.")
+
+# Bump when thresholds or features change so rescore_keystrokes picks stale rows up
+ANALYSIS_VERSION = 1
+
+MIN_KEYSTROKES = 20  # shorter timelines are not judged
+PASTE_INTERVAL_MS = 5
+PASTE_MIN_CHARS = 8
+PEAK_WINDOW_MS = 5000
+MAX_SUSTAINED_CPS = 20.0  # ~240 WPM held for the whole window
+PAUSE_MS = 2000  # longer gaps are thinking pauses, not rhythm
+MIN_RHYTHM_INTERVALS = 50
+MIN_INTERVAL_CV = 0.12
+HISTORY_SIZE = 20
+MIN_HISTORY = 5
+HISTORY_SPEEDUP = 2.0  # median interval this many times shorter than usual
+DURATION_RATIO = 0.5  # reported duration shorter than half of the recorded one
+
+FLAG_WEIGHTS = {
+    'paste_burst': 0.6,
+    'sustained_rate': 0.6,
+    'uniform_rhythm': 0.4,
+    'history_outlier': 0.3,
+    'duration_mismatch': 0.5,
+}
+# Sessions at or above this score are reported and excluded from the history baseline
+SUSPICION_THRESHOLD = 0.5
+
+
+def _runs(mask):
+    """Lengths of the runs of True values in a boolean array"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+
+
+def timing_features(events):
+    """Vectorized timing features of (t_ms, code) events, or None when there is too little data"""
+    if not NUMPY_AVAILABLE or len(events) < MIN_KEYSTROKES:
+        return None
+    data = np.asarray(events, dtype=np.int64)
+    times, codes = data[:, 0], data[:, 1]
+    intervals = np.diff(times)
+
+    # A paste burst of k characters is k-1 near-zero intervals between non-backspace keys
+    typed = codes[1:] != BACKSPACE
+    bursts = _runs((intervals <= PASTE_INTERVAL_MS) & typed) + 1
+    longest_burst = int(bursts.max()) if bursts.size else 0
+
+    # Characters typed in the PEAK_WINDOW_MS window starting at every keystroke
+    window_counts = np.searchsorted(times, times + PEAK_WINDOW_MS, side='left') - np.arange(len(times))
+    full_window = times + PEAK_WINDOW_MS <= times[-1]
+    peak_cps = float(window_counts[full_window].max()) * 1000 / PEAK_WINDOW_MS if full_window.any() else 0.0
+
+    rhythm = intervals[(intervals > PASTE_INTERVAL_MS) & (intervals < PAUSE_MS)]
+    if rhythm.size:
+        median_interval = float(np.median(rhythm))
+        mean = float(rhythm.mean())
+        interval_cv = float(rhythm.std() / mean) if mean else 0.0
+    else:
+        median_interval, interval_cv = 0.0, 0.0
+
+    return {
+        'keystrokes': len(events),
+        'duration_ms': int(times[-1] - times[0]),
+        'median_interval_ms': median_interval,
+        'interval_cv': interval_cv,
+        'rhythm_intervals': int(rhythm.size),
+        'longest_burst': longest_burst,
+        'peak_cps': peak_cps,
+    }
+
+
+def analyze_timeline(events, history=(), reported_duration=None):
+    """
+    Score one timeline. `history` is the user's recent median intervals (ms), newest first.
+    Returns {'suspicion', 'flags', 'features'} or None when the timeline cannot be judged.
+    """
+    features = timing_features(events)
+    if features is None:
+        return None
+
+    flags = []
+    if features['longest_burst'] >= PASTE_MIN_CHARS:
+        flags.append('paste_burst')
+    if features['peak_cps'] > MAX_SUSTAINED_CPS:
+        flags.append('sustained_rate')
+    if features['rhythm_intervals'] >= MIN_RHYTHM_INTERVALS and features['interval_cv'] < MIN_INTERVAL_CV:
+        flags.append('uniform_rhythm')
+    history = [value for value in history if value]
+    if len(history) >= MIN_HISTORY and features['median_interval_ms']:
+        baseline = float(np.median(history))
+        if features['median_interval_ms'] * HISTORY_SPEEDUP < baseline:
+            flags.append('history_outlier')
+    if reported_duration is not None and features['duration_ms'] > PAUSE_MS:
+        if reported_duration * 1000 < features['duration_ms'] * DURATION_RATIO:
+            flags.append('duration_mismatch')
+
+    suspicion = min(1.0, sum(FLAG_WEIGHTS[flag] for flag in flags))
+    return {'suspicion': round(suspicion, 2), 'flags': flags, 'features': features}
+
+
+def recent_intervals(user_id):
+    """Median intervals of the user's latest unflagged analysed sessions, newest first"""
+    from .models import KeystrokeTimeline
+    return list(
+        KeystrokeTimeline.objects.filter(
+            result__user_id=user_id,
+            median_interval_ms__isnull=False,
+            suspicion__lt=SUSPICION_THRESHOLD,
+        ).order_by('-result__time').values_list('median_interval_ms', flat=True)[:HISTORY_SIZE]
+    )
+
+
+def check_submission(user, events, reported_duration, history=None):
+    """
+    Inline check used by the save views. Loads the user's history unless given and
+    logs suspicious sessions. Returns the analysis or None.
+    """
+    if len(events) < MIN_KEYSTROKES or not NUMPY_AVAILABLE:
+        return None
+    if history is None:
+        history = recent_intervals(user.id)
+    analysis = analyze_timeline(events, history, reported_duration)
+    if analysis and analysis['suspicion'] >= SUSPICION_THRESHOLD:
+        logger.warning(
+            f"Suspicious keystroke timing: user={user.username}, "
+            f"suspicion={analysis['suspicion']}, flags={','.join(analysis['flags'])}"
+        )
+    return analysis
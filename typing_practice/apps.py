@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class TypingPracticeConfig(AppConfig):
     name = 'typing_practice'
+
+    def ready(self):
+        import typing_practice.signals
@@ -0,0 +1,172 @@
+"""
+Result archive: raw UserResult rows are folded into DailyResultRollup in the background
+(archive_results command) and only the last few raw rows per user are kept.
+
+Readers (period leaderboards, progress charts) combine rollups with the raw rows that
+have not been folded yet, so they are exact without waiting for the archiver.
+"""
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Count, Sum, Max, F, Value
+from django.db.models.functions import Greatest
+from .models import UserResult, DailyResultRollup
+import logging
+
+logger = logging.getLogger('typing_platform')
+
+KEEP_RAW_RESULTS = 10  # raw results kept per user for "recent results" lists
+KEEP_TIMELINE_RESULTS = 200  # results with a keystroke timeline kept per user (replays, anticheat history)
+
+RESULT_FIELDS = ('id', 'user_id', 'date', 'session_type', 'wpm', 'accuracy', 'mistakes', 'duration_seconds')
+
+
+def _group_results(rows):
+    """Sum raw result rows per (user_id, session_type, date)"""
+    groups = defaultdict(lambda: {
+        'sessions': 0, 'total_wpm': 0.0, 'max_wpm': 0.0, 'total_accuracy': 0.0,
+        'total_duration_seconds': 0, 'total_mistakes': 0, 'perfect_sessions': 0, 'high_accuracy_sessions': 0,
+    })
+    for row in rows:
+        group = groups[(row['user_id'], row['session_type'], row['date'])]
+        wpm, accuracy = float(row['wpm'] or 0), float(row['accuracy'] or 0)
+        group['sessions'] += 1
+        group['total_wpm'] += wpm
+        group['max_wpm'] = max(group['max_wpm'], wpm)
+        group['total_accuracy'] += accuracy
+        group['total_duration_seconds'] += row['duration_seconds'] or 0
+        group['total_mistakes'] += row['mistakes'] or 0
+        group['perfect_sessions'] += int(accuracy >= 100)
+        group['high_accuracy_sessions'] += int(accuracy >= 95)
+    return groups
+
+
+def _add_to_rollup(user_id, session_type, date, totals):
+    """Add totals to one rollup row with F-expressions (row created on first use)"""
+    updates = {
+        field: Greatest(F(field), Value(value)) if field == 'max_wpm' else F(field) + value
+        for field, value in totals.items()
+    }
+    rollups = DailyResultRollup.objects.filter(user_id=user_id, session_type=session_type, date=date)
+    if not rollups.update(**updates):
+        DailyResultRollup.objects.get_or_create(user_id=user_id, session_type=session_type, date=date)
+        rollups.update(**updates)
+
+
+def fold_pending_results(batch_size=1000):
+    """Fold results not yet rolled up into DailyResultRollup. Returns number of results folded."""
+    folded = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                UserResult.objects.select_for_update(skip_locked=True)
+                .filter(rolled_up=False).order_by('id').values(*RESULT_FIELDS)[:batch_size]
+            )
+            if not rows:
+                break
+            for (user_id, session_type, date), totals in _group_results(rows).items():
+                _add_to_rollup(user_id, session_type, date, totals)
+            UserResult.objects.filter(id__in=[row['id'] for row in rows]).update(rolled_up=True)
+        folded += len(rows)
+    return folded
+
+
+def prune_raw_results(keep_last=KEEP_RAW_RESULTS, keep_timelines=KEEP_TIMELINE_RESULTS):
+    """
+    Delete rolled-up results beyond the last `keep_last` per user. Returns deleted count.
+    The last `keep_timelines` results that carry a keystroke timeline are kept too, since
+    deleting a result deletes its replay (rescore_keystrokes and the anticheat history read them).
+    """
+    deleted = 0
+    user_ids = (
+        UserResult.objects.values('user_id').annotate(total=Count('id'))
+        .filter(total__gt=keep_last).order_by().values_list('user_id', flat=True)
+    )
+    for user_id in user_ids:
+        results = UserResult.objects.filter(user_id=user_id).order_by('-time', '-id')
+        stale_ids = set(results.values_list('id', flat=True)[keep_last:])
+        if keep_timelines:
+            stale_ids -= set(
+                results.filter(keystroke_timeline__isnull=False).values_list('id', flat=True)[:keep_timelines]
+            )
+        _, per_model = UserResult.objects.filter(id__in=stale_ids, rolled_up=True).delete()
+        deleted += per_model.get(UserResult._meta.label, 0)  # not the cascaded timelines
+    return deleted
+
+
+def archive_results(keep_last=KEEP_RAW_RESULTS, batch_size=1000, keep_timelines=KEEP_TIMELINE_RESULTS):
+    """Fold pending results into rollups, then prune old raw rows"""
+    folded = fold_pending_results(batch_size)
+    deleted = prune_raw_results(keep_last, keep_timelines)
+    if folded or deleted:
+        logger.info(f"Result archive: {folded} result(s) rolled up, {deleted} old raw result(s) deleted")
+    return folded, deleted
+
+
+def _filtered(since=None, session_type=None, user=None):
+    rollups = DailyResultRollup.objects.all()
+    pending = UserResult.objects.filter(rolled_up=False)
+    if since:
+        rollups, pending = rollups.filter(date__gte=since), pending.filter(date__gte=since)
+    if session_type:
+        rollups, pending = rollups.filter(session_type=session_type), pending.filter(session_type=session_type)
+    if user is not None:
+        rollups, pending = rollups.filter(user=user), pending.filter(user=user)
+    return rollups, pending
+
+
+def _merge(target, key, row):
+    entry = target.setdefault(key, {'sessions': 0, 'total_wpm': 0.0, 'max_wpm': 0.0, 'total_accuracy': 0.0})
+    entry['sessions'] += row['sessions'] or 0
+    entry['total_wpm'] += row['total_wpm'] or 0
+    entry['max_wpm'] = max(entry['max_wpm'], row['max_wpm'] or 0)
+    entry['total_accuracy'] += row['total_accuracy'] or 0
+
+
+def period_totals(since=None, session_type=None, user=None):
+    """Per-user totals {user_id: {sessions, total_wpm, max_wpm, total_accuracy}} since a date"""
+    rollups, pending = _filtered(since, session_type, user)
+    totals = {}
+    for row in rollups.values('user_id').annotate(
+        sessions=Sum('sessions'), total_wpm=Sum('total_wpm'),
+        max_wpm=Max('max_wpm'), total_accuracy=Sum('total_accuracy'),
+    ).order_by():
+        _merge(totals, row['user_id'], row)
+    for row in pending.values('user_id').annotate(
+        sessions=Count('id'), total_wpm=Sum('wpm'),
+        max_wpm=Max('wpm'), total_accuracy=Sum('accuracy'),
+    ).order_by():
+        _merge(totals, row['user_id'], row)
+    return totals
+
+
+def summarize(totals):
+    """Averages for one period_totals entry (None-safe)"""
+    totals = totals or {}
+    sessions = totals.get('sessions') or 0
+    return {
+        'total_sessions': sessions,
+        'avg_wpm': totals['total_wpm'] / sessions if sessions else 0,
+        'max_wpm': totals.get('max_wpm') or 0,
+        'avg_accuracy': totals['total_accuracy'] / sessions if sessions else 0,
+    }
+
+
+def daily_progress(user, since=None, limit=None):
+    """User's per-day averages (oldest first); `limit` keeps only the last N active days"""
+    rollups, pending = _filtered(since, user=user)
+    days = {}
+    for row in rollups.values('date').annotate(
+        sessions=Sum('sessions'), total_wpm=Sum('total_wpm'),
+        max_wpm=Max('max_wpm'), total_accuracy=Sum('total_accuracy'),
+    ).order_by():
+        _merge(days, row['date'], row)
+    for row in pending.values('date').annotate(
+        sessions=Count('id'), total_wpm=Sum('wpm'),
+        max_wpm=Max('wpm'), total_accuracy=Sum('accuracy'),
+    ).order_by():
+        _merge(days, row['date'], row)
+
+    dates = sorted(days)
+    if limit:
+        dates = dates[-limit:]
+    return [dict(summarize(days[day]), date=day) for day in dates]
@@ -0,0 +1,79 @@
+"""
+Objective difficulty metrics of practice content.
+
+All metrics are computed from the normalized body alone, so they can be refreshed on every
+save without looking at the rest of the corpus:
+
+- entropy: Shannon entropy of the characters (bits per character)
+- symbol_density: share of characters that are neither letters, digits nor whitespace
+- rare_bigram_ratio: share of letter bigrams outside COMMON_BIGRAMS
+- avg_word_length: mean length of whitespace-separated tokens
+- indent_depth: deepest indentation level (code; 4 spaces or a tab per level)
+
+difficulty_score folds them into one 0-100 number for range filtering.
+"""
+import math
+from collections import Counter
+
+# Frequent letter bigrams of English prose plus common Latin-script Uzbek ones
+COMMON_BIGRAMS = frozenset("""
+th he in er an re on at en nd ti es or te of ed is it al ar st to nt ng se ha as ou io le ve
+co me de hi ri ro ic ne ea ra ce li ch ll be ma si om ur ca el ta la ns di fo ho pe ec pr no
+ct us ac ot il tr ly nc et ut ss so rs un lo wa ge ie wh ee wi em ad ol rt po we na ul ni ts
+mo ow pa im mi ai sh ir su id os iv ia am fi ci vi pl ig tu ev ld ry mp fe bl ab gh ty op wo
+sa ay ex ke fr oo av ag if ap gr od bo sp rd do uc bu ei ov by rm ep tt oc fa ef cu rn sc gi
+da yo cr cl du ga qa ko lg
+""".split())
+
+WEIGHTS = (
+    # metric, weight, value giving 0, value giving full weight
+    ('entropy', 0.25, 3.5, 5.0),
+    ('symbol_density', 0.30, 0.0, 0.25),
+    ('rare_bigram_ratio', 0.20, 0.0, 0.5),
+    ('avg_word_length', 0.15, 3.5, 7.0),
+    ('indent_depth', 0.10, 0, 4),
+)
+INDENT_WIDTH = 4
+
+
+def _indent_level(line):
+    stripped = line.lstrip(' \t')
+    if not stripped:
+        return 0
+    prefix = line[:len(line) - len(stripped)]
+    return prefix.count('\t') + prefix.count(' ') // INDENT_WIDTH
+
+
+def compute_metrics(normalized_body, session_type='text'):
+    """Metric dict (see module docstring) of a normalized body"""
+    length = len(normalized_body)
+    if not length:
+        return {'entropy': 0.0, 'symbol_density': 0.0, 'rare_bigram_ratio': 0.0,
+                'avg_word_length': 0.0, 'indent_depth': 0, 'difficulty_score': 0.0}
+
+    counts = Counter(normalized_body)
+    entropy = -sum(n / length * math.log2(n / length) for n in counts.values())
+    symbols = sum(n for ch, n in counts.items() if not (ch.isalnum() or ch.isspace()))
+
+    lowered = normalized_body.lower()
+    letter_bigrams = [a + b for a, b in zip(lowered, lowered[1:]) if a.isalpha() and b.isalpha()]
+    rare = sum(1 for bigram in letter_bigrams if bigram not in COMMON_BIGRAMS)
+
+    words = normalized_body.split()
+    metrics = {
+        'entropy': round(entropy, 4),
+        'symbol_density': round(symbols / length, 4),
+        'rare_bigram_ratio': round(rare / len(letter_bigrams), 4) if letter_bigrams else 0.0,
+        'avg_word_length': round(sum(map(len, words)) / len(words), 4) if words else 0.0,
+        'indent_depth': max(map(_indent_level, normalized_body.split('\n'))) if session_type == 'code' else 0,
+    }
+    metrics['difficulty_score'] = difficulty_score(metrics)
+    return metrics
+
+
+def difficulty_score(metrics):
+    """Weighted 0-100 score of the metrics, each clamped to its expected range"""
+    score = 0.0
+    for name, weight, low, high in WEIGHTS:
+        score += weight * min(1.0, max(0.0, (metrics[name] - low) / (high - low)))
+    return round(score * 100, 2)
@@ -0,0 +1,152 @@
+"""
+Per-user character and bigram error counts built from result mistakes_list entries.
+
+Counts live in flat uint32 arrays indexed by a fixed alphabet (slot 0 collects every other
+character): attempts and errors per expected character and a SIZE x SIZE matrix of errors
+per (previous, expected) bigram. They are stored as one zlib blob on ErrorProfile and merged
+with each new result; a small summary for the API and profile widget is kept next to it so
+reads never touch the arrays.
+"""
+import heapq
+import math
+import struct
+import sys
+import zlib
+from array import array
+from collections import Counter
+
+# Append-only: slots of existing characters must never move
+ALPHABET = (
+    '\x00 \n\t'
+    'abcdefghijklmnopqrstuvwxyz'
+    '0123456789'
+    '.,;:!?\'"-()[]{}<>=+*/\\_#@$%&|^~`'
+    'ʻʼ'
+)
+SIZE = len(ALPHABET)
+CHAR_SLOTS = {ch: slot for slot, ch in enumerate(ALPHABET)}
+MAX_COUNT = 0xFFFFFFFF
+
+MAX_MISTAKE_CHARS = 200  # per mistakes_list entry
+MIN_ATTEMPTS = 20  # keys typed fewer times are not ranked as weak
+TOP_LIMIT = 5
+HEAT_LEVELS = 4
+
+DISPLAY = {'\x00': '·', ' ': '␣', '\n': '↵', '\t': '⇥'}
+
+
+def char_slot(ch):
+    return CHAR_SLOTS.get(ch.lower(), 0)
+
+
+def _display(slot):
+    return DISPLAY.get(ALPHABET[slot], ALPHABET[slot])
+
+
+def mistake_pairs(mistakes_list):
+    """(expected, typed) strings from text ({word, typed}) and code ({original, typed}) entries"""
+    for entry in mistakes_list or []:
+        if not isinstance(entry, dict):
+            continue
+        expected = entry.get('word', entry.get('original'))
+        typed = entry.get('typed', '')
+        if isinstance(expected, str) and isinstance(typed, str) and expected:
+            yield expected[:MAX_MISTAKE_CHARS], typed[:MAX_MISTAKE_CHARS]
+
+
+def count_errors(mistakes_list, session_type='text'):
+    """Counters of wrong/missing expected characters and bigrams (as slot and slot pair index)"""
+    boundary = char_slot('\n' if session_type == 'code' else ' ')
+    chars, bigrams = Counter(), Counter()
+    for expected, typed in mistake_pairs(mistakes_list):
+        previous = boundary
+        for i, ch in enumerate(expected):
+            slot = char_slot(ch)
+            if i >= len(typed) or typed[i] != ch:
+                chars[slot] += 1
+                bigrams[previous * SIZE + slot] += 1
+            previous = slot
+    return chars, bigrams
+
+
+def count_attempts(text):
+    """Counter of expected characters (by slot) the user attempted to type"""
+    attempts = Counter()
+    for ch, count in Counter(text.lower()).items():
+        attempts[CHAR_SLOTS.get(ch, 0)] += count
+    return attempts
+
+
+class ErrorCounts:
+    """Array-backed counters; the blob is version byte + zlib(uint16 size | attempts | errors | bigrams)"""
+    VERSION = 1
+
+    def __init__(self):
+        self.attempts = array('I', bytes(4 * SIZE))
+        self.errors = array('I', bytes(4 * SIZE))
+        self.bigrams = array('I', bytes(4 * SIZE * SIZE))
+
+    @classmethod
+    def from_blob(cls, blob):
+        counts = cls()
+        if not blob:
+            return counts
+        blob = bytes(blob)
+        if blob[0] != cls.VERSION:
+            raise ValueError(f'unsupported error profile version {blob[0]}')
+        body = zlib.decompress(blob[1:])
+        (size,) = struct.unpack_from('<H', body)
+        values = array('I')
+        values.frombytes(body[2:])
+        if sys.byteorder != 'little':
+            values.byteswap()
+        if len(values) != 2 * size + size * size or size > SIZE:
+            raise ValueError('corrupt error profile')
+        # A blob written with a shorter alphabet keeps its slots; new characters start at zero
+        counts.attempts[:size] = values[:size]
+        counts.errors[:size] = values[size:2 * size]
+        for row in range(size):
+            start = 2 * size + row * size
+            counts.bigrams[row * SIZE:row * SIZE + size] = values[start:start + size]
+        return counts
+
+    def to_blob(self):
+        values = self.attempts + self.errors + self.bigrams
+        if sys.byteorder != 'little':
+            values.byteswap()
+        return bytes([self.VERSION]) + zlib.compress(struct.pack('<H', SIZE) + values.tobytes(), 6)
+
+    def add(self, attempts, chars, bigrams):
+        for target, counter in ((self.attempts, attempts), (self.errors, chars), (self.bigrams, bigrams)):
+            for index, count in counter.items():
+                target[index] = min(MAX_COUNT, target[index] + count)
+
+    def summary(self, limit=TOP_LIMIT):
+        """Per-key rates with heat levels plus the weakest keys and most missed bigrams"""
+        keys = []
+        for slot in range(1, SIZE):
+            attempts, errors = self.attempts[slot], self.errors[slot]
+            if attempts:
+                keys.append({
+                    'char': _display(slot),
+                    'attempts': attempts,
+                    'errors': errors,
+                    'rate': round(min(errors, attempts) * 100 / attempts, 2),
+                })
+        ranked = [key for key in keys if key['attempts'] >= MIN_ATTEMPTS and key['errors']]
+        worst_rate = max((key['rate'] for key in ranked), default=0)
+        for key in keys:
+            # 0 (no data or no errors) .. HEAT_LEVELS (the weakest key)
+            ranked_key = worst_rate and key['attempts'] >= MIN_ATTEMPTS
+            key['level'] = math.ceil(key['rate'] * HEAT_LEVELS / worst_rate) if ranked_key else 0
+        weak_keys = heapq.nlargest(limit, ranked, key=lambda key: (key['rate'], key['errors']))
+        weak_bigrams = [
+            {'bigram': _display(index // SIZE) + _display(index % SIZE), 'errors': self.bigrams[index]}
+            for index in heapq.nlargest(limit, (i for i, n in enumerate(self.bigrams) if n), key=self.bigrams.__getitem__)
+        ]
+        return {
+            'total_errors': sum(self.errors),
+            'keys': keys,
+            'weak_keys': weak_keys,
+            'weak_bigrams': weak_bigrams,
+        }
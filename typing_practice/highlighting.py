@@ -0,0 +1,85 @@
+"""
+Server-side syntax highlighting of code snippets.
+
+A snippet's normalized body is tokenized once with Pygments and stored in the cache as one
+HTML string per line, keyed by language and content hash, so identical code is highlighted
+once and an edited snippet simply gets a new key. The post_save signal warms the entry; rows
+created without signals (import_corpus) are highlighted on first view.
+
+Pages embed the lines directly: the initial <code> block and the "future line" rendering of
+the typing overlay use them as-is, so the browser does no tokenizing. Token classes are the
+short Pygments ones; static/css/highlight.css holds the token rules of
+HtmlFormatter(style='default').get_style_defs('.hl') and of the 'github-dark' style under
+'.hl-dark'.
+"""
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+logger = logging.getLogger('typing_platform')
+
+try:
+    from pygments import highlight
+    from pygments.formatters import HtmlFormatter
+    from pygments.lexers import get_lexer_by_name
+    from pygments.util import ClassNotFound
+    PYGMENTS_AVAILABLE = True
+except ImportError:
+    PYGMENTS_AVAILABLE = False
+    logger.warning("Pygments is not installed. Code snippets are shown without syntax highlighting.")
+
+HIGHLIGHT_VERSION = 1  # bump when the markup changes so cached lines are regenerated
+LEXERS = {
+    'python': 'python',
+    'javascript': 'javascript',
+    'cpp': 'cpp',
+    'java': 'java',
+}
+
+
+def cache_key(language, content_hash):
+    return f'code_highlight:v{HIGHLIGHT_VERSION}:{language}:{content_hash}'
+
+
+def highlight_lines(code, language):
+    """Highlighted HTML of every line of `code` (escaped plain lines when the language is unknown)"""
+    lines = code.split('\n')
+    if not PYGMENTS_AVAILABLE:
+        return [escape(line) for line in lines]
+    try:
+        lexer = get_lexer_by_name(LEXERS.get(language, language), stripnl=False, ensurenl=False)
+    except ClassNotFound:
+        return [escape(line) for line in lines]
+    # The formatter closes and reopens spans at every newline, so each line is self-contained
+    html = highlight(code, lexer, HtmlFormatter(nowrap=True)).split('\n')
+    return (html + [''] * len(lines))[:len(lines)]
+
+
+def snippet_lines(snippet):
+    """Cached highlighted lines of a CodeSnippet's normalized body"""
+    normalized_body = snippet.get_normalized_body()
+    content_hash = snippet.content_hash or snippet.hash_normalized(normalized_body)
+    key = cache_key(snippet.language, content_hash)
+    lines = cache.get(key)
+    if lines is None:
+        lines = highlight_lines(normalized_body, snippet.language)
+        cache.set(key, lines, getattr(settings, 'CODE_HIGHLIGHT_CACHE_TIMEOUT', 7 * 24 * 3600))
+    return lines
+
+
+def warm(snippet):
+    """Highlight a saved snippet ahead of its first view"""
+    try:
+        snippet_lines(snippet)
+    except Exception as e:
+        logger.error(f"Highlighting snippet {snippet.pk} failed: {e}")
+
+
+def highlight_context(snippet):
+    """Template context for a code page: per-line HTML for the typing overlay and the joined block"""
+    if snippet is None or not PYGMENTS_AVAILABLE:
+        return {'code_lines': None, 'code_html': None}
+    lines = snippet_lines(snippet)
+    return {'code_lines': lines, 'code_html': mark_safe('\n'.join(lines))}
@@ -0,0 +1,133 @@
+"""
+Compact keystroke timeline codec.
+
+A timeline is a list of (t_ms, code) events: milliseconds since the first keystroke and
+the Unicode code point typed (BACKSPACE for a deleted character). It is stored as
+
+    version byte + zlib( uint32 count | uint16 deltas[count] | uint32 codes[count] )
+
+all little-endian. Delta-encoding keeps almost every interval in two bytes and the
+column layout lets zlib squeeze the repetitive code column; a typical session is a few
+hundred bytes instead of tens of kilobytes of JSON.
+"""
+import struct
+import sys
+import zlib
+from array import array
+
+FORMAT_VERSION = 1
+BACKSPACE = 8
+MAX_KEYSTROKES = 20000
+MAX_DELTA_MS = 0xFFFF  # longer pauses are clamped to ~65 seconds
+MAX_CODE_POINT = 0x10FFFF
+
+
+class TimelineError(ValueError):
+    """Malformed keystroke payload or blob"""
+
+
+def _to_le(values):
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_le(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def parse_keystrokes(raw):
+    """Validate client keystrokes ([[t_ms, code], ...]) -> list of (t_ms, code) tuples"""
+    if raw in (None, ''):
+        return []
+    if not isinstance(raw, list):
+        raise TimelineError('keystrokes must be a list')
+    if len(raw) > MAX_KEYSTROKES:
+        raise TimelineError(f'too many keystrokes ({len(raw)} > {MAX_KEYSTROKES})')
+
+    events = []
+    for item in raw:
+        if not isinstance(item, (list, tuple)) or len(item) != 2:
+            raise TimelineError('keystroke must be a [t_ms, code] pair')
+        try:
+            t_ms, code = int(item[0]), int(item[1])
+        except (TypeError, ValueError):
+            raise TimelineError('keystroke values must be integers')
+        if t_ms < 0 or not 0 <= code <= MAX_CODE_POINT:
+            raise TimelineError('keystroke value out of range')
+        events.append((t_ms, code))
+    return normalize_events(events)
+
+
+def _deltas(events):
+    """Stored deltas: times made monotonic (out-of-order client clocks become zero) and clamped"""
+    previous = None
+    for t_ms, code in events:
+        delta = 0 if previous is None else max(0, t_ms - previous)
+        previous = t_ms if previous is None else max(previous, t_ms)
+        yield min(delta, MAX_DELTA_MS), code
+
+
+def normalize_events(events):
+    """
+    Events exactly as they come back from a stored blob (times from 0, monotonic, long pauses
+    clamped), so the save-time analysis sees the same timeline rescore_keystrokes decodes
+    """
+    normalized, t_ms = [], 0
+    for delta, code in _deltas(events):
+        t_ms += delta
+        normalized.append((t_ms, code))
+    return normalized
+
+
+def encode_timeline(events):
+    """Encode (t_ms, code) events (absolute times) into the compact blob"""
+    deltas, codes = array('H'), array('I')
+    for delta, code in _deltas(events):
+        deltas.append(delta)
+        codes.append(code)
+
+    body = struct.pack('<I', len(codes)) + _to_le(deltas) + _to_le(codes)
+    return bytes([FORMAT_VERSION]) + zlib.compress(body, 9)
+
+
+def decode_timeline(blob):
+    """Decode a blob back into a list of (t_ms, code) events with absolute times from 0"""
+    if not blob:
+        return []
+    blob = bytes(blob)
+    if blob[0] != FORMAT_VERSION:
+        raise TimelineError(f'unsupported timeline version {blob[0]}')
+    try:
+        body = zlib.decompress(blob[1:])
+    except zlib.error as e:
+        raise TimelineError(f'corrupt timeline: {e}')
+
+    (count,) = struct.unpack_from('<I', body)
+    deltas_end = 4 + 2 * count
+    if len(body) != deltas_end + 4 * count:
+        raise TimelineError('corrupt timeline: length mismatch')
+    deltas = _from_le('H', body[4:deltas_end])
+    codes = _from_le('I', body[deltas_end:])
+
+    events, t_ms = [], 0
+    for delta, code in zip(deltas, codes):
+        t_ms += delta
+        events.append((t_ms, code))
+    return events
+
+
+def replay_text(events):
+    """Final typed text produced by a timeline"""
+    chars = []
+    for _, code in events:
+        if code == BACKSPACE:
+            if chars:
+                chars.pop()
+        else:
+            chars.append(chr(code))
+    return ''.join(chars)
@@ -0,0 +1,81 @@
+"""
+Shared base for content maintenance commands that rewrite rows in chunks.
+
+Rows are read with keyset pagination (pk > last pk, only the needed columns), changed in
+memory and written back with one bulk_update per chunk in its own short transaction, so
+memory stays bounded and no lock is held across the whole table. bulk_update skips
+post_save, so the model's selection pool is invalidated once at the end.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+
+class ChunkedUpdateCommand(BaseCommand):
+    """Subclasses set `model`, `fields` and `update_fields` and implement `process(obj)`"""
+    model = None
+    fields = ()  # columns loaded besides pk
+    update_fields = ()
+    default_chunk_size = 500
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=self.default_chunk_size,
+            help=f'Number of rows processed per chunk (default: {self.default_chunk_size})',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would change without writing anything',
+        )
+
+    def get_queryset(self, options):
+        return self.model.objects.all()
+
+    def process(self, obj):
+        """Change obj in memory; return True when it needs to be written"""
+        raise NotImplementedError
+
+    def chunks(self, queryset, chunk_size):
+        # Keyset pagination keeps each chunk query cheap and memory bounded
+        queryset = queryset.order_by('pk').only('pk', *self.fields)
+        last_pk = 0
+        while True:
+            chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            last_pk = chunk[-1].pk
+
+    def run(self, options):
+        """Process every row; returns (checked, changed)"""
+        chunk_size = max(1, options['chunk_size'])
+        checked = changed = 0
+        for chunk in self.chunks(self.get_queryset(options), chunk_size):
+            dirty = [obj for obj in chunk if self.process(obj)]
+            if dirty and not options['dry_run']:
+                with transaction.atomic():
+                    self.model.objects.bulk_update(dirty, self.update_fields)
+            checked += len(chunk)
+            changed += len(dirty)
+        if changed and not options['dry_run']:
+            self.invalidate_pool()
+        return checked, changed
+
+    def invalidate_pool(self):
+        from typing_practice.models import Text, CodeSnippet
+        from typing_practice.selection import text_pool, code_pool
+        pool = {Text: text_pool, CodeSnippet: code_pool}.get(self.model)
+        if pool is not None:
+            pool.invalidate()
+
+    def report(self, options, checked, changed, verb='updated'):
+        prefix = '[dry run] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}{self.model.__name__}: {changed} of {checked} row(s) {verb}'
+        ))
+
+    def handle(self, *args, **options):
+        checked, changed = self.run(options)
+        self.report(options, checked, changed)
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from typing_practice.archive import archive_results, KEEP_RAW_RESULTS, KEEP_TIMELINE_RESULTS
+
+
+class Command(BaseCommand):
+    help = 'Fold raw practice results into daily rollups and delete old raw rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep',
+            type=int,
+            default=KEEP_RAW_RESULTS,
+            help=f'Raw results kept per user (default: {KEEP_RAW_RESULTS})',
+        )
+        parser.add_argument(
+            '--keep-timelines',
+            type=int,
+            default=KEEP_TIMELINE_RESULTS,
+            help=f'Results with a keystroke timeline kept per user (default: {KEEP_TIMELINE_RESULTS})',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Results folded per transaction (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        folded, deleted = archive_results(
+            keep_last=max(0, options['keep']),
+            batch_size=max(1, options['batch_size']),
+            keep_timelines=max(0, options['keep_timelines']),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'{folded} result(s) rolled up, {deleted} old raw result(s) deleted')
+        )
@@ -0,0 +1,37 @@
+from django.db.models import Q
+from typing_practice.management.chunked import ChunkedUpdateCommand
+from typing_practice.models import Text, CodeSnippet
+from typing_practice.selection import text_pool, code_pool
+
+
+class Command(ChunkedUpdateCommand):
+    help = 'Compute normalized body, char/word counts, content hash and difficulty metrics for texts and code snippets (in chunks)'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute every row, not only rows without a content hash or difficulty metrics',
+        )
+
+    def get_queryset(self, options):
+        queryset = self.model.objects.all()
+        if not options['all']:
+            queryset = queryset.filter(Q(content_hash='') | Q(difficulty_score__isnull=True))
+        return queryset
+
+    def process(self, obj):
+        obj.refresh_content_metadata()
+        return True
+
+    def handle(self, *args, **options):
+        for model in (Text, CodeSnippet):
+            self.model = model
+            self.fields = (model.SOURCE_FIELD,)
+            self.update_fields = model.METADATA_FIELDS
+            checked, changed = self.run(options)
+            self.report(options, checked, changed)
+        # Chunked updates skip the save signals; drop the pools so score ranges see new values
+        text_pool.invalidate()
+        code_pool.invalidate()
@@ -0,0 +1,185 @@
+import csv
+import json
+import os
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from typing_practice.models import Text, CodeSnippet
+from typing_practice.selection import text_pool, code_pool
+
+CSV_FIELD_LIMIT = 10 * 1024 * 1024
+MAX_REPORTED_ERRORS = 20
+
+
+class RecordError(ValueError):
+    """Invalid corpus record (skipped)"""
+
+
+def _title_from(body, limit=60):
+    title = ' '.join(body.split())[:limit]
+    return title or 'Untitled'
+
+
+def build_text(record, default_difficulty):
+    body = record.get('body') or record.get('text')
+    if not isinstance(body, str) or not body.strip():
+        raise RecordError('body is empty')
+    difficulty = record.get('difficulty') or default_difficulty
+    if difficulty not in dict(Text.DIFFICULTY_CHOICES):
+        raise RecordError(f'unknown difficulty {difficulty!r}')
+    text = Text(title=(record.get('title') or _title_from(body))[:200], difficulty=difficulty, body=body)
+    text.refresh_content_metadata()
+    text.word_count = Text.word_count_bucket(text.body_word_count)
+    return text
+
+
+def build_code(record, default_difficulty):
+    body = record.get('code_body') or record.get('code') or record.get('body')
+    if not isinstance(body, str) or not body.strip():
+        raise RecordError('code is empty')
+    language = record.get('language')
+    if language not in dict(CodeSnippet.LANGUAGE_CHOICES):
+        raise RecordError(f'unknown language {language!r}')
+    difficulty = record.get('difficulty') or default_difficulty
+    if difficulty not in dict(CodeSnippet.DIFFICULTY_CHOICES):
+        raise RecordError(f'unknown difficulty {difficulty!r}')
+    snippet = CodeSnippet(title=(record.get('title') or _title_from(body))[:200], language=language,
+                          difficulty=difficulty, code_body=body)
+    snippet.refresh_content_metadata()
+    return snippet
+
+
+class Command(BaseCommand):
+    help = 'Stream texts and code snippets from JSONL/CSV files into the database (deduplicated by content hash)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='JSONL (.jsonl/.ndjson) or CSV (.csv) files')
+        parser.add_argument(
+            '--format',
+            choices=['jsonl', 'csv'],
+            help='Input format (default: from the file extension)',
+        )
+        parser.add_argument(
+            '--type',
+            choices=['text', 'code'],
+            help='Content type of every record (default: code when a record has a language, else text)',
+        )
+        parser.add_argument(
+            '--difficulty',
+            default='easy',
+            help='Difficulty for records without one (default: easy)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Records per dedup query and bulk_create (default: 1000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Parse and deduplicate without writing anything',
+        )
+
+    def handle(self, *args, **options):
+        for path in options['paths']:
+            if not os.path.isfile(path):
+                raise CommandError(f"File '{path}' not found")
+        if Text.objects.filter(content_hash='').exists() or CodeSnippet.objects.filter(content_hash='').exists():
+            self.stderr.write('Some rows have no content hash yet and will not be detected as duplicates; '
+                              'run backfill_content_metadata first.')
+
+        self.chunk_size = max(1, options['chunk_size'])
+        self.options = options
+        self.totals = {'read': 0, 'created': 0, 'duplicates': 0, 'invalid': 0}
+        self.pending = {Text: [], CodeSnippet: []}
+        # Nothing is inserted in a dry run, so repeats across chunks are tracked here instead
+        self.dry_run_hashes = {Text: set(), CodeSnippet: set()}
+        try:
+            for path in options['paths']:
+                for line_no, record in self.read(path):
+                    self.add(path, line_no, record)
+            for model in self.pending:
+                self.flush(model)
+        finally:
+            # bulk_create skips post_save, so the selection pools are not invalidated by signals
+            if self.totals['created']:
+                text_pool.invalidate()
+                code_pool.invalidate()
+
+        prefix = '[dry run] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}Read {self.totals['read']} record(s): {self.totals['created']} created, "
+            f"{self.totals['duplicates']} duplicate(s), {self.totals['invalid']} invalid"
+        ))
+
+    def read(self, path):
+        """Yield (line number, record dict) without loading the whole file"""
+        fmt = self.options['format'] or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+        with open(path, encoding='utf-8', newline='') as f:
+            if fmt == 'csv':
+                csv.field_size_limit(CSV_FIELD_LIMIT)
+                reader = csv.DictReader(f)
+                for record in reader:
+                    yield reader.line_num, record
+                return
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    record = e
+                yield line_no, record
+
+    def add(self, path, line_no, record):
+        self.totals['read'] += 1
+        try:
+            if isinstance(record, Exception):
+                raise RecordError(f'invalid JSON: {record}')
+            if not isinstance(record, dict):
+                raise RecordError('record is not an object')
+            content_type = self.options['type'] or ('code' if record.get('language') else 'text')
+            if content_type == 'code':
+                obj = build_code(record, self.options['difficulty'])
+            else:
+                obj = build_text(record, self.options['difficulty'])
+        except RecordError as e:
+            self.totals['invalid'] += 1
+            if self.totals['invalid'] <= MAX_REPORTED_ERRORS:
+                self.stderr.write(f'{path}:{line_no}: {e}')
+            return
+
+        pending = self.pending[type(obj)]
+        pending.append(obj)
+        if len(pending) >= self.chunk_size:
+            self.flush(type(obj))
+
+    def flush(self, model):
+        """Drop duplicates of the chunk (within itself and in the table) and insert the rest"""
+        chunk, self.pending[model] = self.pending[model], []
+        if not chunk:
+            return
+        hashes = {obj.content_hash for obj in chunk}
+        # Earlier chunks are already inserted, so the indexed lookup also catches repeats across the file
+        seen = set(model.objects.filter(content_hash__in=hashes).values_list('content_hash', flat=True))
+        if self.options['dry_run']:
+            seen |= hashes & self.dry_run_hashes[model]
+        new = []
+        for obj in chunk:
+            if obj.content_hash in seen:
+                continue
+            seen.add(obj.content_hash)
+            new.append(obj)
+        self.totals['duplicates'] += len(chunk) - len(new)
+
+        if self.options['dry_run']:
+            self.dry_run_hashes[model].update(obj.content_hash for obj in new)
+        elif new:
+            with transaction.atomic():
+                model.objects.bulk_create(new, batch_size=self.chunk_size)
+        self.totals['created'] += len(new)
+        self.stdout.write(
+            f"{model.__name__}: {self.totals['read']} read, {self.totals['created']} created, "
+            f"{self.totals['duplicates']} duplicate(s)"
+        )
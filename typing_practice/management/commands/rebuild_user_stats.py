@@ -0,0 +1,88 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, Sum, Max, Q
+from typing_practice.models import UserResult, UserStats, DailyResultRollup
+
+
+class Command(BaseCommand):
+    help = 'Recompute UserStats rows from scratch from daily rollups and not yet archived results'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Rebuild only this username (default: all users)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rows per bulk_create batch (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        results = UserResult.objects.filter(rolled_up=False)
+        rollups = DailyResultRollup.objects.all()
+        stats = UserStats.objects.all()
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['user']}' not found")
+            results = results.filter(user=user)
+            rollups = rollups.filter(user=user)
+            stats = stats.filter(user=user)
+
+        text, code = Q(session_type='text'), Q(session_type='code')
+        # Per-type aggregates first: later aliases shadow the rollup fields of the same name
+        rollup_rows = rollups.values('user_id').annotate(
+            text_sessions=Sum('sessions', filter=text),
+            text_total_wpm=Sum('total_wpm', filter=text),
+            text_max_wpm=Max('max_wpm', filter=text),
+            code_sessions=Sum('sessions', filter=code),
+            code_total_wpm=Sum('total_wpm', filter=code),
+            code_max_wpm=Max('max_wpm', filter=code),
+            total_sessions=Sum('sessions'),
+            total_wpm=Sum('total_wpm'),
+            max_wpm=Max('max_wpm'),
+            total_accuracy=Sum('total_accuracy'),
+            total_mistakes=Sum('total_mistakes'),
+            total_duration_seconds=Sum('total_duration_seconds'),
+            perfect_sessions=Sum('perfect_sessions'),
+            high_accuracy_sessions=Sum('high_accuracy_sessions'),
+        ).order_by()
+        result_rows = results.values('user_id').annotate(
+            total_sessions=Count('id'),
+            total_wpm=Sum('wpm'),
+            max_wpm=Max('wpm'),
+            total_accuracy=Sum('accuracy'),
+            total_mistakes=Sum('mistakes'),
+            total_duration_seconds=Sum('duration_seconds'),
+            perfect_sessions=Count('id', filter=Q(accuracy__gte=100)),
+            high_accuracy_sessions=Count('id', filter=Q(accuracy__gte=95)),
+            text_sessions=Count('id', filter=text),
+            text_total_wpm=Sum('wpm', filter=text),
+            text_max_wpm=Max('wpm', filter=text),
+            code_sessions=Count('id', filter=code),
+            code_total_wpm=Sum('wpm', filter=code),
+            code_max_wpm=Max('wpm', filter=code),
+        ).order_by()
+
+        totals = {}
+        for row in list(rollup_rows) + list(result_rows):
+            user_totals = totals.setdefault(row.pop('user_id'), {})
+            for field, value in row.items():
+                value = value or 0
+                if field.endswith('max_wpm'):
+                    user_totals[field] = max(user_totals.get(field, 0), value)
+                else:
+                    user_totals[field] = user_totals.get(field, 0) + value
+
+        objects = [UserStats(user_id=user_id, **fields) for user_id, fields in totals.items()]
+        with transaction.atomic():
+            deleted, _ = stats.delete()
+            UserStats.objects.bulk_create(objects, batch_size=max(1, options['batch_size']))
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt stats for {len(objects)} user(s) ({deleted} old row(s) replaced)')
+        )
@@ -0,0 +1,99 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from django.db import transaction
+from typing_practice.anticheat import (
+    ANALYSIS_VERSION, HISTORY_SIZE, NUMPY_AVAILABLE, SUSPICION_THRESHOLD, analyze_timeline,
+)
+from typing_practice.keystrokes import decode_timeline, TimelineError
+from typing_practice.models import KeystrokeTimeline
+
+UPDATE_FIELDS = ['median_interval_ms', 'suspicion', 'flags', 'analysis_version']
+
+
+class Command(BaseCommand):
+    help = 'Re-run keystroke timing analysis over stored timelines (stale ones by default)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Rescore only this username (default: all users)',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Rescore every timeline, not only ones analysed by an older version',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Timelines per decode/bulk_update batch (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        if not NUMPY_AVAILABLE:
+            raise CommandError('NumPy is not installed; keystroke analysis is unavailable')
+
+        timelines = KeystrokeTimeline.objects.all()
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['user']}' not found")
+            timelines = timelines.filter(result__user=user)
+
+        # Every row is walked in time order so each user's history baseline can be rebuilt,
+        # but only the rows being rescored have their blobs loaded
+        rows = timelines.order_by('result__user_id', 'result__time').values_list(
+            'pk', 'result__user_id', 'result__duration_seconds',
+            'median_interval_ms', 'suspicion', 'analysis_version',
+        )
+        batch_size = max(1, options['batch_size'])
+        self.history, self.user_id = [], None
+        self.analysed = self.flagged = self.skipped = 0
+
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                self.process(batch, options['all'])
+                batch = []
+        if batch:
+            self.process(batch, options['all'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Analysed {self.analysed} timeline(s): {self.flagged} flagged, {self.skipped} unreadable'
+        ))
+
+    def process(self, batch, rescore_all):
+        stale = [pk for pk, _, _, _, _, version in batch if rescore_all or version != ANALYSIS_VERSION]
+        blobs = KeystrokeTimeline.objects.only('data').in_bulk(stale) if stale else {}
+
+        updated = []
+        for pk, user_id, reported_duration, median, suspicion, _ in batch:
+            if user_id != self.user_id:
+                self.history, self.user_id = [], user_id
+            timeline = blobs.get(pk)
+            if timeline is not None:
+                try:
+                    events = decode_timeline(timeline.data)
+                except TimelineError as e:
+                    self.stderr.write(f'Timeline {pk}: {e}')
+                    self.skipped += 1
+                    continue
+                analysis = analyze_timeline(events, self.history, reported_duration)
+                if analysis:
+                    timeline.apply_analysis(analysis)
+                    self.flagged += analysis['suspicion'] >= SUSPICION_THRESHOLD
+                else:
+                    timeline.median_interval_ms, timeline.suspicion, timeline.flags = None, 0, []
+                    timeline.analysis_version = ANALYSIS_VERSION
+                median, suspicion = timeline.median_interval_ms, timeline.suspicion
+                updated.append(timeline)
+                self.analysed += 1
+            if median and suspicion < SUSPICION_THRESHOLD:
+                self.history = [median] + self.history[:HISTORY_SIZE - 1]
+
+        if updated:
+            with transaction.atomic():
+                KeystrokeTimeline.objects.bulk_update(updated, UPDATE_FIELDS)
@@ -1,33 +1,19 @@
-from django.core.management.base import BaseCommand
+from typing_practice.management.chunked import ChunkedUpdateCommand
 from typing_practice.models import Text
 
 
-class Command(BaseCommand):
+class Command(ChunkedUpdateCommand):
     help = 'Swap title and body fields for all texts (title -> body, body -> title)'
+    model = Text
+    fields = ('title', 'body')
+    update_fields = ['title', 'body', *Text.METADATA_FIELDS]
 
-    def handle(self, *args, **options):
-        texts = Text.objects.all()
-        swapped_count = 0
-        
-        for text in texts:
-            # Swap title and body
-            old_title = text.title
-            old_body = text.body
-            
-            text.title = old_body
-            text.body = old_title
-            text.save()
-            
-            swapped_count += 1
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f'Swapped: ID {text.id} - Old title: "{old_title[:50]}..." -> New title: "{text.title[:50]}..."'
-                )
-            )
-        
-        self.stdout.write(
-            self.style.SUCCESS(
-                f'\nCompleted! Swapped {swapped_count} texts.'
-            )
-        )
+    def process(self, text):
+        text.title, text.body = text.body, text.title
+        # bulk_update skips save(), so the normalized body and hash are refreshed here
+        text.refresh_content_metadata()
+        return True
 
+    def handle(self, *args, **options):
+        checked, changed = self.run(options)
+        self.report(options, checked, changed, verb='swapped')
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('typing_practice', '0003_text_word_count_alter_codesnippet_id_alter_text_body_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='codesnippet',
+            name='body_word_count',
+            field=models.IntegerField(default=0, editable=False, help_text="Haqiqiy so'zlar soni"),
+        ),
+        migrations.AddField(
+            model_name='codesnippet',
+            name='char_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='codesnippet',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='codesnippet',
+            name='normalized_body',
+            field=models.TextField(blank=True, editable=False, help_text='Normallashtirilgan matn (validatsiya uchun)'),
+        ),
+        migrations.AddField(
+            model_name='text',
+            name='body_word_count',
+            field=models.IntegerField(default=0, editable=False, help_text="Haqiqiy so'zlar soni"),
+        ),
+        migrations.AddField(
+            model_name='text',
+            name='char_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='text',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='text',
+            name='normalized_body',
+            field=models.TextField(blank=True, editable=False, help_text='Normallashtirilgan matn (validatsiya uchun)'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('typing_practice', '0004_codesnippet_body_word_count_codesnippet_char_count_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_sessions', models.IntegerField(default=0)),
+                ('total_wpm', models.FloatField(default=0)),
+                ('max_wpm', models.FloatField(default=0)),
+                ('total_accuracy', models.FloatField(default=0)),
+                ('total_mistakes', models.IntegerField(default=0)),
+                ('total_duration_seconds', models.IntegerField(default=0)),
+                ('perfect_sessions', models.IntegerField(default=0, help_text='100% aniqlikdagi sessiyalar')),
+                ('high_accuracy_sessions', models.IntegerField(default=0, help_text='95%+ aniqlikdagi sessiyalar')),
+                ('text_sessions', models.IntegerField(default=0)),
+                ('text_total_wpm', models.FloatField(default=0)),
+                ('text_max_wpm', models.FloatField(default=0)),
+                ('code_sessions', models.IntegerField(default=0)),
+                ('code_total_wpm', models.FloatField(default=0)),
+                ('code_max_wpm', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='typing_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'User stats',
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('typing_practice', '0005_userstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userresult',
+            name='rolled_up',
+            field=models.BooleanField(db_index=True, default=False, help_text="Kunlik rollup jadvaliga qo'shilganmi"),
+        ),
+        migrations.CreateModel(
+            name='DailyResultRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('session_type', models.CharField(choices=[('text', 'Text'), ('code', 'Code')], max_length=10)),
+                ('sessions', models.IntegerField(default=0)),
+                ('total_wpm', models.FloatField(default=0)),
+                ('max_wpm', models.FloatField(default=0)),
+                ('total_accuracy', models.FloatField(default=0)),
+                ('total_duration_seconds', models.IntegerField(default=0)),
+                ('total_mistakes', models.IntegerField(default=0)),
+                ('perfect_sessions', models.IntegerField(default=0)),
+                ('high_accuracy_sessions', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='result_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date', 'session_type'], name='typing_prac_date_de9f41_idx'), models.Index(fields=['user', '-date'], name='typing_prac_user_id_718110_idx')],
+                'unique_together': {('user', 'session_type', 'date')},
+            },
+        ),
+    ]
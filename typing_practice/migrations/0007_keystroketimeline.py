@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('typing_practice', '0006_userresult_rolled_up_dailyresultrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KeystrokeTimeline',
+            fields=[
+                ('result', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='keystroke_timeline', serialize=False, to='typing_practice.userresult')),
+                ('data', models.BinaryField()),
+                ('keystroke_count', models.IntegerField(default=0)),
+                ('duration_ms', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('typing_practice', '0007_keystroketimeline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='keystroketimeline',
+            name='analysis_version',
+            field=models.SmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='keystroketimeline',
+            name='flags',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='keystroketimeline',
+            name='median_interval_ms',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='keystroketimeline',
+            name='suspicion',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+    ]
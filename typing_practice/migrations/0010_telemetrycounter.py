@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('typing_practice', '0009_errorprofile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TelemetryCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(max_length=64)),
+                ('date', models.DateField()),
+                ('count', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-date', '-count'],
+                'unique_together': {('event_type', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('typing_practice', '0010_telemetrycounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='codesnippet',
+            name='avg_word_length',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='codesnippet',
+            name='difficulty_score',
+            field=models.FloatField(blank=True, db_index=True, editable=False, help_text='Umumiy qiyinlik (0-100)', null=True),
+        ),
+        migrations.AddField(
+            model_name='codesnippet',
+            name='entropy',
+            field=models.FloatField(blank=True, db_index=True, editable=False, help_text='Belgilar entropiyasi (bit)', null=True),
+        ),
+        migrations.AddField(
+            model_name='codesnippet',
+            name='indent_depth',
+            field=models.SmallIntegerField(blank=True, db_index=True, editable=False, help_text='Eng chuqur indentatsiya (kod)', null=True),
+        ),
+        migrations.AddField(
+            model_name='codesnippet',
+            name='rare_bigram_ratio',
+            field=models.FloatField(blank=True, db_index=True, editable=False, help_text='Kam uchraydigan harf juftliklari ulushi', null=True),
+        ),
+        migrations.AddField(
+            model_name='codesnippet',
+            name='symbol_density',
+            field=models.FloatField(blank=True, db_index=True, editable=False, help_text='Belgi/tinish belgilari ulushi', null=True),
+        ),
+        migrations.AddField(
+            model_name='text',
+            name='avg_word_length',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='text',
+            name='difficulty_score',
+            field=models.FloatField(blank=True, db_index=True, editable=False, help_text='Umumiy qiyinlik (0-100)', null=True),
+        ),
+        migrations.AddField(
+            model_name='text',
+            name='entropy',
+            field=models.FloatField(blank=True, db_index=True, editable=False, help_text='Belgilar entropiyasi (bit)', null=True),
+        ),
+        migrations.AddField(
+            model_name='text',
+            name='indent_depth',
+            field=models.SmallIntegerField(blank=True, db_index=True, editable=False, help_text='Eng chuqur indentatsiya (kod)', null=True),
+        ),
+        migrations.AddField(
+            model_name='text',
+            name='rare_bigram_ratio',
+            field=models.FloatField(blank=True, db_index=True, editable=False, help_text='Kam uchraydigan harf juftliklari ulushi', null=True),
+        ),
+        migrations.AddField(
+            model_name='text',
+            name='symbol_density',
+            field=models.FloatField(blank=True, db_index=True, editable=False, help_text='Belgi/tinish belgilari ulushi', null=True),
+        ),
+    ]
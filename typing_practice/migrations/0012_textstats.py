@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('typing_practice', '0011_codesnippet_avg_word_length_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TextStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.IntegerField(default=0)),
+                ('total_wpm', models.FloatField(default=0)),
+                ('max_wpm', models.FloatField(default=0)),
+                ('total_accuracy', models.FloatField(default=0)),
+                ('total_mistakes', models.IntegerField(default=0)),
+                ('perfect_attempts', models.IntegerField(default=0, help_text='100% aniqlikdagi urinishlar')),
+                ('code_snippet', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='typing_practice.codesnippet')),
+                ('text', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='typing_practice.text')),
+            ],
+            options={
+                'verbose_name_plural': 'Text stats',
+            },
+        ),
+    ]
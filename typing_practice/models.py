@@ -1,8 +1,82 @@
-from django.db import models
+import hashlib
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
 from django.contrib.auth.models import User
+from .scoring import normalize
+from .difficulty import compute_metrics
 
 
-class Text(models.Model):
+class PracticeContent(models.Model):
+    """Base for practice content: keeps normalized body and length metadata computed on save"""
+    SOURCE_FIELD = 'body'
+    SESSION_TYPE = 'text'
+    DIFFICULTY_FIELDS = ('entropy', 'symbol_density', 'rare_bigram_ratio', 'avg_word_length', 'indent_depth', 'difficulty_score')
+    METADATA_FIELDS = ('normalized_body', 'char_count', 'body_word_count', 'content_hash', *DIFFICULTY_FIELDS)
+
+    normalized_body = models.TextField(blank=True, editable=False, help_text="Normallashtirilgan matn (validatsiya uchun)")
+    char_count = models.IntegerField(default=0, editable=False)
+    body_word_count = models.IntegerField(default=0, editable=False, help_text="Haqiqiy so'zlar soni")
+    content_hash = models.CharField(max_length=64, blank=True, editable=False, db_index=True)
+    # Difficulty metrics (see typing_practice.difficulty); NULL until computed
+    entropy = models.FloatField(null=True, blank=True, editable=False, db_index=True, help_text="Belgilar entropiyasi (bit)")
+    symbol_density = models.FloatField(null=True, blank=True, editable=False, db_index=True, help_text="Belgi/tinish belgilari ulushi")
+    rare_bigram_ratio = models.FloatField(null=True, blank=True, editable=False, db_index=True, help_text="Kam uchraydigan harf juftliklari ulushi")
+    avg_word_length = models.FloatField(null=True, blank=True, editable=False, db_index=True)
+    indent_depth = models.SmallIntegerField(null=True, blank=True, editable=False, db_index=True, help_text="Eng chuqur indentatsiya (kod)")
+    difficulty_score = models.FloatField(null=True, blank=True, editable=False, db_index=True, help_text="Umumiy qiyinlik (0-100)")
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def hash_normalized(cls, normalized_body):
+        return hashlib.sha256(normalized_body.encode('utf-8')).hexdigest()
+
+    def refresh_content_metadata(self):
+        """Recompute normalized body, counts and hash from the source field"""
+        normalized_body = normalize(getattr(self, self.SOURCE_FIELD), self.SESSION_TYPE)
+        self.normalized_body = normalized_body
+        self.char_count = len(normalized_body)
+        self.body_word_count = len(normalized_body.split())
+        self.content_hash = self.hash_normalized(normalized_body)
+        for field, value in compute_metrics(normalized_body, self.SESSION_TYPE).items():
+            setattr(self, field, value)
+
+    def get_normalized_body(self):
+        """Stored normalized body, falling back to on-the-fly normalization for rows not yet backfilled"""
+        if self.content_hash:
+            return self.normalized_body
+        return normalize(getattr(self, self.SOURCE_FIELD), self.SESSION_TYPE)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Source value as loaded, so save() can tell whether it changed
+        instance._loaded_source = instance.__dict__.get(cls.SOURCE_FIELD)
+        return instance
+
+    def source_changed(self):
+        """True for new or never-backfilled rows and when the source field differs from the loaded value"""
+        if self._state.adding or not self.content_hash:
+            return True
+        return getattr(self, '_loaded_source', None) != getattr(self, self.SOURCE_FIELD)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            refresh = self.SOURCE_FIELD in update_fields
+        else:
+            refresh = self.source_changed()
+        if refresh:
+            self.refresh_content_metadata()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | set(self.METADATA_FIELDS)
+        super().save(*args, **kwargs)
+        self._loaded_source = getattr(self, self.SOURCE_FIELD)
+
+
+class Text(PracticeContent):
     DIFFICULTY_CHOICES = [
         ('easy', 'Easy'),
         ('hard', 'Hard'),
@@ -30,12 +104,20 @@ class Text(models.Model):
     def __str__(self):
         return f"{self.title} ({self.difficulty}, {self.word_count} so'z)"
     
+    @classmethod
+    def word_count_bucket(cls, words):
+        """Closest WORD_COUNT_CHOICES value for an actual word count (lower one on ties)"""
+        return min((value for value, _ in cls.WORD_COUNT_CHOICES), key=lambda value: (abs(value - words), value))
+
     def get_word_count(self):
         """Calculate actual word count from body"""
         return len(self.body.split())
 
 
-class CodeSnippet(models.Model):
+class CodeSnippet(PracticeContent):
+    SOURCE_FIELD = 'code_body'
+    SESSION_TYPE = 'code'
+
     LANGUAGE_CHOICES = [
         ('python', 'Python'),
         ('javascript', 'JavaScript'),
@@ -81,6 +163,7 @@ class UserResult(models.Model):
     time = models.DateTimeField(auto_now_add=True)
     session_type = models.CharField(max_length=10, choices=SESSION_TYPE_CHOICES)
     duration_seconds = models.IntegerField(default=0)
+    rolled_up = models.BooleanField(default=False, db_index=True, help_text="Kunlik rollup jadvaliga qo'shilganmi")
 
     class Meta:
         ordering = ['-time']
@@ -91,5 +174,308 @@ class UserResult(models.Model):
             models.Index(fields=['-time']),
         ]
 
+    def save(self, *args, **kwargs):
+        """Save and fold new results into the user's running stats in the same transaction"""
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            UserStats.record_result(self)
+            TextStats.record_result(self)
+
     def __str__(self):
         return f"{self.user.username} - {self.wpm} WPM - {self.accuracy}%"
+
+
+class KeystrokeTimeline(models.Model):
+    """Compressed keystroke timeline of a result (see typing_practice.keystrokes)"""
+    result = models.OneToOneField(UserResult, on_delete=models.CASCADE, primary_key=True, related_name='keystroke_timeline')
+    data = models.BinaryField()
+    keystroke_count = models.IntegerField(default=0)
+    duration_ms = models.IntegerField(default=0)
+    # Timing analysis (see typing_practice.anticheat)
+    median_interval_ms = models.FloatField(null=True, blank=True)
+    suspicion = models.FloatField(default=0, db_index=True)
+    flags = models.JSONField(default=list, blank=True)
+    analysis_version = models.SmallIntegerField(default=0)
+
+    @classmethod
+    def from_events(cls, result, events, analysis=None):
+        """Unsaved timeline for a result from (t_ms, code) events"""
+        from .keystrokes import encode_timeline
+        duration = events[-1][0] - events[0][0] if events else 0
+        timeline = cls(result=result, data=encode_timeline(events), keystroke_count=len(events), duration_ms=max(0, duration))
+        if analysis:
+            timeline.apply_analysis(analysis)
+        return timeline
+
+    def apply_analysis(self, analysis):
+        """Copy an anticheat.analyze_timeline() result onto the row (not saved)"""
+        from .anticheat import ANALYSIS_VERSION
+        self.median_interval_ms = analysis['features']['median_interval_ms'] or None
+        self.suspicion = analysis['suspicion']
+        self.flags = analysis['flags']
+        self.analysis_version = ANALYSIS_VERSION
+
+    def decode(self):
+        """List of (t_ms, code) events"""
+        from .keystrokes import decode_timeline
+        return decode_timeline(self.data)
+
+    def __str__(self):
+        return f"Timeline of result {self.result_id} ({self.keystroke_count} keys, {len(self.data)} bytes)"
+
+
+class ErrorProfile(models.Model):
+    """Per-user character/bigram error counts merged from every result (see typing_practice.error_profile)"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='error_profile')
+    counts = models.BinaryField(default=bytes)
+    summary = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def record(cls, user_id, entries):
+        """
+        Merge (mistakes_list, attempted_text, session_type) entries into the user's profile.
+        Called from the gamification job (accounts.gamification.update_error_profile), one user's
+        events in order, so the blob rewrite stays off the save request; the row is locked anyway.
+        """
+        from .error_profile import ErrorCounts, count_attempts, count_errors
+        entries = [entry for entry in entries if entry[1]]
+        if not entries:
+            return None
+        with transaction.atomic():
+            profile, _ = cls.objects.select_for_update().get_or_create(user_id=user_id)
+            counts = ErrorCounts.from_blob(profile.counts)
+            for mistakes_list, attempted_text, session_type in entries:
+                counts.add(count_attempts(attempted_text), *count_errors(mistakes_list, session_type))
+            profile.counts = counts.to_blob()
+            profile.summary = counts.summary()
+            profile.save(update_fields=['counts', 'summary', 'updated_at'])
+        return profile
+
+    @classmethod
+    def summary_for(cls, user):
+        """Stored summary of the user (empty one when nothing was recorded yet)"""
+        summary = cls.objects.filter(user=user).values_list('summary', flat=True).first() or {}
+        return {'total_errors': 0, 'keys': [], 'weak_keys': [], 'weak_bigrams': [], **summary}
+
+    def __str__(self):
+        return f"Error profile of {self.user.username}"
+
+
+class UserStats(models.Model):
+    """Running per-user practice totals, updated with F-expressions on every new result"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='typing_stats')
+    total_sessions = models.IntegerField(default=0)
+    total_wpm = models.FloatField(default=0)
+    max_wpm = models.FloatField(default=0)
+    total_accuracy = models.FloatField(default=0)
+    total_mistakes = models.IntegerField(default=0)
+    total_duration_seconds = models.IntegerField(default=0)
+    perfect_sessions = models.IntegerField(default=0, help_text="100% aniqlikdagi sessiyalar")
+    high_accuracy_sessions = models.IntegerField(default=0, help_text="95%+ aniqlikdagi sessiyalar")
+    text_sessions = models.IntegerField(default=0)
+    text_total_wpm = models.FloatField(default=0)
+    text_max_wpm = models.FloatField(default=0)
+    code_sessions = models.IntegerField(default=0)
+    code_total_wpm = models.FloatField(default=0)
+    code_max_wpm = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'User stats'
+
+    @classmethod
+    def for_user(cls, user):
+        """Stats row of the user, or an empty unsaved one (read-only use)"""
+        return cls.objects.filter(user=user).first() or cls(user=user)
+
+    @classmethod
+    def result_increments(cls, results):
+        """F-expression updates that add the given results to the totals"""
+        totals = {'total_sessions': 0, 'total_wpm': 0.0, 'total_accuracy': 0.0, 'total_mistakes': 0,
+                  'total_duration_seconds': 0, 'perfect_sessions': 0, 'high_accuracy_sessions': 0}
+        maxima = {'max_wpm': None}
+        for result in results:
+            wpm, accuracy = float(result.wpm or 0), float(result.accuracy or 0)
+            totals['total_sessions'] += 1
+            totals['total_wpm'] += wpm
+            totals['total_accuracy'] += accuracy
+            totals['total_mistakes'] += result.mistakes or 0
+            totals['total_duration_seconds'] += result.duration_seconds or 0
+            totals['perfect_sessions'] += int(accuracy >= 100)
+            totals['high_accuracy_sessions'] += int(accuracy >= 95)
+            maxima['max_wpm'] = max(maxima['max_wpm'] or 0, wpm)
+            if result.session_type in ('text', 'code'):
+                prefix = result.session_type
+                totals[f'{prefix}_sessions'] = totals.get(f'{prefix}_sessions', 0) + 1
+                totals[f'{prefix}_total_wpm'] = totals.get(f'{prefix}_total_wpm', 0) + wpm
+                maxima[f'{prefix}_max_wpm'] = max(maxima.get(f'{prefix}_max_wpm') or 0, wpm)
+
+        updates = {field: F(field) + value for field, value in totals.items() if value}
+        updates.update({
+            field: Greatest(F(field), Value(value)) for field, value in maxima.items() if value is not None
+        })
+        return updates
+
+    @classmethod
+    def record_result(cls, result):
+        """Atomically add a result to the user's stats row (created on first result)"""
+        cls.record_results(result.user_id, [result])
+
+    @classmethod
+    def record_results(cls, user_id, results):
+        """Add several results of one user with a single UPDATE"""
+        updates = cls.result_increments(results)
+        if not updates:
+            return
+        if cls.objects.filter(user_id=user_id).update(**updates):
+            return
+        cls.objects.get_or_create(user_id=user_id)
+        cls.objects.filter(user_id=user_id).update(**updates)
+
+    @property
+    def avg_wpm(self):
+        return self.total_wpm / self.total_sessions if self.total_sessions else 0
+
+    @property
+    def avg_accuracy(self):
+        return self.total_accuracy / self.total_sessions if self.total_sessions else 0
+
+    @property
+    def text_avg_wpm(self):
+        return self.text_total_wpm / self.text_sessions if self.text_sessions else 0
+
+    @property
+    def code_avg_wpm(self):
+        return self.code_total_wpm / self.code_sessions if self.code_sessions else 0
+
+    def __str__(self):
+        return f"{self.user.username} - {self.total_sessions} sessions, max {self.max_wpm} WPM"
+
+
+class TextStats(models.Model):
+    """Running per-text/snippet result totals, updated with F-expressions on every new result"""
+    text = models.OneToOneField(Text, on_delete=models.CASCADE, null=True, blank=True, related_name='stats')
+    code_snippet = models.OneToOneField(CodeSnippet, on_delete=models.CASCADE, null=True, blank=True, related_name='stats')
+    attempts = models.IntegerField(default=0)
+    total_wpm = models.FloatField(default=0)
+    max_wpm = models.FloatField(default=0)
+    total_accuracy = models.FloatField(default=0)
+    total_mistakes = models.IntegerField(default=0)
+    perfect_attempts = models.IntegerField(default=0, help_text="100% aniqlikdagi urinishlar")
+
+    class Meta:
+        verbose_name_plural = 'Text stats'
+
+    @staticmethod
+    def content_lookup(result):
+        """Filter kwargs of the stats row a result belongs to, or None for results without content"""
+        if result.text_id:
+            return {'text_id': result.text_id}
+        if result.code_snippet_id:
+            return {'code_snippet_id': result.code_snippet_id}
+        return None
+
+    @classmethod
+    def result_increments(cls, results):
+        """F-expression updates that add the given results (of one text) to the totals"""
+        wpms = [float(result.wpm or 0) for result in results]
+        accuracies = [float(result.accuracy or 0) for result in results]
+        return {
+            'attempts': F('attempts') + len(results),
+            'total_wpm': F('total_wpm') + sum(wpms),
+            'max_wpm': Greatest(F('max_wpm'), Value(max(wpms))),
+            'total_accuracy': F('total_accuracy') + sum(accuracies),
+            'total_mistakes': F('total_mistakes') + sum(result.mistakes or 0 for result in results),
+            'perfect_attempts': F('perfect_attempts') + sum(1 for accuracy in accuracies if accuracy >= 100),
+        }
+
+    @classmethod
+    def record_result(cls, result):
+        """Add a result to its text's stats row with one UPDATE (row created on first result)"""
+        cls.record_results([result])
+
+    @classmethod
+    def record_results(cls, results):
+        """Add results with one UPDATE per distinct text or snippet"""
+        by_content = {}
+        for result in results:
+            lookup = cls.content_lookup(result)
+            if lookup is not None:
+                by_content.setdefault(tuple(lookup.items())[0], []).append(result)
+        for (field, pk), content_results in by_content.items():
+            updates = cls.result_increments(content_results)
+            rows = cls.objects.filter(**{field: pk})
+            # Rows are created with the content (signals); only bulk-imported or older content gets here
+            if not rows.update(**updates):
+                cls.objects.get_or_create(**{field: pk})
+                rows.update(**updates)
+
+    @property
+    def content(self):
+        return self.text or self.code_snippet
+
+    @property
+    def avg_wpm(self):
+        return self.total_wpm / self.attempts if self.attempts else 0
+
+    @property
+    def avg_accuracy(self):
+        return self.total_accuracy / self.attempts if self.attempts else 0
+
+    @property
+    def avg_mistakes(self):
+        return self.total_mistakes / self.attempts if self.attempts else 0
+
+    def __str__(self):
+        return f"{self.content} - {self.attempts} attempts, avg {self.avg_wpm:.1f} WPM"
+
+
+class DailyResultRollup(models.Model):
+    """Compact per-user daily totals of results by session type (long-term history)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='result_rollups')
+    date = models.DateField()
+    session_type = models.CharField(max_length=10, choices=UserResult.SESSION_TYPE_CHOICES)
+    sessions = models.IntegerField(default=0)
+    total_wpm = models.FloatField(default=0)
+    max_wpm = models.FloatField(default=0)
+    total_accuracy = models.FloatField(default=0)
+    total_duration_seconds = models.IntegerField(default=0)
+    total_mistakes = models.IntegerField(default=0)
+    perfect_sessions = models.IntegerField(default=0)
+    high_accuracy_sessions = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-date']
+        unique_together = ['user', 'session_type', 'date']
+        indexes = [
+            models.Index(fields=['date', 'session_type']),
+            models.Index(fields=['user', '-date']),
+        ]
+
+    @property
+    def avg_wpm(self):
+        return self.total_wpm / self.sessions if self.sessions else 0
+
+    @property
+    def avg_accuracy(self):
+        return self.total_accuracy / self.sessions if self.sessions else 0
+
+    def __str__(self):
+        return f"{self.user.username} - {self.date} {self.session_type}: {self.sessions} sessions"
+
+
+class TelemetryCounter(models.Model):
+    """Frontend telemetry events per type and day (raw events are in TELEMETRY_DIR JSONL files)"""
+    event_type = models.CharField(max_length=64)
+    date = models.DateField()
+    count = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['event_type', 'date']
+        ordering = ['-date', '-count']
+
+    def __str__(self):
+        return f"{self.event_type} {self.date}: {self.count}"
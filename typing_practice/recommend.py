@@ -0,0 +1,132 @@
+"""
+Weakness-driven content recommendation.
+
+Every Text/CodeSnippet is turned into a character-bigram frequency vector over the
+error_profile alphabet. The vectors of a whole table are kept as one sparse COO matrix
+(row, column, value arrays sorted by column) derived from the content's ContentPool, so it
+is rebuilt exactly when the pool is. A user's weakness vector is their bigram error counts;
+ranking the corpus is one np.bincount over the matrix entries in the user's weak columns.
+"""
+import logging
+import random
+from .error_profile import ALPHABET, SIZE, ErrorCounts
+from .scoring import normalize
+
+logger = logging.getLogger('typing_platform')
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logger.warning("NumPy is not installed. Weak-key recommendations are disabled.")
+
+MIN_PROFILE_ERRORS = 5  # fewer recorded bigram errors are not a usable profile
+TOP_CANDIDATES = 5  # pick randomly among the best matches so "next" keeps changing
+
+
+class BigramMatrix:
+    """Sparse content x bigram frequency matrix; rows follow `pks` (sorted), entries are sorted by column"""
+
+    def __init__(self, pks, rows, cols, vals):
+        order = np.argsort(cols, kind='stable')
+        self.pks = pks
+        self.rows = rows[order]
+        self.vals = vals[order]
+        # Entries of bigram column c are rows[col_ptr[c]:col_ptr[c + 1]]
+        self.col_ptr = np.searchsorted(cols[order], np.arange(SIZE * SIZE + 1))
+
+    def scores(self, weakness):
+        """Dot product of every content vector with the weakness vector (touches only its non-zero columns)"""
+        columns = np.flatnonzero(weakness)
+        starts, ends = self.col_ptr[columns], self.col_ptr[columns + 1]
+        lengths = ends - starts
+        # Concatenated ranges starts[i]..ends[i] without a Python loop
+        entries = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        weights = self.vals[entries] * np.repeat(weakness[columns], lengths)
+        return np.bincount(self.rows[entries], weights=weights, minlength=len(self.pks))
+
+
+def _slot_table():
+    table = np.zeros(max(map(ord, ALPHABET)) + 1, dtype=np.int32)
+    for slot, ch in enumerate(ALPHABET):
+        table[ord(ch)] = slot
+    return table
+
+
+def bigram_vector(normalized_body, table=None):
+    """(bigram indexes, relative frequencies) of one normalized body"""
+    table = _slot_table() if table is None else table
+    codes = np.frombuffer(normalized_body.lower().encode('utf-32-le'), dtype=np.uint32)
+    # Characters outside the alphabet fall into slot 0, like in the error profile
+    slots = np.where(codes < len(table), table[np.minimum(codes, len(table) - 1)], 0)
+    if len(slots) < 2:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+    indexes, counts = np.unique(slots[:-1] * SIZE + slots[1:], return_counts=True)
+    return indexes.astype(np.int32), (counts / counts.sum()).astype(np.float32)
+
+
+def build_matrix(pool):
+    """BigramMatrix of every row of the pool's model"""
+    model = pool.model
+    table = _slot_table()
+    pks, rows, cols, vals = [], [], [], []
+    content = model.objects.order_by('id').values_list('id', 'normalized_body', 'content_hash', model.SOURCE_FIELD)
+    for row, (pk, normalized_body, content_hash, source) in enumerate(content.iterator(chunk_size=500)):
+        if not content_hash:
+            normalized_body = normalize(source, model.SESSION_TYPE)
+        indexes, freqs = bigram_vector(normalized_body, table)
+        pks.append(pk)
+        rows.append(np.full(len(indexes), row, dtype=np.int32))
+        cols.append(indexes)
+        vals.append(freqs)
+    if not pks:
+        return BigramMatrix(np.empty(0, dtype=np.int64), *(np.empty(0, dtype=t) for t in (np.int32, np.int32, np.float32)))
+    logger.info(f"Bigram matrix built for {pool.model_label}: {len(pks)} rows, {sum(map(len, cols))} entries")
+    return BigramMatrix(np.asarray(pks, dtype=np.int64), np.concatenate(rows), np.concatenate(cols), np.concatenate(vals))
+
+
+def weakness_vector(user):
+    """Normalized bigram error counts of the user, or None without enough recorded errors"""
+    from .models import ErrorProfile
+    blob = ErrorProfile.objects.filter(user=user).values_list('counts', flat=True).first()
+    if not blob:
+        return None
+    bigrams = np.frombuffer(ErrorCounts.from_blob(blob).bigrams, dtype=np.uint32).astype(np.float32)
+    total = bigrams.sum()
+    if total < MIN_PROFILE_ERRORS:
+        return None
+    return bigrams / total
+
+
+def recommend(pool, user, *values, top=TOP_CANDIDATES):
+    """
+    Object among the pool's matches for `values` that best exercises the user's weak bigrams,
+    or None when there is nothing to go on (no NumPy, no profile, no matches).
+    """
+    if not NUMPY_AVAILABLE:
+        return None
+    ids = pool.ids(*values)
+    if not ids:
+        return None
+    weakness = weakness_vector(user)
+    if weakness is None:
+        return None
+
+    matrix = pool.derived('bigrams', build_matrix)
+    scores = matrix.scores(weakness)
+    candidates = np.asarray(ids, dtype=np.int64)
+    positions = np.searchsorted(matrix.pks, candidates)
+    # The matrix may lag behind the id index by a concurrent change; drop ids it does not know
+    known = positions < len(matrix.pks)
+    known[known] = matrix.pks[positions[known]] == candidates[known]
+    candidates, candidate_scores = candidates[known], scores[positions[known]]
+    if not len(candidates):
+        return None
+
+    k = min(top, len(candidates))
+    best = np.argpartition(-candidate_scores, k - 1)[:k]
+    best = best[candidate_scores[best] > 0]
+    if not len(best):
+        return None
+    return pool.get(int(candidates[random.choice(best.tolist())]))
@@ -0,0 +1,152 @@
+"""
+Shared server-side scoring for typing results (practice, competitions, battles)
+"""
+import logging
+
+logger = logging.getLogger('typing_platform')
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logger.warning("NumPy is not installed. Typing scoring will use the pure-Python fallback.")
+
+# Thresholds for overriding client-reported metrics
+WPM_TOLERANCE = 0.2  # relative
+ACCURACY_TOLERANCE = 10  # percentage points
+MISTAKES_TOLERANCE = 2  # characters
+
+# Code WPM uses the standard "5 characters = 1 word" rule
+CHARS_PER_WORD = 5.0
+
+
+def normalize_text(s):
+    """Collapse all whitespace to single spaces (plain texts)"""
+    if not isinstance(s, str):
+        return ''
+    return ' '.join(s.replace('\r\n', '\n').split())
+
+
+def normalize_code(s):
+    """Normalize line endings and strip trailing spaces per line (code)"""
+    if not isinstance(s, str):
+        return ''
+    return '\n'.join([line.rstrip() for line in s.replace('\r\n', '\n').split('\n')])
+
+
+def normalize(s, session_type):
+    """Normalize according to session type ('text' or 'code')"""
+    if session_type == 'code':
+        return normalize_code(s)
+    return normalize_text(s)
+
+
+def _as_codepoints(s):
+    """Fixed-width view of a string for vectorized comparison"""
+    return np.frombuffer(s.encode('utf-32-le'), dtype=np.uint32)
+
+
+def count_mismatches(typed_norm, original_norm):
+    """
+    Count mismatching typed characters between two normalized strings.
+    Every differing position in the common prefix counts, plus extra typed characters past the
+    end of the original. The untyped rest of the original is not a mistake (partial time-mode
+    submissions); score_submission reports it as untyped_chars.
+    """
+    if typed_norm == original_norm:
+        return 0
+    n = min(len(typed_norm), len(original_norm))
+    length_diff = max(0, len(typed_norm) - len(original_norm))
+    if n == 0:
+        return length_diff
+    if NUMPY_AVAILABLE:
+        diff = int(np.count_nonzero(_as_codepoints(typed_norm[:n]) != _as_codepoints(original_norm[:n])))
+    else:
+        diff = sum(a != b for a, b in zip(typed_norm, original_norm))
+    return diff + length_diff
+
+
+def _build_score(typed_norm, original_norm, mismatches, duration_seconds, session_type):
+    typed_chars = len(typed_norm)
+    if session_type == 'code':
+        words = typed_chars / CHARS_PER_WORD
+    else:
+        words = len(typed_norm.split()) if typed_norm.strip() else 0
+    accuracy = round(((typed_chars - mismatches) / typed_chars) * 100, 2) if typed_chars > 0 else 100.0
+    accuracy = min(100.0, max(0.0, accuracy))
+    wpm = round((words / duration_seconds) * 60, 2) if duration_seconds > 0 else 0.0
+    return {
+        'typed_chars': typed_chars,
+        'typed_words': words,
+        'mistakes': mismatches,
+        'untyped_chars': max(0, len(original_norm) - typed_chars),
+        'accuracy': accuracy,
+        'wpm': wpm,
+        'is_complete': typed_norm == original_norm,
+    }
+
+
+def score_submission(typed_text, original, duration_seconds, session_type='text', original_is_normalized=False):
+    """
+    Score one submission against its original text/code.
+    Returns dict with typed_chars, typed_words, mistakes, untyped_chars, accuracy, wpm and is_complete.
+    """
+    typed_norm = normalize(typed_text, session_type)
+    original_norm = original if original_is_normalized else normalize(original, session_type)
+    mismatches = count_mismatches(typed_norm, original_norm)
+    return _build_score(typed_norm, original_norm, mismatches, duration_seconds, session_type)
+
+
+def score_batch(submissions, originals_normalized=False):
+    """
+    Score many submissions at once.
+    `submissions` is an iterable of (typed_text, original, duration_seconds, session_type) tuples.
+    Common prefixes of all submissions are compared in a single vectorized pass.
+    """
+    normalized = [
+        (
+            normalize(typed, session_type),
+            original if originals_normalized else normalize(original, session_type),
+            duration,
+            session_type,
+        )
+        for typed, original, duration, session_type in submissions
+    ]
+    if not normalized:
+        return []
+
+    if NUMPY_AVAILABLE:
+        prefix_lengths = [min(len(t), len(o)) for t, o, _, _ in normalized]
+        typed_buf = _as_codepoints(''.join(t[:n] for (t, _, _, _), n in zip(normalized, prefix_lengths)))
+        original_buf = _as_codepoints(''.join(o[:n] for (_, o, _, _), n in zip(normalized, prefix_lengths)))
+        # Cumulative sum lets us read each segment's mismatch count without a Python loop over chars
+        cumulative = np.concatenate(([0], np.cumsum(typed_buf != original_buf)))
+        ends = np.cumsum(prefix_lengths)
+        starts = ends - np.asarray(prefix_lengths)
+        prefix_diffs = (cumulative[ends] - cumulative[starts]).tolist()
+    else:
+        prefix_diffs = [sum(a != b for a, b in zip(t, o)) for t, o, _, _ in normalized]
+
+    return [
+        _build_score(t, o, int(diff) + max(0, len(t) - len(o)), duration, session_type)
+        for (t, o, duration, session_type), diff in zip(normalized, prefix_diffs)
+    ]
+
+
+def reconcile_metrics(wpm, accuracy, mistakes, score, username='', context='Result', check_mistakes=True):
+    """
+    Replace client-reported metrics with server values when they differ significantly.
+    With check_mistakes=False the client's mistakes count is kept as sent.
+    Returns (wpm, accuracy, mistakes).
+    """
+    if abs(score['wpm'] - wpm) / (score['wpm'] + 1e-6) > WPM_TOLERANCE:
+        logger.info(f"{context} WPM mismatch for user {username}: client={wpm}, server={score['wpm']}")
+        wpm = score['wpm']
+    if abs(score['accuracy'] - accuracy) > ACCURACY_TOLERANCE:
+        logger.info(f"{context} accuracy mismatch for user {username}: client={accuracy}, server={score['accuracy']}")
+        accuracy = score['accuracy']
+    if check_mistakes and abs(score['mistakes'] - mistakes) > MISTAKES_TOLERANCE:
+        logger.info(f"{context} mistakes mismatch for user {username}: client={mistakes}, server={score['mistakes']}")
+        mistakes = score['mistakes']
+    return wpm, accuracy, mistakes
@@ -0,0 +1,116 @@
+"""
+Per-user "seen" sets for unseen-first content selection.
+
+A seen set is a bitmap indexed by content id modulo its size, kept in the shared cache per user
+and content kind ('text' or 'code'). Membership is one bit test. The size is a power of two
+chosen by bits_for() from the largest content id: at least SEEN_BITS and at most SEEN_MAX_BITS.
+Below the cap every id has its own bit. A bitmap stored while the corpus was smaller is tiled up
+to the new size, so ids marked seen stay seen. Above the cap, ids share bits: that only makes
+selection less picky and never hides content for good. Once every candidate of a filter is seen,
+their bits are cleared so the cycle starts over.
+"""
+import logging
+from django.conf import settings
+from typing_platform.state import cache
+
+logger = logging.getLogger('typing_platform')
+
+SEEN_BITS = 2048
+SEEN_BYTES = SEEN_BITS // 8
+
+
+def max_bits():
+    return getattr(settings, 'SEEN_MAX_BITS', 1 << 16)
+
+
+def bits_for(max_id):
+    """Bitmap size (power of two) giving each id up to max_id its own bit, within SEEN_BITS..SEEN_MAX_BITS"""
+    bits = SEEN_BITS
+    while bits <= max_id and bits < max_bits():
+        bits *= 2
+    return bits
+
+
+def _valid_size(size):
+    return size >= SEEN_BYTES and size & (size - 1) == 0
+
+
+class SeenSet:
+    """Power-of-two sized bitmap of content ids"""
+
+    def __init__(self, data=None, bits=SEEN_BITS):
+        size = bits // 8
+        if data and _valid_size(len(data)):
+            self.bits = bytearray(data)
+            self.grow(size)
+        else:
+            self.bits = bytearray(size)
+
+    def grow(self, size):
+        """Tile the bitmap up to `size` bytes: id % new size is set wherever id % old size was"""
+        if size > len(self.bits):
+            self.bits = self.bits * (size // len(self.bits))
+
+    @property
+    def size(self):
+        return len(self.bits) * 8
+
+    def __contains__(self, pk):
+        slot = pk % self.size
+        return bool(self.bits[slot >> 3] >> (slot & 7) & 1)
+
+    def add(self, pk):
+        slot = pk % self.size
+        self.bits[slot >> 3] |= 1 << (slot & 7)
+
+    def discard(self, pk):
+        slot = pk % self.size
+        self.bits[slot >> 3] &= ~(1 << (slot & 7)) & 0xFF
+
+    def update(self, other):
+        """Add every id of another seen set"""
+        other_bits = bytearray(other.bits)
+        size = max(len(self.bits), len(other_bits))
+        self.grow(size)
+        if len(other_bits) < size:
+            other_bits = other_bits * (size // len(other_bits))
+        self.bits = bytearray(a | b for a, b in zip(self.bits, other_bits))
+
+    def to_bytes(self):
+        return bytes(self.bits)
+
+
+def cache_key(user_id, kind):
+    return f'seen:{kind}:{user_id}'
+
+
+def _user_ids(users):
+    return [user.id for user in users if user is not None and user.is_authenticated]
+
+
+def load(users, kind, bits=SEEN_BITS):
+    """Union of the seen sets of the given users (one cache round trip), at least `bits` wide"""
+    keys = [cache_key(user_id, kind) for user_id in _user_ids(users)]
+    seen = SeenSet(bits=bits)
+    for data in cache.get_many(keys).values():
+        seen.update(SeenSet(data))
+    return seen
+
+
+def mark_seen(users, kind, pk, reset=(), bits=SEEN_BITS):
+    """Add a content id to each user's seen set, first clearing the `reset` ids (a finished cycle)"""
+    keys = [cache_key(user_id, kind) for user_id in _user_ids(users)]
+    if not keys or pk is None:
+        return
+    stored = cache.get_many(keys)
+    updated = {}
+    for key in keys:
+        seen = SeenSet(stored.get(key), bits)
+        for reset_pk in reset:
+            seen.discard(reset_pk)
+        seen.add(pk)
+        updated[key] = seen.to_bytes()
+    try:
+        cache.set_many(updated, getattr(settings, 'SEEN_CACHE_TIMEOUT', 30 * 24 * 3600))
+    except Exception as e:
+        logger.warning(f"Saving seen sets failed: {e}")
@@ -0,0 +1,228 @@
+"""
+In-process selection pools for random Text/CodeSnippet picking.
+
+Each pool loads (id, filter fields) for the whole table in one query, groups the IDs
+by every filter combination, and keeps them in memory until content changes.
+Content changes are signalled through typing_practice.signals; a version number in
+the shared cache lets other worker processes notice the change too. That number is
+re-read at most once every CONTENT_POOL_VERSION_CHECK_SECONDS, so picks normally cost
+no cache round trip (a local invalidate takes effect at once).
+"""
+import bisect
+import copy
+import itertools
+import random
+import threading
+import time
+import logging
+from collections import defaultdict
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger('typing_platform')
+
+UNSEEN_PROBES = 8
+UNSEEN_SCAN_LIMIT = 256  # IDs checked after the probes miss; bounds the work on large filters
+
+
+class ContentPool:
+    """IDs of one content model grouped by filter key (None acts as a wildcard)"""
+
+    def __init__(self, model_label, key_fields):
+        self.model_label = model_label
+        self.key_fields = key_fields
+        self.version_key = f'content-pool-version:{model_label}'
+        self._index = None
+        self._version = None
+        self._checked_at = 0.0
+        self._objects = {}
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    @property
+    def cache_objects(self):
+        return getattr(settings, 'CONTENT_POOL_CACHE_OBJECTS', False)
+
+    @property
+    def version_check_interval(self):
+        return getattr(settings, 'CONTENT_POOL_VERSION_CHECK_SECONDS', 5)
+
+    def _shared_version(self):
+        return cache.get(self.version_key, 0)
+
+    def _build(self):
+        index = defaultdict(list)
+        rows = self.model.objects.order_by('id').values_list('id', *self.key_fields)
+        for pk, *values in rows:
+            for key in itertools.product(*[(value, None) for value in values]):
+                index[key].append(pk)
+        return {key: tuple(ids) for key, ids in index.items()}
+
+    def _get_index(self):
+        index = self._index
+        now = time.monotonic()
+        if index is not None and now - self._checked_at < self.version_check_interval:
+            return index
+        version = self._shared_version()
+        if index is None or self._version != version:
+            with self._lock:
+                if self._index is None or self._version != version:
+                    self._index = self._build()
+                    self._version = version
+                    self._objects = {}
+                    self._derived = {}
+                index = self._index
+        self._checked_at = now
+        return index
+
+    def invalidate(self, broadcast=True):
+        """Drop the in-memory pool (and tell other processes when broadcast=True)"""
+        with self._lock:
+            self._index = None
+            self._objects = {}
+            self._derived = {}
+        if broadcast:
+            try:
+                cache.incr(self.version_key)
+            except ValueError:
+                cache.set(self.version_key, 1, None)
+
+    def ids(self, *values):
+        """Sorted tuple of IDs matching the given filter values"""
+        return self._get_index().get(tuple(values), ())
+
+    def choice(self, *values, seen=None):
+        """Random ID matching the given filter values, or None; prefers IDs not in `seen` when given"""
+        ids = self.ids(*values)
+        if not ids:
+            return None
+        if seen is None:
+            return random.choice(ids)
+        return _pick_unseen(ids, seen)[0]
+
+    def max_id(self):
+        """Largest ID in the pool (0 when empty)"""
+        ids = self.ids(*[None] * len(self.key_fields))
+        return ids[-1] if ids else 0
+
+    def random_unseen_object(self, seen, *values):
+        """
+        (object, exhausted): a random match not in `seen` when one is found. exhausted is True only
+        when every match was checked and all are seen; a scan cut off at UNSEEN_SCAN_LIMIT returns
+        a seen object with exhausted False.
+        """
+        for _ in range(2):
+            ids = self.ids(*values)
+            if not ids:
+                return None, False
+            pk, exhausted = _pick_unseen(ids, seen)
+            obj = self.get(pk)
+            if obj is not None or self._index is not None:
+                return obj, exhausted
+            # Pool was just rebuilt after a stale hit, try once more
+        return None, False
+
+    def next_id(self, current_id, *values):
+        """ID following current_id among the matches (wrapping around), or None"""
+        ids = self.ids(*values)
+        if not ids:
+            return None
+        position = bisect.bisect_right(ids, current_id)
+        return ids[position] if position < len(ids) else ids[0]
+
+    def sample(self, k, *values):
+        """Up to k unique random IDs matching the given filter values"""
+        ids = self.ids(*values)
+        return random.sample(ids, min(k, len(ids)))
+
+    def score_choice(self, min_score, max_score, *values):
+        """Random ID matching the filter values with difficulty_score in [min_score, max_score] (None = open)"""
+        scores, ids = self.derived('difficulty_scores', _score_index).get(tuple(values), ((), ()))
+        low = bisect.bisect_left(scores, min_score) if min_score is not None else 0
+        high = bisect.bisect_right(scores, max_score) if max_score is not None else len(scores)
+        return ids[random.randrange(low, high)] if low < high else None
+
+    def random_object_in_score_range(self, min_score, max_score, *values):
+        """Random object within a difficulty_score range (no query besides the fetch), or None"""
+        obj = self.get(self.score_choice(min_score, max_score, *values))
+        if obj is None and self._index is None:
+            obj = self.get(self.score_choice(min_score, max_score, *values))
+        return obj
+
+    def derived(self, name, builder):
+        """Value built by builder(pool) from the whole table, dropped together with the pool"""
+        self._get_index()
+        value = self._derived.get(name)
+        if value is None:
+            with self._lock:
+                value = self._derived.get(name)
+                if value is None:
+                    value = self._derived[name] = builder(self)
+        return value
+
+    def get(self, pk):
+        """Fetch one object by primary key (cached in memory when CONTENT_POOL_CACHE_OBJECTS is set)"""
+        if pk is None:
+            return None
+        if self.cache_objects:
+            obj = self._objects.get(pk)
+            if obj is not None:
+                return copy.copy(obj)
+        try:
+            obj = self.model.objects.get(pk=pk)
+        except self.model.DoesNotExist:
+            # Stale pool (e.g. deleted in another process without a shared cache)
+            self.invalidate(broadcast=False)
+            return None
+        if self.cache_objects:
+            self._objects[pk] = obj
+            return copy.copy(obj)
+        return obj
+
+    def next_object(self, current_id, *values):
+        """Object following current_id among the matches (wrapping around), or None"""
+        obj = self.get(self.next_id(current_id, *values))
+        if obj is None and self._index is None:
+            obj = self.get(self.next_id(current_id, *values))
+        return obj
+
+    def random_object(self, *values, seen=None):
+        """Random object matching the given filter values (unseen ones first when `seen` is given), or None"""
+        obj = self.get(self.choice(*values, seen=seen))
+        if obj is None and self._index is None:
+            # Pool was just rebuilt after a stale hit, try once more
+            obj = self.get(self.choice(*values, seen=seen))
+        return obj
+
+
+def _pick_unseen(ids, seen):
+    """(id, exhausted) for a non-empty ID tuple; see ContentPool.random_unseen_object"""
+    # A few random probes find an unseen ID quickly while most are unseen
+    for _ in range(UNSEEN_PROBES):
+        pk = random.choice(ids)
+        if pk not in seen:
+            return pk, False
+    start = random.randrange(len(ids))
+    for pk in itertools.islice(itertools.chain(ids[start:], ids[:start]), UNSEEN_SCAN_LIMIT):
+        if pk not in seen:
+            return pk, False
+    return random.choice(ids), len(ids) <= UNSEEN_SCAN_LIMIT
+
+
+def _score_index(pool):
+    """Filter key -> (sorted difficulty scores, IDs in the same order); unscored rows are left out"""
+    scores = dict(pool.model.objects.filter(difficulty_score__isnull=False).values_list('id', 'difficulty_score'))
+    index = {}
+    for key, ids in (pool._index or {}).items():
+        ranked = sorted((scores[pk], pk) for pk in ids if pk in scores)
+        index[key] = (tuple(score for score, _ in ranked), tuple(pk for _, pk in ranked))
+    return index
+
+
+text_pool = ContentPool('typing_practice.Text', ('difficulty', 'word_count'))
+code_pool = ContentPool('typing_practice.CodeSnippet', ('language', 'difficulty'))
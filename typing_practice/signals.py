@@ -0,0 +1,32 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Text, CodeSnippet, TextStats
+from .selection import text_pool, code_pool
+from . import highlighting
+
+
+@receiver([post_save, post_delete], sender=Text)
+def invalidate_text_pool(sender, **kwargs):
+    """Rebuild text selection pool after content changes"""
+    text_pool.invalidate()
+
+
+@receiver([post_save, post_delete], sender=CodeSnippet)
+def invalidate_code_pool(sender, **kwargs):
+    """Rebuild code selection pool after content changes"""
+    code_pool.invalidate()
+
+
+@receiver(post_save, sender=CodeSnippet)
+def warm_code_highlighting(sender, instance, **kwargs):
+    """Highlight saved code once so its first view does not pay for it"""
+    highlighting.warm(instance)
+
+
+@receiver(post_save, sender=Text)
+@receiver(post_save, sender=CodeSnippet)
+def create_text_stats(sender, instance, created, **kwargs):
+    """Create the stats row with the content so saving a result only needs one UPDATE"""
+    if created:
+        field = 'text' if sender is Text else 'code_snippet'
+        TextStats.objects.get_or_create(**{field: instance})
@@ -0,0 +1,210 @@
+"""
+Buffered frontend telemetry.
+
+Events are appended to an in-process buffer. Once TELEMETRY_FLUSH_SIZE events are
+waiting or TELEMETRY_FLUSH_SECONDS have passed, a background flusher thread swaps the buffer
+out and writes the whole batch in one append to a daily JSONL file in TELEMETRY_DIR; requests
+only wake it (TELEMETRY_BACKGROUND_FLUSH=False flushes on the request that notices instead).
+The same flush then adds the per-event-type counts to TelemetryCounter rows (one F-expression
+UPDATE per event type, in one transaction). The file is the record: a failed counter update is
+logged on its own and the events are not reported as dropped. Events still buffered when the
+process exits are flushed by an atexit hook.
+
+The endpoint is public, so only event types listed in TELEMETRY_EVENT_TYPES get their own
+counter row; any other name is counted as OTHER_EVENT (the raw name stays in the file).
+Daily files older than TELEMETRY_RETENTION_DAYS are deleted once a day by the flush.
+"""
+import atexit
+import datetime
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger('typing_platform')
+
+MAX_EVENT_LENGTH = 64
+MAX_DETAILS_BYTES = 2048
+OTHER_EVENT = 'other'
+FILE_PATTERN = re.compile(r'^events-(\d{4}-\d{2}-\d{2})\.jsonl$')
+
+
+def allowed_events():
+    return set(getattr(settings, 'TELEMETRY_EVENT_TYPES', ()))
+
+
+def clean_event(payload):
+    """(event, details) from a client payload; raises ValueError when there is no usable event name"""
+    if not isinstance(payload, dict):
+        raise ValueError('payload must be an object')
+    event = payload.get('event')
+    if not isinstance(event, str) or not event.strip():
+        raise ValueError('event is required')
+    details = payload.get('details', {})
+    if not isinstance(details, dict):
+        details = {}
+    if len(json.dumps(details, default=str)) > MAX_DETAILS_BYTES:
+        details = {'truncated': True}
+    event = event.strip()[:MAX_EVENT_LENGTH]
+    if event not in allowed_events():
+        details = {'event': event, **details}
+        event = OTHER_EVENT
+    return event, details
+
+
+def add_to_counter(event_type, date, count):
+    """Add to one counter row with an F-expression (row created on first use)"""
+    from .models import TelemetryCounter
+    counters = TelemetryCounter.objects.filter(event_type=event_type, date=date)
+    if not counters.update(count=F('count') + count):
+        TelemetryCounter.objects.get_or_create(event_type=event_type, date=date)
+        counters.update(count=F('count') + count)
+
+
+def prune_files(directory, today=None):
+    """Delete daily event files older than TELEMETRY_RETENTION_DAYS; returns how many were removed"""
+    keep_days = getattr(settings, 'TELEMETRY_RETENTION_DAYS', 30)
+    cutoff = (today or timezone.now().date()) - datetime.timedelta(days=keep_days)
+    removed = 0
+    for name in os.listdir(directory):
+        match = FILE_PATTERN.match(name)
+        if match is None or datetime.date.fromisoformat(match[1]) >= cutoff:
+            continue
+        try:
+            os.remove(os.path.join(directory, name))
+            removed += 1
+        except OSError as e:
+            logger.warning(f"Telemetry file {name} not removed: {e}")
+    return removed
+
+
+class TelemetryBuffer:
+    """Thread-safe event buffer flushed in batches to a JSONL file and counter rows"""
+
+    def __init__(self):
+        self._events = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._wake = threading.Event()
+        self._flusher = None
+        self._flusher_pid = None
+        self._pruned_on = None
+
+    @property
+    def flush_size(self):
+        return getattr(settings, 'TELEMETRY_FLUSH_SIZE', 200)
+
+    @property
+    def flush_seconds(self):
+        return getattr(settings, 'TELEMETRY_FLUSH_SECONDS', 10)
+
+    @property
+    def background(self):
+        return getattr(settings, 'TELEMETRY_BACKGROUND_FLUSH', True)
+
+    def add(self, event, details, user_id=None):
+        record = {'ts': timezone.now().isoformat(), 'event': event, 'user': user_id, 'details': details}
+        with self._lock:
+            self._events.append(record)
+            due = (len(self._events) >= self.flush_size
+                   or time.monotonic() - self._last_flush >= self.flush_seconds)
+        if not due:
+            return
+        if self.background:
+            self._ensure_flusher()
+            self._wake.set()
+        else:
+            self.flush()
+
+    def _ensure_flusher(self):
+        # Started lazily, and again in a forked worker (threads do not survive fork)
+        if self._flusher is not None and self._flusher_pid == os.getpid() and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is None or self._flusher_pid != os.getpid() or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._run_flusher, name='telemetry-flusher', daemon=True)
+                self._flusher_pid = os.getpid()
+                self._flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Telemetry flusher error: {e}")
+            finally:
+                close_old_connections()
+
+    def pending(self):
+        with self._lock:
+            return len(self._events)
+
+    def flush(self):
+        """Write buffered events; returns how many were flushed"""
+        # Only one thread writes at a time; others keep buffering instead of waiting
+        if not self._flush_lock.acquire(blocking=False):
+            return 0
+        try:
+            with self._lock:
+                events, self._events = self._events, []
+                self._last_flush = time.monotonic()
+            if not events:
+                return 0
+            try:
+                by_date = self._append(events)
+            except Exception as e:
+                logger.error(f"Telemetry flush failed, {len(events)} event(s) dropped: {e}")
+                return 0
+            try:
+                self._count(by_date)
+            except Exception as e:
+                # The events are already in the JSONL files; only the admin counters lag behind
+                logger.error(f"Telemetry counters not updated for {len(events)} written event(s): {e}")
+            return len(events)
+        finally:
+            self._flush_lock.release()
+
+    def _append(self, events):
+        """Append events to the daily JSONL files; returns them grouped by date"""
+        directory = getattr(settings, 'TELEMETRY_DIR', settings.BASE_DIR / 'logs' / 'telemetry')
+        os.makedirs(directory, exist_ok=True)
+        # One file per day; a single write keeps concurrent appends from interleaving lines
+        by_date = {}
+        for record in events:
+            by_date.setdefault(record['ts'][:10], []).append(record)
+        for date, records in by_date.items():
+            lines = ''.join(json.dumps(record, ensure_ascii=False, default=str) + '\n' for record in records)
+            with open(os.path.join(directory, f'events-{date}.jsonl'), 'a', encoding='utf-8') as f:
+                f.write(lines)
+        today = timezone.now().date()
+        if self._pruned_on != today:
+            self._pruned_on = today
+            prune_files(directory, today)
+        return by_date
+
+    def _count(self, by_date):
+        with transaction.atomic():
+            for date, records in by_date.items():
+                for event_type, count in Counter(record['event'] for record in records).items():
+                    add_to_counter(event_type, date, count)
+
+
+buffer = TelemetryBuffer()
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        buffer.flush()
+    except Exception:
+        pass
@@ -0,0 +1,99 @@
+import json
+import random
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from .anticheat import analyze_timeline, MIN_KEYSTROKES, SUSPICION_THRESHOLD
+from .keystrokes import decode_timeline, encode_timeline, parse_keystrokes
+from .models import Text, UserResult, KeystrokeTimeline
+
+User = get_user_model()
+
+
+def human_events(n=120, mean_ms=180, seed=1):
+    """Plausible typing: jittered intervals around mean_ms"""
+    rng = random.Random(seed)
+    events, t = [], 0
+    for i in range(n):
+        events.append((t, ord('abcdef '[i % 7])))
+        t += max(40, int(rng.gauss(mean_ms, mean_ms * 0.35)))
+    return events
+
+
+class AnalyzeTimelineTests(SimpleTestCase):
+    def test_human_typing_is_clean(self):
+        analysis = analyze_timeline(human_events(), history=[180] * 10, reported_duration=22)
+        self.assertEqual(analysis['flags'], [])
+        self.assertEqual(analysis['suspicion'], 0)
+
+    def test_short_timeline_is_not_judged(self):
+        self.assertIsNone(analyze_timeline(human_events(MIN_KEYSTROKES - 1)))
+
+    def test_paste_burst(self):
+        events = human_events(40)
+        start = events[-1][0] + 200
+        events += [(start, ord('x'))] * 30
+        self.assertIn('paste_burst', analyze_timeline(events)['flags'])
+
+    def test_sustained_rate_and_uniform_rhythm(self):
+        # A bot typing a key every 30 ms (~400 WPM) for 12 seconds
+        events = [(i * 30, 97) for i in range(400)]
+        analysis = analyze_timeline(events)
+        self.assertIn('sustained_rate', analysis['flags'])
+        self.assertIn('uniform_rhythm', analysis['flags'])
+        self.assertGreaterEqual(analysis['suspicion'], SUSPICION_THRESHOLD)
+
+    def test_out_of_order_client_times_are_not_paste_bursts(self):
+        events = human_events()
+        # Every other pair swapped: raw diffs would be negative
+        shuffled = [[t, code] for pair in zip(events[1::2], events[::2]) for t, code in pair]
+        analysis = analyze_timeline(parse_keystrokes(shuffled))
+        self.assertNotIn('paste_burst', analysis['flags'])
+        self.assertEqual(
+            analysis['features'],
+            analyze_timeline(decode_timeline(encode_timeline(parse_keystrokes(shuffled))))['features'],
+        )
+
+    def test_history_and_duration(self):
+        events = human_events(mean_ms=80)
+        analysis = analyze_timeline(events, history=[250] * 10, reported_duration=2)
+        self.assertIn('history_outlier', analysis['flags'])
+        self.assertIn('duration_mismatch', analysis['flags'])
+        # Too little history is not compared
+        self.assertNotIn('history_outlier', analyze_timeline(events, history=[250] * 2)['flags'])
+
+
+class AnticheatIntegrationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='tester', password='pass')
+        self.client.force_login(self.user)
+        self.text = Text.objects.create(title='T', difficulty='easy', word_count=1, body='a' * 400)
+
+    def test_save_result_stores_analysis(self):
+        events = [[i * 30, 97] for i in range(400)]
+        response = self.client.post(reverse('typing_practice:save_result'), data=json.dumps({
+            'text_id': self.text.id, 'typed_text': 'a' * 400, 'wpm': 5, 'accuracy': 100,
+            'duration_seconds': 12, 'keystrokes': events,
+        }), content_type='application/json')
+        self.assertTrue(response.json()['success'])
+        timeline = KeystrokeTimeline.objects.get(result_id=response.json()['result_id'])
+        self.assertGreaterEqual(timeline.suspicion, SUSPICION_THRESHOLD)
+        self.assertIn('sustained_rate', timeline.flags)
+        self.assertEqual(timeline.analysis_version, 1)
+
+    def test_rescore_command_updates_stale_rows(self):
+        for seed in range(3):
+            result = UserResult.objects.create(user=self.user, text=self.text, wpm=40, accuracy=100,
+                                               duration_seconds=22, session_type='text')
+            KeystrokeTimeline.from_events(result, human_events(seed=seed)).save()
+        out = StringIO()
+        call_command('rescore_keystrokes', batch_size=2, stdout=out)
+        self.assertIn('Analysed 3 timeline(s): 0 flagged', out.getvalue())
+        self.assertFalse(KeystrokeTimeline.objects.filter(analysis_version=0).exists())
+        self.assertFalse(KeystrokeTimeline.objects.filter(median_interval_ms__isnull=True).exists())
+
+        out = StringIO()
+        call_command('rescore_keystrokes', stdout=out)
+        self.assertIn('Analysed 0 timeline(s)', out.getvalue())
@@ -0,0 +1,74 @@
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from .models import UserResult, UserStats, DailyResultRollup, KeystrokeTimeline
+from .archive import archive_results, period_totals, daily_progress
+
+User = get_user_model()
+
+
+class ResultArchiveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='tester', password='pass')
+        self.today = timezone.now().date()
+
+    def add_result(self, wpm, accuracy=95, session_type='text', days_ago=0):
+        result = UserResult.objects.create(user=self.user, wpm=wpm, accuracy=accuracy, session_type=session_type)
+        if days_ago:
+            UserResult.objects.filter(id=result.id).update(date=self.today - timedelta(days=days_ago))
+        return result
+
+    def test_archive_folds_and_prunes(self):
+        for i in range(5):
+            self.add_result(40 + i, days_ago=3)
+        self.add_result(80, session_type='code')
+
+        self.assertEqual(archive_results(keep_last=2), (6, 4))
+        self.assertEqual(UserResult.objects.filter(user=self.user).count(), 2)
+
+        rollup = DailyResultRollup.objects.get(user=self.user, session_type='text')
+        self.assertEqual((rollup.sessions, rollup.max_wpm, rollup.avg_wpm), (5, 44, 42))
+        self.assertEqual(rollup.date, self.today - timedelta(days=3))
+
+        # Nothing pending: running again is a no-op
+        self.assertEqual(archive_results(keep_last=2), (0, 0))
+
+    def test_results_with_timelines_survive_pruning(self):
+        replays = [self.add_result(40 + i, days_ago=3) for i in range(3)]
+        for result in replays:
+            KeystrokeTimeline.from_events(result, [(0, 97), (150, 98)]).save()
+        for i in range(3):
+            self.add_result(60 + i)
+
+        self.assertEqual(archive_results(keep_last=1, keep_timelines=2), (6, 3))
+        self.assertEqual(
+            set(KeystrokeTimeline.objects.values_list('result_id', flat=True)),
+            {replays[1].id, replays[2].id},
+        )
+        self.assertEqual(UserResult.objects.filter(user=self.user).count(), 3)
+
+    def test_readers_combine_rollups_and_pending_results(self):
+        self.add_result(40, days_ago=20)
+        self.add_result(60, days_ago=20)
+        archive_results()
+        self.add_result(100)
+
+        totals = period_totals()[self.user.id]
+        self.assertEqual((totals['sessions'], totals['max_wpm'], totals['total_wpm']), (3, 100, 200))
+        self.assertEqual(period_totals(since=self.today - timedelta(days=7))[self.user.id]['sessions'], 1)
+        self.assertEqual(
+            [(day['total_sessions'], day['avg_wpm']) for day in daily_progress(self.user)],
+            [(2, 50), (1, 100)],
+        )
+
+    def test_rebuild_user_stats_uses_rollups(self):
+        for wpm in (40, 50, 60):
+            self.add_result(wpm)
+        call_command('archive_results', keep=1, stdout=StringIO())
+        call_command('rebuild_user_stats', stdout=StringIO())
+
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual((stats.total_sessions, stats.max_wpm, stats.text_sessions), (3, 60, 3))
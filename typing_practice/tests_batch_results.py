@@ -0,0 +1,69 @@
+import json
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from accounts.jobs import run_pending
+from accounts.models import GamificationEvent, UserLevel
+from .models import Text, CodeSnippet, UserResult, UserStats, TextStats
+from .views import MAX_BATCH_RESULTS
+
+User = get_user_model()
+
+
+class BatchResultTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='tester', password='pass')
+        self.client.force_login(self.user)
+        self.text = Text.objects.create(title='T', difficulty='easy', word_count=10, body='one two three')
+        self.code = CodeSnippet.objects.create(title='C', language='python', difficulty='easy', code_body='x = 1')
+
+    def post(self, url_name, payload):
+        return self.client.post(reverse(url_name), data=json.dumps(payload), content_type='application/json')
+
+    def text_item(self, typed='one two three', **extra):
+        item = {'text_id': self.text.id, 'typed_text': typed, 'wpm': 36, 'accuracy': 100, 'duration_seconds': 5}
+        item.update(extra)
+        return item
+
+    def test_batch_saves_valid_items_and_reports_rejected(self):
+        items = [
+            self.text_item(),
+            {'typed_text': 'x'},                      # neither text_id nor code_id
+            self.text_item(typed='one two'),          # incomplete
+            {'code_id': self.code.id, 'typed_text': 'x = 1', 'wpm': 12, 'accuracy': 100, 'duration_seconds': 1},
+            {'text_id': 999999, 'typed_text': 'a'},   # unknown text
+        ]
+        response = self.post('typing_practice:save_results_batch', {'results': items})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['saved'], 2)
+        self.assertEqual([('result_id' in o) for o in body['results']], [True, False, False, True, False])
+        self.assertEqual(body['results'][4]['error'], 'Matn topilmadi')
+
+        self.assertEqual(UserResult.objects.filter(user=self.user).count(), 2)
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual((stats.total_sessions, stats.text_sessions, stats.code_sessions), (2, 1, 1))
+        self.assertEqual(TextStats.objects.get(text=self.text).attempts, 1)
+        self.assertEqual(TextStats.objects.get(code_snippet=self.code).attempts, 1)
+
+        # One gamification event for the whole batch
+        event = GamificationEvent.objects.get(user=self.user)
+        self.assertEqual(event.event_type, 'result_batch')
+        self.assertEqual(len(event.payload['results']), 2)
+        run_pending()
+        self.assertGreater(UserLevel.objects.get(user=self.user).total_xp, 0)
+
+    def test_batch_limits(self):
+        response = self.post('typing_practice:save_results_batch', {'results': []})
+        self.assertEqual(response.status_code, 400)
+        response = self.post('typing_practice:save_results_batch', {'results': [self.text_item()] * (MAX_BATCH_RESULTS + 1)})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(UserResult.objects.exists())
+
+    def test_single_save_still_works(self):
+        response = self.post('typing_practice:save_result', self.text_item())
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['success'])
+        response = self.post('typing_practice:save_result', self.text_item(typed='one'))
+        self.assertEqual(response.json()['error'], "Matn to'liq yozilmagan")
+        self.assertEqual(UserStats.objects.get(user=self.user).total_sessions, 1)
@@ -0,0 +1,65 @@
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from .difficulty import compute_metrics
+from .models import Text, CodeSnippet
+
+User = get_user_model()
+
+
+class ComputeMetricsTests(SimpleTestCase):
+    def test_metrics(self):
+        metrics = compute_metrics('aaaa')
+        self.assertEqual((metrics['entropy'], metrics['symbol_density'], metrics['avg_word_length']), (0.0, 0.0, 4.0))
+        self.assertEqual(compute_metrics('')['difficulty_score'], 0.0)
+
+        code = compute_metrics('def f(x):\n    if x:\n\t\treturn {"a": [1]}', 'code')
+        self.assertEqual(code['indent_depth'], 2)
+        self.assertGreater(code['symbol_density'], 0.2)
+
+    def test_harder_text_scores_higher(self):
+        easy = compute_metrics('the cat is on the mat and the man is in the car')
+        hard = compute_metrics('Zygomorphic xylophones (quixotic!) juxtapose; pyrrhic: "bdellium" & {kvetch}.')
+        self.assertLess(easy['difficulty_score'], hard['difficulty_score'])
+        self.assertLess(easy['rare_bigram_ratio'], hard['rare_bigram_ratio'])
+
+
+class DifficultyColumnsTests(TestCase):
+    def test_computed_on_save_and_backfilled(self):
+        text = Text.objects.create(title='T', difficulty='easy', word_count=10, body='the cat is on the mat')
+        self.assertIsNotNone(text.difficulty_score)
+        text.body = 'Zygomorphic xylophones; quixotic!'
+        text.save(update_fields=['body'])
+        text.refresh_from_db()
+        self.assertEqual(text.difficulty_score, compute_metrics(text.normalized_body)['difficulty_score'])
+
+        Text.objects.filter(pk=text.pk).update(difficulty_score=None, entropy=None)
+        call_command('backfill_content_metadata', stdout=StringIO())
+        text.refresh_from_db()
+        self.assertIsNotNone(text.entropy)
+
+    def test_practice_filters_by_score_range(self):
+        easy = Text.objects.create(title='E', difficulty='easy', word_count=10, body='the cat is on the mat')
+        Text.objects.create(title='H', difficulty='easy', word_count=10, body='Zygomorphic (xylophones); {quixotic}!')
+        self.client.force_login(User.objects.create_user(username='u', password='p'))
+        url = reverse('typing_practice:text_practice', args=['easy'])
+        response = self.client.get(url, {'text_length': 10, 'max_score': easy.difficulty_score})
+        self.assertEqual(response.context['text'], easy)
+        self.assertContains(response, f'max_score={easy.difficulty_score:g}')
+
+        # The range replaces the coarse label: a text labelled "hard" is found from the easy page
+        hard_label = Text.objects.create(title='L', difficulty='hard', word_count=10, body='Quick brown foxes, jumping.')
+        response = self.client.get(url, {'text_length': 10, 'min_score': hard_label.difficulty_score,
+                                         'max_score': hard_label.difficulty_score})
+        self.assertEqual(response.context['text'], hard_label)
+        with self.assertNumQueries(6):  # session, user, text fetch + 3 template context queries: no ID list
+            self.client.get(url, {'text_length': 10, 'max_score': easy.difficulty_score})
+        # "next" still works with a score range present
+        response = self.client.get(url, {'text_length': 10, 'action': 'next', 'text_id': easy.id, 'max_score': 0})
+        self.assertNotEqual(response.context['text'], easy)
+
+        snippet = CodeSnippet.objects.create(title='C', language='python', difficulty='hard', code_body='x = 1')
+        response = self.client.get(reverse('typing_practice:code_practice', args=['python']), {'min_score': 0})
+        self.assertEqual(response.context['code'], snippet)
@@ -0,0 +1,80 @@
+import json
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from .error_profile import ErrorCounts, SIZE, char_slot, count_attempts, count_errors
+from accounts.jobs import run_pending
+from .models import Text, ErrorProfile
+
+User = get_user_model()
+
+
+class ErrorCountsTests(SimpleTestCase):
+    def test_count_errors_for_text_and_code_entries(self):
+        chars, bigrams = count_errors([{'word': 'the', 'typed': 'tge', 'position': 0}, 'junk', {'word': 5}])
+        self.assertEqual(chars, {char_slot('h'): 1})
+        self.assertEqual(bigrams, {char_slot('t') * SIZE + char_slot('h'): 1})
+
+        # Missing characters count too; code lines start after a newline
+        chars, bigrams = count_errors([{'line': 1, 'original': 'if x', 'typed': 'if'}], 'code')
+        self.assertEqual(chars, {char_slot(' '): 1, char_slot('x'): 1})
+        self.assertIn(char_slot('f') * SIZE + char_slot(' '), bigrams)
+
+    def test_blob_round_trip_and_summary(self):
+        counts = ErrorCounts()
+        counts.add(count_attempts('h' * 40 + 'e' * 40), *count_errors([{'word': 'he', 'typed': 'hx'}] * 10))
+        restored = ErrorCounts.from_blob(counts.to_blob())
+        self.assertEqual(restored.errors, counts.errors)
+        self.assertEqual(restored.bigrams, counts.bigrams)
+        self.assertLess(len(counts.to_blob()), 200)
+
+        summary = restored.summary()
+        self.assertEqual(summary['total_errors'], 10)
+        self.assertEqual(summary['weak_keys'][0]['char'], 'e')
+        self.assertEqual(summary['weak_keys'][0]['rate'], 25.0)
+        self.assertEqual(summary['weak_bigrams'], [{'bigram': 'he', 'errors': 10}])
+        levels = {key['char']: key['level'] for key in summary['keys']}
+        self.assertEqual(levels, {'h': 0, 'e': 4})
+
+
+class ErrorProfileViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='tester', password='pass')
+        self.client.force_login(self.user)
+        self.text = Text.objects.create(title='T', difficulty='easy', word_count=2, body='the cat')
+
+    def save(self, mistakes):
+        return self.client.post(reverse('typing_practice:save_result'), data=json.dumps({
+            'text_id': self.text.id, 'typed_text': 'the cat', 'wpm': 20, 'accuracy': 90,
+            'duration_seconds': 6, 'mode': 'time', 'allow_incomplete': True, 'mistakes_list': mistakes,
+        }), content_type='application/json')
+
+    def test_results_merge_into_profile(self):
+        self.assertEqual(self.client.get(reverse('typing_practice:error_profile')).json()['error_profile']['keys'], [])
+        self.save([{'word': 'cat', 'typed': 'cst', 'position': 1}])
+        self.save([{'word': 'cat', 'typed': 'cet', 'position': 1}])
+        # Merged by the gamification worker, not by the save request
+        self.assertFalse(ErrorProfile.objects.filter(user=self.user).exists())
+        while run_pending():
+            pass
+
+        profile = ErrorProfile.objects.get(user=self.user)
+        counts = ErrorCounts.from_blob(profile.counts)
+        self.assertEqual(counts.errors[char_slot('a')], 2)
+        self.assertEqual(counts.attempts[char_slot('t')], 4)
+
+        data = self.client.get(reverse('typing_practice:error_profile')).json()['error_profile']
+        self.assertEqual(data['total_errors'], 2)
+        self.assertEqual(data['weak_bigrams'][0], {'bigram': 'ca', 'errors': 2})
+
+        response = self.client.get(reverse('accounts:profile'))
+        self.assertContains(response, 'Zaif tugmalar')
+
+    def test_batch_merges_once(self):
+        item = {'text_id': self.text.id, 'typed_text': 'the cat', 'wpm': 20, 'accuracy': 90, 'duration_seconds': 6,
+                'mistakes_list': [{'word': 'the', 'typed': 'thr'}]}
+        self.client.post(reverse('typing_practice:save_results_batch'), data=json.dumps({'results': [item, item]}),
+                         content_type='application/json')
+        run_pending()
+        counts = ErrorCounts.from_blob(ErrorProfile.objects.get(user=self.user).counts)
+        self.assertEqual(counts.errors[char_slot('e')], 2)
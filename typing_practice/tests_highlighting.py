@@ -0,0 +1,54 @@
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from . import highlighting
+from .highlighting import cache_key, highlight_lines
+from .models import CodeSnippet
+
+User = get_user_model()
+
+
+class HighlightLinesTests(SimpleTestCase):
+    def test_one_self_contained_line_per_source_line(self):
+        code = 'def f():\n    """doc\n    more"""\n\n    return 1'
+        lines = highlight_lines(code, 'python')
+        self.assertEqual(len(lines), 5)
+        self.assertIn('<span class="k">def</span>', lines[0])
+        # A multi-line docstring is split into spans that close on every line
+        self.assertEqual(lines[1].count('<span'), lines[1].count('</span>'))
+        self.assertIn('&quot;&quot;&quot;</span>', lines[2])
+        self.assertEqual(lines[3], '')
+
+    def test_escapes_without_lexer(self):
+        self.assertEqual(highlight_lines('a < b\nc', 'brainfuck-ish'), ['a &lt; b', 'c'])
+
+
+class SnippetHighlightingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='hl', password='pass12345')
+
+    def test_warmed_on_save_and_shared_by_content_hash(self):
+        snippet = CodeSnippet.objects.create(title='A', language='java', difficulty='easy',
+                                             code_body='int x = 1;  \r\nreturn x;')
+        cached = cache.get(cache_key('java', snippet.content_hash))
+        self.assertEqual(len(cached), 2)
+
+        # Same normalized code is not highlighted again
+        with mock.patch.object(highlighting, 'highlight_lines') as highlight:
+            CodeSnippet.objects.create(title='B', language='java', difficulty='hard', code_body='int x = 1;\nreturn x;')
+            self.assertEqual(highlighting.snippet_lines(snippet), cached)
+        highlight.assert_not_called()
+
+    def test_code_page_embeds_highlighted_lines(self):
+        snippet = CodeSnippet.objects.create(title='P', language='python', difficulty='easy',
+                                             code_body='import os\nprint(os.sep)')
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('typing_practice:code_practice', args=['python']))
+        self.assertEqual(response.context['code'], snippet)
+        self.assertEqual(len(response.context['code_lines']), 2)
+        self.assertContains(response, 'id="code-lines"')
+        self.assertContains(response, '<span class="kn">import</span>')
+        self.assertNotContains(response, 'hljs')
@@ -0,0 +1,58 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from .models import Text, CodeSnippet
+from .selection import text_pool, code_pool
+
+
+class ImportCorpusTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def run_import(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_corpus', *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_word_count_bucket(self):
+        self.assertEqual([Text.word_count_bucket(n) for n in (1, 17, 18, 40, 90, 500)], [10, 10, 25, 25, 100, 100])
+
+    def test_jsonl_import_dedups_and_invalidates_pools(self):
+        Text.objects.create(title='Old', difficulty='easy', word_count=10, body='already  here')
+        self.assertEqual(len(text_pool.ids('easy', 10)), 1)
+        records = [
+            {'title': 'A', 'body': 'one two three', 'difficulty': 'hard'},
+            {'body': 'one   two three'},  # same normalized body as A
+            {'body': 'already here'},  # already in the table
+            {'language': 'python', 'code': 'print(1)'},
+            {'language': 'cobol', 'code': 'x'},
+        ]
+        path = self.write('corpus.jsonl', '\n'.join(map(json.dumps, records)) + '\nnot json\n')
+        out, err = self.run_import(path, '--chunk-size', '2')
+
+        self.assertIn('Read 6 record(s): 2 created, 2 duplicate(s), 2 invalid', out)
+        self.assertIn("unknown language 'cobol'", err)
+        text = Text.objects.get(title='A')
+        self.assertEqual((text.word_count, text.difficulty, text.body_word_count), (10, 'hard', 3))
+        self.assertTrue(text.content_hash)
+        self.assertEqual(code_pool.ids('python', 'easy'), (CodeSnippet.objects.get().id,))
+        self.assertEqual(text_pool.ids('hard', 10), (text.id,))
+
+    def test_csv_and_dry_run(self):
+        path = self.write('corpus.csv', 'title,body,difficulty\nT1,"a b, c",easy\nT2,"a b, c",easy\nT3,"x y",hard\n')
+        out, _ = self.run_import(path, '--dry-run', '--chunk-size', '1')
+        self.assertIn('[dry run] Read 3 record(s): 2 created, 1 duplicate(s)', out)
+        self.assertFalse(Text.objects.exists())
+
+        self.run_import(path, '--type', 'text')
+        self.assertEqual(sorted(Text.objects.values_list('title', flat=True)), ['T1', 'T3'])
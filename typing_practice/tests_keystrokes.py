@@ -0,0 +1,72 @@
+import json
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from .keystrokes import (
+    BACKSPACE, MAX_DELTA_MS, TimelineError,
+    encode_timeline, decode_timeline, parse_keystrokes, replay_text,
+)
+from .models import Text, UserResult, KeystrokeTimeline
+
+User = get_user_model()
+
+
+class KeystrokeCodecTests(SimpleTestCase):
+    def test_round_trip(self):
+        events = [(0, ord('a')), (120, ord('b')), (250, BACKSPACE), (400, ord('ʻ')), (401, 0x1F600)]
+        self.assertEqual(decode_timeline(encode_timeline(events)), events)
+        self.assertEqual(replay_text(events), 'aʻ😀')
+        self.assertEqual(decode_timeline(encode_timeline([])), [])
+
+    def test_blob_is_much_smaller_than_json(self):
+        events = [(i * 180, ord('abcdefgh '[i % 9])) for i in range(2000)]
+        blob = encode_timeline(events)
+        self.assertLess(len(blob) * 10, len(json.dumps(events)))
+
+    def test_long_pauses_are_clamped_and_times_monotonic(self):
+        events = decode_timeline(encode_timeline([(0, 97), (100000, 98), (50, 99)]))
+        self.assertEqual([t for t, _ in events], [0, MAX_DELTA_MS, MAX_DELTA_MS])
+
+    def test_parsed_events_match_the_stored_timeline(self):
+        raw = [[5000, 97], [5200, 98], [5100, 99], [90000, 100]]
+        events = parse_keystrokes(raw)
+        self.assertEqual(events, [(0, 97), (200, 98), (200, 99), (200 + MAX_DELTA_MS, 100)])
+        self.assertEqual(decode_timeline(encode_timeline(events)), events)
+
+    def test_invalid_input(self):
+        self.assertEqual(parse_keystrokes(None), [])
+        for raw in ('abc', [[1]], [['x', 97]], [[-1, 97]], [[0, 0x110000]]):
+            with self.assertRaises(TimelineError):
+                parse_keystrokes(raw)
+        with self.assertRaises(TimelineError):
+            decode_timeline(b'\x09garbage')
+
+
+class KeystrokeTimelineViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='tester', password='pass')
+        self.client.force_login(self.user)
+        self.text = Text.objects.create(title='T', difficulty='easy', word_count=2, body='hi yo')
+
+    def test_timeline_saved_with_result_and_served(self):
+        keystrokes = [[i * 150, ord(ch)] for i, ch in enumerate('hi yo')]
+        response = self.client.post(reverse('typing_practice:save_result'), data=json.dumps({
+            'text_id': self.text.id, 'typed_text': 'hi yo', 'wpm': 24, 'accuracy': 100,
+            'duration_seconds': 1, 'keystrokes': keystrokes,
+        }), content_type='application/json')
+        result_id = response.json()['result_id']
+
+        timeline = KeystrokeTimeline.objects.get(result_id=result_id)
+        self.assertEqual((timeline.keystroke_count, timeline.duration_ms), (5, 600))
+
+        data = self.client.get(reverse('typing_practice:keystroke_timeline', args=[result_id])).json()
+        self.assertEqual(data['events'], keystrokes)
+        self.assertEqual(data['original'], 'hi yo')
+        self.assertEqual(self.client.get(reverse('typing_practice:replay_result', args=[result_id])).status_code, 200)
+
+    def test_other_users_cannot_read_timeline(self):
+        other = User.objects.create_user(username='other', password='pass')
+        result = UserResult.objects.create(user=other, text=self.text, wpm=20, accuracy=100, session_type='text')
+        KeystrokeTimeline.from_events(result, [(0, 104)]).save()
+        response = self.client.get(reverse('typing_practice:keystroke_timeline', args=[result.id]))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,38 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from .models import Text
+from .selection import text_pool
+
+
+class MaintenanceCommandTests(TestCase):
+    def setUp(self):
+        self.short = Text.objects.create(title='S', difficulty='easy', word_count=100, body='one two three')
+        self.ok = Text.objects.create(title='OK', difficulty='easy', word_count=10, body='a b c d e f g h i j')
+
+    def call(self, name, *args):
+        out = StringIO()
+        call_command(name, *args, stdout=out)
+        return out.getvalue()
+
+    def test_fix_word_counts_dry_run_then_apply(self):
+        out = self.call('fix_text_word_counts', '--dry-run')
+        self.assertIn('[dry run] Text: 1 of 2 row(s) fixed', out)
+        self.short.refresh_from_db()
+        self.assertEqual(self.short.word_count, 100)
+
+        self.assertEqual(text_pool.ids('easy', 10), (self.ok.id,))
+        out = self.call('fix_text_word_counts', '--chunk-size', '1')
+        self.assertIn('Text: 1 of 2 row(s) fixed', out)
+        self.short.refresh_from_db()
+        self.assertEqual(self.short.word_count, 10)
+        # bulk_update skips signals; the command invalidates the pool itself
+        self.assertEqual(text_pool.ids('easy', 10), (self.short.id, self.ok.id))
+
+    def test_swap_fields_refreshes_metadata(self):
+        out = self.call('swap_text_fields', '--chunk-size', '1')
+        self.assertIn('Text: 2 of 2 row(s) swapped', out)
+        self.short.refresh_from_db()
+        self.assertEqual((self.short.title, self.short.body), ('one two three', 'S'))
+        self.assertEqual(self.short.normalized_body, 'S')
+        self.assertEqual(self.short.content_hash, Text.hash_normalized('S'))
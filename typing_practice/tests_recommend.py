@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from .error_profile import ErrorCounts, count_errors
+from .models import Text, CodeSnippet, ErrorProfile
+from .recommend import recommend, bigram_vector
+from .selection import text_pool, code_pool
+
+User = get_user_model()
+
+
+class RecommendTests(TestCase):
+    def setUp(self):
+        text_pool.invalidate()
+        code_pool.invalidate()
+        self.user = User.objects.create_user(username='tester', password='pass')
+        self.plain = Text.objects.create(title='Plain', difficulty='easy', word_count=10, body='aaa bbb aaa bbb aaa')
+        self.target = Text.objects.create(title='Target', difficulty='easy', word_count=10, body='the then there that')
+        Text.objects.create(title='Hard', difficulty='hard', word_count=10, body='the the the the')
+
+    def give_weakness(self, mistakes):
+        counts = ErrorCounts()
+        counts.add({}, *count_errors(mistakes))
+        ErrorProfile.objects.create(user=self.user, counts=counts.to_blob())
+
+    def test_bigram_vector_is_normalized(self):
+        indexes, freqs = bigram_vector('abab')
+        self.assertEqual(len(indexes), 2)  # ab, ba
+        self.assertAlmostEqual(float(freqs.sum()), 1.0, places=5)
+
+    def test_ranks_by_weak_bigrams_within_filters(self):
+        self.give_weakness([{'word': 'the', 'typed': 'tge'}] * 10)
+        for _ in range(5):
+            self.assertEqual(recommend(text_pool, self.user, 'easy', 10, top=1), self.target)
+        # Matrix is derived from the pool and dropped with it
+        self.assertIn('bigrams', text_pool._derived)
+        Text.objects.create(title='New', difficulty='easy', word_count=10, body='ththththth')
+        self.assertNotIn('bigrams', text_pool._derived)
+        self.assertEqual(recommend(text_pool, self.user, 'easy', 10, top=1).title, 'New')
+
+    def test_without_profile_falls_back_to_random(self):
+        self.assertIsNone(recommend(text_pool, self.user, 'easy', 10))
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('typing_practice:text_practice', args=['easy']),
+                                   {'action': 'weak', 'text_length': 10})
+        self.assertIn(response.context['text'], [self.plain, self.target])
+
+    def test_code_practice_weak_action(self):
+        CodeSnippet.objects.create(title='Loop', language='python', difficulty='easy', code_body='for i in range(3):\n    print(i)')
+        snippet = CodeSnippet.objects.create(title='Ret', language='python', difficulty='easy', code_body='return x\nreturn y')
+        self.give_weakness([{'original': 'return', 'typed': 'retrun'}] * 10)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('typing_practice:code_practice', args=['python']), {'action': 'weak'})
+        self.assertEqual(response.context['code'], snippet)
@@ -69,6 +69,9 @@ class SaveResultTests(TestCase):
         self.assertEqual(resp.status_code, 200)
         data = resp.json()
         self.assertTrue(data.get('success'))
+        # The untyped rest of the text is not scored as mistakes; practice keeps the client's mistakes
+        result = UserResult.objects.get(user=self.user, text=self.text)
+        self.assertEqual((result.accuracy, result.mistakes), (100.0, 1))
 
     def test_tampered_wpm_gets_overridden(self):
         self.login()
@@ -0,0 +1,93 @@
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from .models import Text, CodeSnippet
+from .scoring import (
+    normalize_text, normalize_code, count_mismatches,
+    score_submission, score_batch, reconcile_metrics,
+)
+
+
+class ScoringTests(SimpleTestCase):
+    def test_normalization(self):
+        self.assertEqual(normalize_text('  one\r\n two\tthree '), 'one two three')
+        self.assertEqual(normalize_code('a = 1   \r\nb = 2  '), 'a = 1\nb = 2')
+        self.assertEqual(normalize_text(None), '')
+
+    def test_count_mismatches_matches_per_char_loop(self):
+        pairs = [('one two', 'one two'), ('onx two', 'one two'), ('one', 'one two'), ('one two extra', 'one two'), ('', 'abc')]
+        for typed, original in pairs:
+            expected = sum(1 for i, ch in enumerate(typed) if i >= len(original) or ch != original[i])
+            self.assertEqual(count_mismatches(typed, original), expected)
+
+    def test_partial_submission_scores_only_typed_characters(self):
+        original = 'hello world and some more text'
+        score = score_submission('hello', original + '!', 10)
+        self.assertEqual((score['mistakes'], score['untyped_chars'], score['accuracy']), (0, 26, 100.0))
+        self.assertFalse(score['is_complete'])
+        score = score_submission('hxllo', original, 10)
+        self.assertEqual((score['mistakes'], score['accuracy']), (1, 80.0))
+        self.assertEqual(score_batch([('hello', original + '!', 10, 'text')])[0], score_submission('hello', original + '!', 10))
+
+    def test_text_and_code_scores(self):
+        score = score_submission('one two three four', 'one two three four', 2)
+        self.assertTrue(score['is_complete'])
+        self.assertEqual(score['wpm'], 120)
+        self.assertEqual(score['accuracy'], 100.0)
+
+        code_score = score_submission('print("hi")', 'print("hi")', 6, session_type='code')
+        self.assertEqual(code_score['wpm'], round((11 / 5.0) / 6 * 60, 2))
+
+    def test_batch_matches_single(self):
+        submissions = [
+            ('one two', 'one two three four', 10, 'text'),
+            ('print("hx")', 'print("hi")', 4, 'code'),
+            ('', 'abc', 0, 'text'),
+            ('abc def', 'abc def', 3, 'text'),
+        ]
+        batch = score_batch(submissions)
+        single = [score_submission(*s) for s in submissions]
+        self.assertEqual(batch, single)
+        self.assertEqual(score_batch([]), [])
+
+    def test_reconcile_overrides_tampered_values(self):
+        score = {'wpm': 120.0, 'accuracy': 100.0, 'mistakes': 0}
+        self.assertEqual(reconcile_metrics(9999, 100, 0, score), (120.0, 100, 0))
+        self.assertEqual(reconcile_metrics(118, 50, 9, score), (118, 100.0, 0))
+        self.assertEqual(reconcile_metrics(118, 100, 9, score, check_mistakes=False), (118, 100, 9))
+
+
+class ContentMetadataTests(TestCase):
+    def test_metadata_computed_on_save(self):
+        text = Text.objects.create(title='T', difficulty='easy', word_count=10, body=' one  two\nthree ')
+        self.assertEqual(text.normalized_body, 'one two three')
+        self.assertEqual(text.char_count, 13)
+        self.assertEqual(text.body_word_count, 3)
+        self.assertEqual(text.content_hash, Text.hash_normalized('one two three'))
+
+        code = CodeSnippet.objects.create(title='C', language='python', difficulty='easy', code_body='x = 1  \r\ny = 2')
+        self.assertEqual(code.normalized_body, 'x = 1\ny = 2')
+
+    def test_metadata_only_recomputed_when_the_body_changes(self):
+        text = Text.objects.create(title='T', difficulty='easy', word_count=10, body='a b')
+        text = Text.objects.get(pk=text.pk)
+        with patch.object(Text, 'refresh_content_metadata') as refresh:
+            text.title = 'New title'
+            text.save()
+            text.save(update_fields=['title'])
+            refresh.assert_not_called()
+            text.body = 'a b c'
+            text.save()
+            self.assertEqual(refresh.call_count, 1)
+        text.save(update_fields=['body'])
+        text.refresh_from_db()
+        self.assertEqual((text.title, text.body_word_count), ('New title', 3))
+
+    def test_backfill_command(self):
+        text = Text.objects.create(title='T', difficulty='easy', word_count=10, body='a b')
+        Text.objects.filter(pk=text.pk).update(normalized_body='', content_hash='', char_count=0)
+        call_command('backfill_content_metadata', chunk_size=1, stdout=StringIO())
+        text.refresh_from_db()
+        self.assertEqual(text.normalized_body, 'a b')
+        self.assertTrue(text.content_hash)
@@ -0,0 +1,120 @@
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from typing_platform.state import cache
+from . import seen as seen_sets
+from .models import Text
+from .seen import SEEN_BITS, SEEN_BYTES, SeenSet
+from .selection import UNSEEN_PROBES, UNSEEN_SCAN_LIMIT, ContentPool, text_pool
+from .utils import get_random_text
+
+User = get_user_model()
+
+
+class SeenSetTests(SimpleTestCase):
+    def test_bitmap_membership(self):
+        seen = SeenSet()
+        seen.add(5)
+        seen.add(70000)
+        self.assertIn(5, seen)
+        self.assertIn(70000, seen)
+        self.assertNotIn(6, seen)
+        self.assertIn(5 + SEEN_BITS, seen)  # shares the bit of 5
+        seen.discard(5)
+        self.assertNotIn(5, seen)
+        self.assertEqual(len(seen.to_bytes()), SEEN_BYTES)
+
+    def test_union(self):
+        first, second = SeenSet(), SeenSet()
+        first.add(1)
+        second.add(2)
+        first.update(second)
+        self.assertTrue(1 in first and 2 in first)
+        self.assertEqual(SeenSet(b'garbage').to_bytes(), bytes(SEEN_BYTES))
+
+    def test_choice_prefers_unseen(self):
+        pool = ContentPool('typing_practice.Text', ('difficulty',))
+        pool._index, pool._version = {('easy',): (1, 2, 3)}, pool._shared_version()
+        seen = SeenSet()
+        seen.add(1)
+        seen.add(3)
+        self.assertEqual({pool.choice('easy', seen=seen) for _ in range(20)}, {2})
+        seen.add(2)
+        self.assertIn(pool.choice('easy', seen=seen), (1, 2, 3))
+
+    def test_fallback_scan_is_bounded(self):
+        pool = ContentPool('typing_practice.Text', ('difficulty',))
+        ids = tuple(range(SEEN_BITS))
+        pool._index, pool._version = {('easy',): ids}, pool._shared_version()
+        seen = SeenSet()
+        for pk in ids:
+            seen.add(pk)
+        checked = []
+
+        class CountingSeen:
+            def __contains__(self, pk):
+                checked.append(pk)
+                return pk in seen
+
+        self.assertIn(pool.choice('easy', seen=CountingSeen()), ids)
+        self.assertLessEqual(len(checked), UNSEEN_PROBES + UNSEEN_SCAN_LIMIT)
+
+    @override_settings(SEEN_MAX_BITS=1 << 14)
+    def test_bitmap_grows_with_the_corpus_without_forgetting(self):
+        self.assertEqual(seen_sets.bits_for(100), SEEN_BITS)
+        self.assertEqual(seen_sets.bits_for(5000), 8192)
+        self.assertEqual(seen_sets.bits_for(10 ** 9), 1 << 14)
+        small = SeenSet()
+        small.add(5)
+        grown = SeenSet(small.to_bytes(), bits=8192)
+        self.assertEqual(grown.size, 8192)
+        self.assertIn(5, grown)
+        self.assertIn(5 + SEEN_BITS, grown)  # tiling keeps the old, coarser answer
+        grown.add(7000)
+        self.assertNotIn(7000 - SEEN_BITS * 3, grown)
+        small.update(grown)
+        self.assertEqual(small.size, 8192)
+        self.assertIn(7000, small)
+
+
+class UnseenSelectionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        text_pool.invalidate()
+        self.user = User.objects.create_user(username='reader', password='pass')
+        self.other = User.objects.create_user(username='other', password='pass')
+        self.texts = [
+            Text.objects.create(title=f'T{i}', difficulty='easy', word_count=10, body=f'text number {i}')
+            for i in range(3)
+        ]
+
+    def test_cycles_through_every_text_before_repeating(self):
+        for _ in range(3):
+            picked = [get_random_text('easy', 10, seen_by=[self.user]).id for _ in range(3)]
+            self.assertEqual(sorted(picked), sorted(text.id for text in self.texts))
+
+    def test_cut_off_scan_does_not_reset_the_cycle(self):
+        pool = ContentPool('typing_practice.Text', ('difficulty',))
+        ids = tuple(range(1, UNSEEN_SCAN_LIMIT * 4))
+        pool._index, pool._version = {('easy',): ids}, pool._shared_version()
+        seen = SeenSet(bits=seen_sets.bits_for(ids[-1]))
+        for pk in ids[:-1]:
+            seen.add(pk)
+        with mock.patch('typing_practice.selection.random.randrange', return_value=0), \
+                mock.patch.object(ContentPool, 'get', side_effect=lambda pk: Text(pk=pk)):
+            obj, exhausted = pool.random_unseen_object(seen, 'easy')
+            self.assertFalse(exhausted)
+            seen.add(ids[-1])
+            obj, exhausted = pool.random_unseen_object(seen, 'easy')
+            self.assertFalse(exhausted)  # all seen, but the scan stopped at the limit
+        small = ContentPool('typing_practice.Text', ('difficulty',))
+        small._index, small._version = {('easy',): (1, 2)}, small._shared_version()
+        with mock.patch.object(ContentPool, 'get', side_effect=lambda pk: Text(pk=pk)):
+            self.assertTrue(small.random_unseen_object(seen, 'easy')[1])
+
+    def test_battle_pick_avoids_texts_either_player_has_seen(self):
+        seen_sets.mark_seen([self.user], 'text', self.texts[0].id)
+        seen_sets.mark_seen([self.other], 'text', self.texts[1].id)
+        text = get_random_text(seen_by=[self.user, self.other])
+        self.assertEqual(text, self.texts[2])
+        self.assertIn(self.texts[2].id, seen_sets.load([self.other], 'text'))
@@ -0,0 +1,64 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from .models import Text, CodeSnippet
+from .selection import text_pool, code_pool
+from .utils import get_random_text, get_random_code, get_next_text, get_next_code
+
+
+class SelectionPoolTests(TestCase):
+    def setUp(self):
+        self.easy = Text.objects.create(title='E', difficulty='easy', word_count=10, body='a b c')
+        self.hard = Text.objects.create(title='H', difficulty='hard', word_count=25, body='d e f')
+        self.code = CodeSnippet.objects.create(title='C', language='python', difficulty='easy', code_body='x = 1')
+
+    def test_pool_groups_by_filters(self):
+        self.assertEqual(text_pool.ids('easy', 10), (self.easy.id,))
+        self.assertEqual(text_pool.ids('hard', None), (self.hard.id,))
+        self.assertEqual(text_pool.ids(None, None), (self.easy.id, self.hard.id))
+        self.assertEqual(code_pool.ids(None, None), (self.code.id,))
+        self.assertEqual(code_pool.ids('java', 'easy'), ())
+
+    def test_random_selection_uses_single_query(self):
+        text_pool.ids(None, None)  # warm the pool
+        with self.assertNumQueries(1):
+            self.assertEqual(get_random_text('easy', 10), self.easy)
+        self.assertIsNone(get_random_text('easy', 100))
+        self.assertEqual(get_random_code('python', 'easy'), self.code)
+
+    def test_pool_invalidated_on_save_and_delete(self):
+        self.assertEqual(text_pool.ids('easy', 60), ())
+        new_text = Text.objects.create(title='N', difficulty='easy', word_count=60, body='g h i')
+        self.assertEqual(text_pool.ids('easy', 60), (new_text.id,))
+        new_text.delete()
+        self.assertEqual(text_pool.ids('easy', 60), ())
+
+    @override_settings(CONTENT_POOL_VERSION_CHECK_SECONDS=60)
+    def test_shared_version_is_checked_at_most_once_per_interval(self):
+        text_pool.ids(None, None)  # warm the pool
+        # Another process changed the content: noticed only on the next version check
+        Text.objects.filter(id=self.hard.id).update(difficulty='easy')  # no signals
+        cache.set(text_pool.version_key, cache.get(text_pool.version_key, 0) + 1, None)
+        self.assertEqual(text_pool.ids('hard', None), (self.hard.id,))
+        text_pool._checked_at -= 60
+        self.assertEqual(text_pool.ids('hard', None), ())
+
+    def test_next_wraps_around_with_single_fetch(self):
+        second = Text.objects.create(title='E2', difficulty='easy', word_count=10, body='x y z')
+        text_pool.ids('easy', 10)  # warm the pool
+        with self.assertNumQueries(1):
+            self.assertEqual(get_next_text(self.easy.id, 'easy', 10), second)
+        self.assertEqual(get_next_text(second.id, 'easy', 10), self.easy)
+        # An id outside the filter still moves forward in ID order
+        self.assertEqual(get_next_text(self.hard.id, 'easy', 10), second)
+        self.assertIsNone(get_next_code(self.code.id, 'java', 'easy'))
+
+    def test_next_action_in_views(self):
+        from django.contrib.auth import get_user_model
+        from django.urls import reverse
+        second = Text.objects.create(title='E2', difficulty='easy', word_count=10, body='x y z')
+        self.client.force_login(get_user_model().objects.create_user(username='u', password='p'))
+        url = reverse('typing_practice:text_practice', args=['easy'])
+        response = self.client.get(url, {'action': 'next', 'text_id': self.easy.id, 'text_length': 10})
+        self.assertEqual(response.context['text'], second)
+        response = self.client.get(url, {'action': 'next', 'text_id': 'abc', 'text_length': 10})
+        self.assertIn(response.context['text'], [self.easy, second])
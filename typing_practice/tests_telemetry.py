@@ -0,0 +1,100 @@
+import json
+import os
+import tempfile
+import threading
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from .models import TelemetryCounter
+from .telemetry import TelemetryBuffer, buffer, prune_files
+
+
+class TelemetryTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        settings_override = override_settings(TELEMETRY_DIR=self.tmp.name, TELEMETRY_FLUSH_SIZE=3, TELEMETRY_FLUSH_SECONDS=3600,
+                                            TELEMETRY_BACKGROUND_FLUSH=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        buffer.flush()
+        self.addCleanup(buffer.flush)
+
+    def send(self, payload):
+        return self.client.post(reverse('typing_practice:telemetry'), data=json.dumps(payload), content_type='application/json')
+
+    def read_events(self):
+        events = []
+        for name in os.listdir(self.tmp.name):
+            with open(os.path.join(self.tmp.name, name), encoding='utf-8') as f:
+                events += [json.loads(line) for line in f]
+        return events
+
+    def test_events_are_buffered_then_flushed_in_one_batch(self):
+        self.assertEqual(self.send({'event': 'offline_queue', 'details': {'size': 2}}).status_code, 200)
+        self.send({'event': 'offline_queue'})
+        self.assertEqual(buffer.pending(), 2)
+        self.assertEqual(self.read_events(), [])
+        self.assertFalse(TelemetryCounter.objects.exists())
+
+        self.send({'event': 'replay_open'})
+        self.assertEqual(buffer.pending(), 0)
+        events = self.read_events()
+        self.assertEqual([e['event'] for e in events], ['offline_queue', 'offline_queue', 'replay_open'])
+        self.assertEqual(events[0]['details'], {'size': 2})
+        counts = dict(TelemetryCounter.objects.values_list('event_type', 'count'))
+        self.assertEqual(counts, {'offline_queue': 2, 'replay_open': 1})
+
+        # Counters keep accumulating across flushes
+        for _ in range(3):
+            self.send({'event': 'replay_open'})
+        self.assertEqual(TelemetryCounter.objects.get(event_type='replay_open').count, 4)
+
+    def test_invalid_payloads_rejected(self):
+        self.assertEqual(self.send({'details': {}}).status_code, 400)
+        self.assertEqual(self.send(['x']).status_code, 400)
+        response = self.client.post(reverse('typing_practice:telemetry'), data='{', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.send({'event': 'x' * 100, 'details': {'blob': 'y' * 5000}})
+        buffer.flush()
+        event = self.read_events()[0]
+        self.assertEqual((event['event'], len(event['details']['event'])), ('other', 64))
+
+    def test_unknown_event_types_share_one_counter(self):
+        for name in ('spam-1', 'spam-2', 'offline_queue'):
+            self.send({'event': name})
+        self.assertEqual(dict(TelemetryCounter.objects.values_list('event_type', 'count')), {'other': 2, 'offline_queue': 1})
+        self.assertEqual([e['details'].get('event') for e in self.read_events()], ['spam-1', 'spam-2', None])
+
+    @override_settings(TELEMETRY_RETENTION_DAYS=7)
+    def test_old_event_files_are_pruned(self):
+        for name in ('events-2020-01-01.jsonl', 'events-2099-01-01.jsonl', 'notes.txt'):
+            open(os.path.join(self.tmp.name, name), 'w').close()
+        self.assertEqual(prune_files(self.tmp.name), 1)
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ['events-2099-01-01.jsonl', 'notes.txt'])
+
+    def test_counter_failure_does_not_drop_written_events(self):
+        with mock.patch('typing_practice.telemetry.add_to_counter', side_effect=RuntimeError('db down')), \
+                self.assertLogs('typing_platform', 'ERROR') as logs:
+            for _ in range(3):
+                self.send({'event': 'offline_queue'})
+        self.assertEqual(len(self.read_events()), 3)
+        self.assertIn('counters not updated', logs.output[0])
+        self.assertNotIn('dropped', logs.output[0])
+
+    @override_settings(TELEMETRY_BACKGROUND_FLUSH=True)
+    def test_background_flush_runs_off_the_request_thread(self):
+        local = TelemetryBuffer()
+        flushed = threading.Event()
+        threads = []
+
+        def fake_flush():
+            threads.append(threading.current_thread())
+            flushed.set()
+            return 0
+
+        with mock.patch.object(local, 'flush', side_effect=fake_flush):
+            for _ in range(3):
+                local.add('replay_open', {})
+            self.assertTrue(flushed.wait(5))
+        self.assertNotEqual(threads[0], threading.current_thread())
@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .models import Text, CodeSnippet, UserResult, TextStats
+
+User = get_user_model()
+
+
+class TextStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='tester', password='pass')
+        self.text = Text.objects.create(title='T', difficulty='easy', word_count=10, body='the cat sat')
+        self.code = CodeSnippet.objects.create(title='C', language='python', difficulty='easy', code_body='x = 1')
+
+    def add_result(self, wpm, accuracy, mistakes=0, **content):
+        return UserResult.objects.create(
+            user=self.user, wpm=wpm, accuracy=accuracy, mistakes=mistakes,
+            session_type='code' if 'code_snippet' in content else 'text', duration_seconds=30, **content,
+        )
+
+    def test_totals_updated_on_each_result(self):
+        self.add_result(40, 100, text=self.text)
+        self.add_result(60, 90, mistakes=3, text=self.text)
+        self.add_result(30, 80, mistakes=5, code_snippet=self.code)
+        self.add_result(50, 100)  # no content: not counted anywhere
+
+        stats = self.text.stats
+        stats.refresh_from_db()
+        self.assertEqual((stats.attempts, stats.max_wpm, stats.avg_wpm), (2, 60, 50))
+        self.assertEqual((stats.avg_accuracy, stats.total_mistakes, stats.perfect_attempts), (95, 3, 1))
+        self.assertEqual(TextStats.objects.get(code_snippet=self.code).attempts, 1)
+        self.assertEqual(TextStats.objects.count(), 2)
+
+    def test_save_path_adds_one_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.add_result(40, 100, text=self.text)
+        statements = [q['sql'] for q in queries if 'typing_practice_textstats' in q['sql']]
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith('UPDATE'))
+
+    def test_row_created_for_content_without_one(self):
+        TextStats.objects.all().delete()
+        self.add_result(40, 100, text=self.text)
+        self.add_result(20, 50, text=self.text)
+        self.assertEqual(TextStats.objects.get(text=self.text).attempts, 2)
+
+    def test_admin_orders_by_observed_difficulty(self):
+        other = Text.objects.create(title='Hard', difficulty='hard', word_count=10, body='zyx wvu')
+        self.add_result(60, 98, text=self.text)
+        self.add_result(20, 70, text=other)
+        admin_user = User.objects.create_superuser(username='admin', password='pass', email='a@example.com')
+        self.client.force_login(admin_user)
+        response = self.client.get(reverse('admin:typing_practice_textstats_changelist'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row.text for row in response.context['cl'].result_list], [other, self.text])
@@ -0,0 +1,53 @@
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from .models import UserResult, UserStats
+
+User = get_user_model()
+
+
+class UserStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='tester', password='pass')
+
+    def add_result(self, wpm, accuracy, session_type='text', mistakes=0):
+        return UserResult.objects.create(
+            user=self.user, wpm=wpm, accuracy=accuracy, mistakes=mistakes,
+            session_type=session_type, duration_seconds=30,
+        )
+
+    def test_stats_updated_on_each_result(self):
+        self.assertEqual(UserStats.for_user(self.user).total_sessions, 0)
+        self.add_result(40, 100)
+        self.add_result(60, 90, mistakes=3)
+        self.add_result(30, 96, session_type='code')
+
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual(stats.total_sessions, 3)
+        self.assertEqual(stats.max_wpm, 60)
+        self.assertAlmostEqual(stats.avg_wpm, 130 / 3)
+        self.assertEqual(stats.perfect_sessions, 1)
+        self.assertEqual(stats.high_accuracy_sessions, 2)
+        self.assertEqual(stats.total_mistakes, 3)
+        self.assertEqual((stats.text_sessions, stats.text_max_wpm, stats.text_avg_wpm), (2, 60, 50))
+        self.assertEqual((stats.code_sessions, stats.code_max_wpm), (1, 30))
+
+    def test_updating_a_result_does_not_count_twice(self):
+        result = self.add_result(40, 100)
+        result.mistakes = 1
+        result.save()
+        self.assertEqual(UserStats.objects.get(user=self.user).total_sessions, 1)
+
+    def test_rebuild_matches_incremental(self):
+        self.add_result(40, 100)
+        self.add_result(75, 95, session_type='code')
+        incremental = UserStats.objects.get(user=self.user)
+
+        UserStats.objects.filter(user=self.user).update(total_sessions=0, max_wpm=0)
+        call_command('rebuild_user_stats', stdout=StringIO())
+
+        rebuilt = UserStats.objects.get(user=self.user)
+        for field in ('total_sessions', 'total_wpm', 'max_wpm', 'total_accuracy', 'perfect_sessions',
+                      'high_accuracy_sessions', 'text_sessions', 'code_max_wpm', 'total_duration_seconds'):
+            self.assertEqual(getattr(rebuilt, field), getattr(incremental, field), field)
@@ -9,7 +9,11 @@ urlpatterns = [
     path('text/<str:difficulty>/', views.text_practice, name='text_practice'),
     path('code/<str:language>/', views.code_practice, name='code_practice'),
     path('save-result/', views.save_result, name='save_result'),
+    path('save-results/', views.save_results_batch, name='save_results_batch'),
     path('achievements/', views.achievements, name='achievements'),
+    path('error-profile/', views.error_profile, name='error_profile'),
+    path('results/<int:result_id>/keystrokes/', views.keystroke_timeline, name='keystroke_timeline'),
+    path('results/<int:result_id>/replay/', views.replay_result, name='replay_result'),
     path('telemetry/', views.telemetry, name='telemetry'),
 ]
 
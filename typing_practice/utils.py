@@ -2,6 +2,7 @@
 Utility functions for typing practice calculations
 """
 import logging
+import random
 
 logger = logging.getLogger('typing_platform')
 
@@ -38,39 +39,69 @@ def validate_accuracy(accuracy):
     return max(0, min(100, float(accuracy)))
 
 
-def get_random_text(difficulty='easy', word_count=None):
-    """Get random text efficiently based on difficulty and word count"""
-    from .models import Text
-    import random
-    
-    # Filter by difficulty and word_count if provided
-    query = Text.objects.filter(difficulty=difficulty)
-    if word_count:
-        query = query.filter(word_count=word_count)
-    
-    # Get all IDs first (more efficient)
-    text_ids = list(query.values_list('id', flat=True))
-    if not text_ids:
-        return None
-    
-    random_id = random.choice(text_ids)
-    return Text.objects.get(id=random_id)
-
-
-def get_random_code(language='python', difficulty='easy'):
-    """Get random code snippet efficiently"""
-    from .models import CodeSnippet
-    import random
-    
-    # Get all IDs first (more efficient)
-    code_ids = list(CodeSnippet.objects.filter(
-        language=language,
-        difficulty=difficulty
-    ).values_list('id', flat=True))
-    
-    if not code_ids:
-        return None
-    
-    random_id = random.choice(code_ids)
-    return CodeSnippet.objects.get(id=random_id)
+def _random_unseen(pool, kind, seen_by, *values):
+    """Random object the given users have not been served yet (falls back to any match)"""
+    from . import seen as seen_sets
+    bits = seen_sets.bits_for(pool.max_id())
+    seen = seen_sets.load(seen_by, kind, bits)
+    obj, exhausted = pool.random_unseen_object(seen, *values)
+    if obj is not None:
+        # Every match was checked and already seen: start a new cycle over these ids
+        reset = pool.ids(*values) if exhausted else ()
+        seen_sets.mark_seen(seen_by, kind, obj.pk, reset=reset, bits=bits)
+    return obj
 
+
+def get_random_text(difficulty='easy', word_count=None, seen_by=()):
+    """Get random text from the in-process selection pool (at most one query), unseen by `seen_by` users first"""
+    from .selection import text_pool
+    if seen_by:
+        return _random_unseen(text_pool, 'text', seen_by, difficulty, word_count or None)
+    return text_pool.random_object(difficulty, word_count or None)
+
+
+def get_random_code(language='python', difficulty='easy', seen_by=()):
+    """Get random code snippet from the in-process selection pool (None = any language/difficulty)"""
+    from .selection import code_pool
+    if seen_by:
+        return _random_unseen(code_pool, 'code', seen_by, language, difficulty)
+    return code_pool.random_object(language, difficulty)
+
+
+def get_random_text_in_score_range(min_score=None, max_score=None, word_count=None):
+    """Random text of any difficulty label within a difficulty_score range (from the selection pool)"""
+    from .selection import text_pool
+    return text_pool.random_object_in_score_range(min_score, max_score, None, word_count or None)
+
+
+def get_random_code_in_score_range(language='python', min_score=None, max_score=None):
+    """Random code snippet of any difficulty label within a difficulty_score range (from the selection pool)"""
+    from .selection import code_pool
+    return code_pool.random_object_in_score_range(min_score, max_score, language, None)
+
+
+def get_next_text(current_id, difficulty='easy', word_count=None):
+    """Text after current_id in ID order (wrapping around) from the selection pool"""
+    from .selection import text_pool
+    return text_pool.next_object(current_id, difficulty, word_count or None)
+
+
+def get_next_code(current_id, language='python', difficulty='easy'):
+    """Code snippet after current_id in ID order (wrapping around) from the selection pool"""
+    from .selection import code_pool
+    return code_pool.next_object(current_id, language, difficulty)
+
+
+def get_recommended_text(user, difficulty='easy', word_count=None):
+    """Text that exercises the user's weak bigrams, falling back to a random one"""
+    from .selection import text_pool
+    from .recommend import recommend
+    return (recommend(text_pool, user, difficulty, word_count or None)
+            or get_random_text(difficulty, word_count, seen_by=[user]))
+
+
+def get_recommended_code(user, language='python', difficulty='easy'):
+    """Code snippet that exercises the user's weak bigrams, falling back to a random one"""
+    from .selection import code_pool
+    from .recommend import recommend
+    return recommend(code_pool, user, language, difficulty) or get_random_code(language, difficulty, seen_by=[user])
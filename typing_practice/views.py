@@ -1,17 +1,25 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404
 from django.views.decorators.http import require_http_methods
-from django.core.cache import cache
 from django.core.paginator import Paginator
 from django.db import transaction
-from .models import Text, CodeSnippet, UserResult
+from django.db.models import Exists, OuterRef
+from .models import Text, CodeSnippet, UserResult, UserStats, TextStats, KeystrokeTimeline, ErrorProfile
+from .keystrokes import parse_keystrokes, TimelineError
+from .telemetry import buffer as telemetry_buffer, clean_event
+from .anticheat import check_submission, recent_intervals, HISTORY_SIZE, SUSPICION_THRESHOLD
+from .highlighting import highlight_context
 from .utils import (
     validate_wpm, validate_accuracy,
-    get_random_text, get_random_code
+    get_random_text, get_random_code, get_next_text, get_next_code,
+    get_recommended_text, get_recommended_code, get_random_text_in_score_range, get_random_code_in_score_range,
 )
+from .scoring import score_submission, score_batch, reconcile_metrics
+from accounts.jobs import dispatch_result_batch, previous_best
 from django.views.decorators.csrf import csrf_exempt
 import json
+import random
 import logging
 
 logger = logging.getLogger('typing_platform')
@@ -20,17 +28,10 @@ logger = logging.getLogger('typing_platform')
 @login_required
 def index(request):
     """Practice index page with user stats"""
-    from django.db.models import Count, Max, Avg
     from accounts.models import UserProfile
     
-    # Get user stats
-    user_results = UserResult.objects.filter(user=request.user)
-    stats = user_results.aggregate(
-        total_sessions=Count('id'),
-        max_wpm=Max('wpm'),
-        avg_wpm=Avg('wpm'),
-        avg_accuracy=Avg('accuracy'),
-    )
+    # Get user stats (one row, maintained on save)
+    stats = UserStats.for_user(request.user)
     
     # Get streak
     try:
@@ -40,14 +41,16 @@ def index(request):
         streak = 0
     
     # Get recent results (last 5)
-    recent_results = user_results.order_by('-time')[:5]
+    recent_results = UserResult.objects.filter(user=request.user).annotate(
+        has_timeline=Exists(KeystrokeTimeline.objects.filter(result=OuterRef('pk')))
+    ).order_by('-time')[:5]
     
     context = {
         'stats': {
-            'total_sessions': stats['total_sessions'] or 0,
-            'max_wpm': round(stats['max_wpm'] or 0, 1),
-            'avg_wpm': round(stats['avg_wpm'] or 0, 1),
-            'avg_accuracy': round(stats['avg_accuracy'] or 0, 1),
+            'total_sessions': stats.total_sessions,
+            'max_wpm': round(stats.max_wpm, 1),
+            'avg_wpm': round(stats.avg_wpm, 1),
+            'avg_accuracy': round(stats.avg_accuracy, 1),
             'streak': streak,
         },
         'recent_results': recent_results,
@@ -61,6 +64,23 @@ def text_settings(request):
     return render(request, 'typing_practice/text_settings.html')
 
 
+def _score_range(request):
+    """Optional min_score/max_score (0-100) query params as floats or None"""
+    bounds = []
+    for name in ('min_score', 'max_score'):
+        try:
+            bounds.append(max(0.0, min(100.0, float(request.GET[name]))))
+        except (KeyError, TypeError, ValueError):
+            bounds.append(None)
+    return tuple(bounds)
+
+
+def _score_query(min_score, max_score):
+    """Query string fragment that keeps the score range on "random" links"""
+    parts = [f'&{name}={value:g}' for name, value in (('min_score', min_score), ('max_score', max_score)) if value is not None]
+    return ''.join(parts)
+
+
 @login_required
 def text_practice(request, difficulty='easy'):
     # Get settings from query params
@@ -80,30 +100,24 @@ def text_practice(request, difficulty='easy'):
         time_limit = 0
         text_length = 25
     
-    # Select text based on action
+    min_score, max_score = _score_range(request)
+    
+    # Select text based on action ("next"/"weak" walk the difficulty label; the score range replaces it for random picks)
     if action == 'next' and current_text_id:
-        # Get next text (ordered by ID)
+        # Next text by ID within the same filters: one bisect over the cached pool and one fetch
         try:
-            current_text = Text.objects.get(id=current_text_id, difficulty=difficulty, word_count=text_length)
-            next_text = Text.objects.filter(
-                difficulty=difficulty,
-                word_count=text_length,
-                id__gt=current_text.id
-            ).order_by('id').first()
-            
-            if not next_text:
-                # If no next, get first text (wrap around)
-                next_text = Text.objects.filter(
-                    difficulty=difficulty,
-                    word_count=text_length
-                ).order_by('id').first()
-            
-            text = next_text
-        except Text.DoesNotExist:
-            text = get_random_text(difficulty=difficulty, word_count=text_length)
+            text = get_next_text(int(current_text_id), difficulty=difficulty, word_count=text_length)
+        except (TypeError, ValueError):
+            text = get_random_text(difficulty=difficulty, word_count=text_length, seen_by=[request.user])
+    elif action == 'weak':
+        # Text richest in the bigrams the user gets wrong most
+        text = get_recommended_text(request.user, difficulty=difficulty, word_count=text_length)
+    elif min_score is not None or max_score is not None:
+        # Numeric difficulty range instead of the coarse label (bisect over the pool's sorted scores)
+        text = get_random_text_in_score_range(min_score, max_score, word_count=text_length)
     else:
         # Random text selection
-        text = get_random_text(difficulty=difficulty, word_count=text_length)
+        text = get_random_text(difficulty=difficulty, word_count=text_length, seen_by=[request.user])
     
     if not text:
         from django.contrib import messages
@@ -111,10 +125,9 @@ def text_practice(request, difficulty='easy'):
         return redirect('typing_practice:index')
     
     # Process text based on mode
-    words = text.body.split()
     if mode == 'words' and words_count > 0:
-        # Take only specified number of words
-        text_body = ' '.join(words[:words_count])
+        # Take only specified number of words (normalized body is single-space separated)
+        text_body = ' '.join(text.get_normalized_body().split(' ', words_count)[:words_count])
     else:
         text_body = text.body
     
@@ -126,6 +139,7 @@ def text_practice(request, difficulty='easy'):
         'words_count': words_count,
         'time_limit': time_limit,
         'text_length': text_length,
+        'score_query': _score_query(min_score, max_score),
     })
 
 
@@ -142,30 +156,22 @@ def code_practice(request, language='python'):
     current_code_id = request.GET.get('code_id', None)
     difficulty = request.GET.get('difficulty', 'easy')
     
-    # Select code based on action
+    min_score, max_score = _score_range(request)
+    
+    # Select code based on action ("next"/"weak" walk the difficulty label; the score range replaces it for random picks)
     if action == 'next' and current_code_id:
-        # Get next code (ordered by ID)
+        # Next code by ID within the same filters: one bisect over the cached pool and one fetch
         try:
-            current_code = CodeSnippet.objects.get(id=current_code_id, language=language, difficulty=difficulty)
-            next_code = CodeSnippet.objects.filter(
-                language=language,
-                difficulty=difficulty,
-                id__gt=current_code.id
-            ).order_by('id').first()
-            
-            if not next_code:
-                # If no next, get first code (wrap around)
-                next_code = CodeSnippet.objects.filter(
-                    language=language,
-                    difficulty=difficulty
-                ).order_by('id').first()
-            
-            code = next_code
-        except CodeSnippet.DoesNotExist:
-            code = get_random_code(language, difficulty=difficulty)
+            code = get_next_code(int(current_code_id), language, difficulty=difficulty)
+        except (TypeError, ValueError):
+            code = get_random_code(language, difficulty=difficulty, seen_by=[request.user])
+    elif action == 'weak':
+        code = get_recommended_code(request.user, language, difficulty=difficulty)
+    elif min_score is not None or max_score is not None:
+        code = get_random_code_in_score_range(language, min_score, max_score)
     else:
         # Random code selection
-        code = get_random_code(language, difficulty=difficulty)
+        code = get_random_code(language, difficulty=difficulty, seen_by=[request.user])
     
     if not code:
         from django.contrib import messages
@@ -176,7 +182,112 @@ def code_practice(request, language='python'):
         'code': code,
         'language': language,
         'difficulty': difficulty,
+        'score_query': _score_query(min_score, max_score),
+        **highlight_context(code),
+    })
+
+
+MAX_BATCH_RESULTS = 50
+MAX_MISTAKES_LIST = 200
+
+
+class SubmissionError(Exception):
+    """Invalid result submission (message is shown to the user)"""
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def _parse_submission(data):
+    """Validate and sanitize client fields of one result submission"""
+    text_id = data.get('text_id')
+    code_id = data.get('code_id')
+    
+    # Validate that only one ID is provided
+    if not (text_id or code_id) or (text_id and code_id):
+        raise SubmissionError('Noto\'g\'ri so\'rov: text_id yoki code_id dan birini kiriting')
+    
+    try:
+        text_id = int(text_id) if text_id else None
+        code_id = int(code_id) if code_id else None
+        mistakes_list = data.get('mistakes_list', [])
+        if not isinstance(mistakes_list, list):
+            mistakes_list = []
+        submission = {
+            'text_id': text_id,
+            'code_id': code_id,
+            'wpm': validate_wpm(data.get('wpm', 0)),
+            'accuracy': validate_accuracy(data.get('accuracy', 0)),
+            'mistakes': max(0, int(data.get('mistakes', 0))),
+            'mistakes_list': mistakes_list[:MAX_MISTAKES_LIST],
+            'duration_seconds': max(0, int(data.get('duration_seconds', 0))),
+        }
+    except (ValueError, TypeError) as e:
+        logger.warning(f"Invalid data in result submission: {e}")
+        raise SubmissionError('Noto\'g\'ri ma\'lumot formati')
+    
+    try:
+        time_limit_sent = int(data.get('time_limit', 0))
+    except (TypeError, ValueError):
+        time_limit_sent = 0
+    
+    # Keystroke timeline is optional; a malformed one is dropped, not the result
+    try:
+        keystrokes = parse_keystrokes(data.get('keystrokes'))
+    except TimelineError as e:
+        logger.warning(f"Invalid keystroke timeline dropped: {e}")
+        keystrokes = []
+    submission.update({
+        'keystrokes': keystrokes,
+        'typed_text': data.get('typed_text', ''),
+        'allow_incomplete': bool(data.get('allow_incomplete', False)),
+        'mode': data.get('mode', 'full'),
+        'time_limit': time_limit_sent,
+        'session_type': 'code' if code_id else 'text',
     })
+    return submission
+
+
+def _not_found_error(submission):
+    if submission['session_type'] == 'code':
+        return SubmissionError('Kod namunasi topilmadi', status=404)
+    return SubmissionError('Matn topilmadi', status=404)
+
+
+def _build_result(user, submission, score):
+    """Check completeness against the server score and return an unsaved UserResult"""
+    is_code = submission['session_type'] == 'code'
+    
+    # If not time-mode allowed, require full match
+    time_mode_ok = (
+        submission['allow_incomplete'] and submission['mode'] == 'time'
+        and submission['duration_seconds'] >= submission['time_limit']
+    )
+    if not time_mode_ok and not score['is_complete']:
+        raise SubmissionError('Kod to\'liq yozilmagan' if is_code else 'Matn to\'liq yozilmagan')
+    
+    # override client values if they differ significantly (practice keeps the client's mistakes count)
+    wpm, accuracy, mistakes = reconcile_metrics(
+        submission['wpm'], submission['accuracy'], submission['mistakes'], score,
+        username=user.username,
+        context='Code' if is_code else 'Text',
+        check_mistakes=False,
+    )
+    result = UserResult(
+        user=user,
+        text_id=submission['text_id'],
+        code_snippet_id=submission['code_id'],
+        wpm=wpm,
+        accuracy=accuracy,
+        mistakes=mistakes,
+        mistakes_list=submission['mistakes_list'],
+        duration_seconds=submission['duration_seconds'],
+        session_type=submission['session_type'],
+    )
+    # Not a column: carried into the gamification job, which merges the error profile
+    result.typed_chars = score['typed_chars']
+    return result
 
 
 @login_required
@@ -185,141 +296,39 @@ def save_result(request):
     """Save typing practice result with validation"""
     try:
         data = json.loads(request.body)
-        text_id = data.get('text_id')
-        code_id = data.get('code_id')
-        
-        # Validate that only one ID is provided
-        if not (text_id or code_id) or (text_id and code_id):
-            return JsonResponse({'error': 'Noto\'g\'ri so\'rov: text_id yoki code_id dan birini kiriting'}, status=400)
-        
-        # Validate and sanitize input
         try:
-            wpm = validate_wpm(data.get('wpm', 0))
-            accuracy = validate_accuracy(data.get('accuracy', 0))
-            mistakes = max(0, int(data.get('mistakes', 0)))
-            mistakes_list = data.get('mistakes_list', [])
-            if not isinstance(mistakes_list, list):
-                mistakes_list = []
-            duration_seconds = max(0, int(data.get('duration_seconds', 0)))
-        except (ValueError, TypeError) as e:
-            logger.warning(f"Invalid data in save_result: {e}")
-            return JsonResponse({'error': 'Noto\'g\'ri ma\'lumot formati'}, status=400)
+            submission = _parse_submission(data)
+            model = CodeSnippet if submission['session_type'] == 'code' else Text
+            content = model.objects.filter(id=submission['code_id'] or submission['text_id']).first()
+            if content is None:
+                raise _not_found_error(submission)
+            
+            # Server-side normalization/validation
+            score = score_submission(
+                submission['typed_text'], content.get_normalized_body(), submission['duration_seconds'],
+                submission['session_type'], original_is_normalized=True,
+            )
+            result = _build_result(request.user, submission, score)
+        except SubmissionError as e:
+            return JsonResponse({'error': e.message}, status=e.status)
         
-        # Validate text/code exists and perform server-side normalization/validation
-        typed_text = data.get('typed_text', '')
-        allow_incomplete = bool(data.get('allow_incomplete', False))
-        mode = data.get('mode', 'full')
-        try:
-            time_limit_sent = int(data.get('time_limit', 0))
-        except (TypeError, ValueError):
-            time_limit_sent = 0
-
-        def normalize_text(s: str) -> str:
-            if not isinstance(s, str):
-                return ''
-            # Normalize whitespace for plain texts: collapse all whitespace to single spaces
-            return ' '.join(s.replace('\r\n', '\n').split())
-
-        def normalize_code(s: str) -> str:
-            if not isinstance(s, str):
-                return ''
-            # Normalize line endings and strip trailing spaces per line
-            return '\n'.join([line.rstrip() for line in s.replace('\r\n', '\n').split('\n')])
+        # Best WPM before this result, for the "new record" message
+        previous_best = UserStats.for_user(request.user).max_wpm
 
-        if text_id:
-            try:
-                text = Text.objects.get(id=text_id)
-            except Text.DoesNotExist:
-                return JsonResponse({'error': 'Matn topilmadi'}, status=404)
-
-            original_norm = normalize_text(text.body)
-            typed_norm = normalize_text(typed_text)
-
-            # If not time-mode allowed, require full match
-            if not (allow_incomplete and mode == 'time' and duration_seconds >= time_limit_sent):
-                if typed_norm != original_norm:
-                    return JsonResponse({'error': 'Matn to\'liq yozilmagan'}, status=400)
-
-            # compute server-side metrics
-            typed_chars = len(typed_norm)
-            typed_words = len(typed_norm.split()) if typed_norm.strip() else 0
-            mismatches = 0
-            # per-char mismatch counting against original
-            for i, ch in enumerate(typed_norm):
-                if i >= len(original_norm) or ch != original_norm[i]:
-                    mismatches += 1
-            mismatches += max(0, len(original_norm) - len(typed_norm))
-            server_accuracy = round(((typed_chars - mismatches) / typed_chars) * 100, 2) if typed_chars > 0 else 100.0
-            server_wpm = round((typed_words / duration_seconds) * 60, 2) if duration_seconds > 0 else 0.0
-
-            # override client values if they differ significantly
-            if abs(server_wpm - wpm) / (server_wpm + 1e-6) > 0.2:
-                logger.info(f"WPM mismatch for user {request.user.username}: client={wpm}, server={server_wpm}")
-                wpm = server_wpm
-            if abs(server_accuracy - accuracy) > 10:
-                logger.info(f"Accuracy mismatch for user {request.user.username}: client={accuracy}, server={server_accuracy}")
-                accuracy = server_accuracy
-
-        if code_id:
-            try:
-                code = CodeSnippet.objects.get(id=code_id)
-            except CodeSnippet.DoesNotExist:
-                return JsonResponse({'error': 'Kod namunasi topilmadi'}, status=404)
-
-            original_norm = normalize_code(code.code_body)
-            typed_norm = normalize_code(typed_text)
-
-            # If not time-mode allowed, require full match
-            if not (allow_incomplete and mode == 'time' and duration_seconds >= time_limit_sent):
-                if typed_norm != original_norm:
-                    return JsonResponse({'error': 'Kod to\'liq yozilmagan'}, status=400)
-
-            # compute server-side metrics for code (chars based)
-            typed_chars = len(typed_norm)
-            mismatches = 0
-            for i, ch in enumerate(typed_norm):
-                if i >= len(original_norm) or ch != original_norm[i]:
-                    mismatches += 1
-            mismatches += max(0, len(original_norm) - len(typed_norm))
-            server_accuracy = round(((typed_chars - mismatches) / typed_chars) * 100, 2) if typed_chars > 0 else 100.0
-            server_wpm = round(((typed_chars / 5.0) / duration_seconds) * 60, 2) if duration_seconds > 0 else 0.0
-
-            if abs(server_wpm - wpm) / (server_wpm + 1e-6) > 0.2:
-                logger.info(f"Code WPM mismatch for user {request.user.username}: client={wpm}, server={server_wpm}")
-                wpm = server_wpm
-            if abs(server_accuracy - accuracy) > 10:
-                logger.info(f"Code accuracy mismatch for user {request.user.username}: client={accuracy}, server={server_accuracy}")
-                accuracy = server_accuracy
-        
-        session_type = 'text' if text_id else 'code'
+        # Keystroke timing is recorded for review; it does not reject the result
+        analysis = check_submission(request.user, submission['keystrokes'], submission['duration_seconds'])
         
         # Create result with transaction
         with transaction.atomic():
-            result = UserResult.objects.create(
-                user=request.user,
-                text_id=text_id if text_id else None,
-                code_snippet_id=code_id if code_id else None,
-                wpm=wpm,
-                accuracy=accuracy,
-                mistakes=mistakes,
-                mistakes_list=mistakes_list,
-                duration_seconds=duration_seconds,
-                session_type=session_type
-            )
-
-            # Keep only last 10 results per user, delete older ones (avoid extra count())
-            ids_to_delete = list(UserResult.objects.filter(user=request.user).order_by('-time').values_list('id', flat=True)[10:])
-            if ids_to_delete:
-                UserResult.objects.filter(id__in=ids_to_delete).delete()
-                logger.info(f"Deleted {len(ids_to_delete)} old results for user {request.user.username}")
-        
-        # Clear user stats cache
-        cache.delete(f'user_stats_{request.user.id}')
+            result.save()
+            if submission['keystrokes']:
+                KeystrokeTimeline.from_events(result, submission['keystrokes'], analysis).save()
+            # Older results are rolled up and pruned by the archive_results command
         
         # Get motivational message
-        motivational_message = get_motivational_message(request.user, result)
+        motivational_message = get_motivational_message(request.user, result, previous_best)
         
-        logger.info(f"Result saved: user={request.user.username}, wpm={wpm}, accuracy={accuracy}")
+        logger.info(f"Result saved: user={request.user.username}, wpm={result.wpm}, accuracy={result.accuracy}")
         return JsonResponse({
             'success': True, 
             'result_id': result.id,
@@ -336,25 +345,162 @@ def save_result(request):
         return JsonResponse({'error': 'Server xatosi yuz berdi'}, status=500)
 
 
+@login_required
+@require_http_methods(["POST"])
+def save_results_batch(request):
+    """Save several queued results at once: one scoring pass, one insert, one gamification run"""
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        logger.error("Invalid JSON in save_results_batch request")
+        return JsonResponse({'error': 'Noto\'g\'ri JSON formati'}, status=400)
+    
+    items = data.get('results') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return JsonResponse({'error': 'Natijalar ro\'yxati bo\'sh'}, status=400)
+    if len(items) > MAX_BATCH_RESULTS:
+        return JsonResponse({'error': f'Bir so\'rovda ko\'pi bilan {MAX_BATCH_RESULTS} ta natija yuborish mumkin'}, status=400)
+    
+    try:
+        outcomes = [None] * len(items)
+        parsed = []
+        for index, item in enumerate(items):
+            try:
+                parsed.append((index, _parse_submission(item if isinstance(item, dict) else {})))
+            except SubmissionError as e:
+                outcomes[index] = {'index': index, 'error': e.message}
+        
+        # Referenced texts and snippets in two queries
+        texts = Text.objects.in_bulk([sub['text_id'] for _, sub in parsed if sub['text_id']])
+        codes = CodeSnippet.objects.in_bulk([sub['code_id'] for _, sub in parsed if sub['code_id']])
+        scorable = []
+        for index, sub in parsed:
+            content = codes.get(sub['code_id']) if sub['code_id'] else texts.get(sub['text_id'])
+            if content is None:
+                outcomes[index] = {'index': index, 'error': _not_found_error(sub).message}
+            else:
+                scorable.append((index, sub, content))
+        
+        scores = score_batch(
+            [(sub['typed_text'], content.get_normalized_body(), sub['duration_seconds'], sub['session_type'])
+             for _, sub, content in scorable],
+            originals_normalized=True,
+        )
+        accepted = []
+        for (index, sub, content), score in zip(scorable, scores):
+            try:
+                result = _build_result(request.user, sub, score)
+                accepted.append((index, result, sub['keystrokes']))
+            except SubmissionError as e:
+                outcomes[index] = {'index': index, 'error': e.message}
+        
+        if accepted:
+            results = [result for _, result, _ in accepted]
+            # Timing history is loaded once and extended in memory as queued sessions are checked
+            history = recent_intervals(request.user.id) if any(keystrokes for _, _, keystrokes in accepted) else []
+            timelines = []
+            for _, result, keystrokes in accepted:
+                if not keystrokes:
+                    continue
+                analysis = check_submission(request.user, keystrokes, result.duration_seconds, history=history)
+                if analysis and analysis['suspicion'] < SUSPICION_THRESHOLD and analysis['features']['median_interval_ms']:
+                    history = [analysis['features']['median_interval_ms']] + history[:HISTORY_SIZE - 1]
+                timelines.append((result, keystrokes, analysis))
+            # bulk_create skips save() and post_save, so stats and gamification are applied here once
+            with transaction.atomic():
+                UserResult.objects.bulk_create(results)
+                KeystrokeTimeline.objects.bulk_create([
+                    KeystrokeTimeline.from_events(result, keystrokes, analysis)
+                    for result, keystrokes, analysis in timelines
+                ])
+                best = previous_best(request.user.id)  # personal-record baseline, before the stats update
+                UserStats.record_results(request.user.id, results)
+                TextStats.record_results(results)
+                dispatch_result_batch(request.user, results, best)
+            for index, result, _ in accepted:
+                outcomes[index] = {'index': index, 'result_id': result.id}
+        
+        logger.info(f"Result batch saved: user={request.user.username}, saved={len(accepted)}, rejected={len(items) - len(accepted)}")
+        return JsonResponse({'success': True, 'saved': len(accepted), 'results': outcomes})
+    
+    except Exception as e:
+        logger.error(f"Error saving result batch: {e}", exc_info=True)
+        return JsonResponse({'error': 'Server xatosi yuz berdi'}, status=500)
+
+
 @login_required
 def achievements(request):
     """Return a small achievements payload for the user (simple)."""
     # Minimal achievements: last_wpm, best_wpm, streak placeholder
     last = UserResult.objects.filter(user=request.user).order_by('-time').first()
-    best = UserResult.objects.filter(user=request.user).order_by('-wpm').first()
     data = {
         'last_wpm': last.wpm if last else 0,
-        'best_wpm': best.wpm if best else 0,
+        'best_wpm': UserStats.for_user(request.user).max_wpm,
         'streak_days': 0,
     }
     return JsonResponse({'success': True, 'achievements': data})
 
 
-def get_motivational_message(user, result):
+@login_required
+def error_profile(request):
+    """Per-key error rates and weakest keys/bigrams of the current user"""
+    return JsonResponse({'success': True, 'error_profile': ErrorProfile.summary_for(request.user)})
+
+
+def _result_with_timeline(request, result_id):
+    """Result with its keystroke timeline; only the owner and staff may see it"""
+    result = get_object_or_404(
+        UserResult.objects.select_related('text', 'code_snippet', 'keystroke_timeline', 'user'),
+        id=result_id,
+    )
+    if result.user_id != request.user.id and not request.user.is_staff:
+        raise Http404
+    try:
+        timeline = result.keystroke_timeline
+    except KeystrokeTimeline.DoesNotExist:
+        timeline = None
+    return result, timeline
+
+
+@login_required
+def keystroke_timeline(request, result_id):
+    """Decoded keystroke timeline of a result as JSON ([t_ms, code] pairs)"""
+    result, timeline = _result_with_timeline(request, result_id)
+    if timeline is None:
+        return JsonResponse({'error': 'Bu natija uchun yozuv mavjud emas'}, status=404)
+    try:
+        events = timeline.decode()
+    except TimelineError as e:
+        logger.error(f"Corrupt keystroke timeline for result {result.id}: {e}")
+        return JsonResponse({'error': 'Yozuvni o\'qib bo\'lmadi'}, status=500)
+    content = result.code_snippet if result.session_type == 'code' else result.text
+    return JsonResponse({
+        'success': True,
+        'result_id': result.id,
+        'session_type': result.session_type,
+        'original': content.get_normalized_body() if content else '',
+        'duration_ms': timeline.duration_ms,
+        'events': [[t_ms, code] for t_ms, code in events],
+    })
+
+
+@login_required
+def replay_result(request, result_id):
+    """Keystroke replay page for a result"""
+    result, timeline = _result_with_timeline(request, result_id)
+    return render(request, 'typing_practice/replay.html', {
+        'result': result,
+        'has_timeline': timeline is not None,
+    })
+
+
+def get_motivational_message(user, result, previous_best=None):
     """Get motivational message based on user's performance"""
+    from accounts.models import UserProfile
     try:
-        # Get previous best
-        previous_best = UserResult.objects.filter(user=user).exclude(id=result.id).aggregate(max_wpm=Max('wpm'))['max_wpm'] or 0
+        # Previous best comes from UserStats read before the result was saved
+        if previous_best is None:
+            previous_best = UserStats.for_user(user).max_wpm
         
         # Check if new record
         if result.wpm > previous_best:
@@ -430,13 +576,10 @@ def get_motivational_message(user, result):
 @csrf_exempt
 @require_http_methods(["POST"])
 def telemetry(request):
-    """Receive small telemetry events from frontend (non-sensitive)."""
+    """Receive small telemetry events from frontend (non-sensitive); buffered, see typing_practice.telemetry"""
     try:
-        payload = json.loads(request.body)
-        event = payload.get('event')
-        details = payload.get('details', {})
-        logger.info(f"Telemetry event: {event} details={details}")
-        return JsonResponse({'success': True})
-    except Exception as e:
-        logger.warning(f"Telemetry error: {e}")
+        event, details = clean_event(json.loads(request.body))
+    except (ValueError, TypeError):
         return JsonResponse({'error': 'Noto\'g\'ri telemetriya ma\'lumoti'}, status=400)
+    telemetry_buffer.add(event, details, request.user.id if request.user.is_authenticated else None)
+    return JsonResponse({'success': True})